@@ -6,26 +6,34 @@ __version__ = '0.1.0'
 
 from .config import SlurmConfig
 from .batch import BatchManager
+from .submitter import Submitter
+from .dag import WorkflowDAG
 from .job_parser import JobParser
 from .script_generator import ScriptGenerator
 from .equilibration_generator import EquilibrationGenerator
 from .utils import (
     setup_logging,
     validate_paths,
+    find_missing_paths,
     TaskManagerError,
     ConfigurationError,
-    ValidationError
+    ValidationError,
+    SubmissionError
 )
 
 __all__ = [
     'SlurmConfig',
     'BatchManager',
+    'Submitter',
+    'WorkflowDAG',
     'JobParser',
     'ScriptGenerator',
     'EquilibrationGenerator',
     'setup_logging',
     'validate_paths',
+    'find_missing_paths',
     'TaskManagerError',
     'ConfigurationError',
-    'ValidationError'
+    'ValidationError',
+    'SubmissionError'
 ]
\ No newline at end of file
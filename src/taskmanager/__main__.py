@@ -5,6 +5,7 @@ For PCSS Eagle Altair HPC Cluster
 """
 
 import sys
+import asyncio
 import argparse
 from pathlib import Path
 from .config import SlurmConfig
@@ -13,10 +14,34 @@ from .batch import BatchManager
 from .script_generator import ScriptGenerator
 from .equilibration_generator import EquilibrationGenerator
 from .production_chunker import ProductionChunker
-from .utils import setup_logging, TaskManagerError
+from .submitter import Submitter
+from .plan_cache import PlanCache
+from .preflight import Preflight
+from .pilot import WorkQueue
+from .incremental import IncrementalPlanner
+from .ledger import JobLedger
+from .status import StatusFetcher, WorkflowStatus
+from .report import EfficiencyReport, format_report
+from .throttle import ThrottledSubmission
+from .simulator import WorkflowPlanner
+from .sizing import read_gro_header
+from .walltime import CHAINED_CHUNK_LOGS, WalltimeEstimator
+from .utils import setup_logging, format_slurm_time, TaskManagerError
 import os
 import logging
 
+def add_record_arguments(parser):
+    """Options describing one submitted job; returns the group choosing what was submitted"""
+    parser.add_argument('--job', help='Job name')
+    parser.add_argument('--slurm-id', help='SLURM job ID')
+    parser.add_argument('--path', help='Job directory')
+    parser.add_argument('--job-type', help='Job type section of the configuration')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--step', help='Step script name')
+    target.add_argument('--chunks', nargs=3, metavar=('PREFIX', 'FIRST', 'LAST'),
+                        help='Chunk scripts submitted as one job array')
+    return target
+
 def setup_argument_parser():
     """Setup command line argument parser"""
     parser = argparse.ArgumentParser(
@@ -29,11 +54,109 @@ def setup_argument_parser():
     # Batch command
     batch_parser = subparsers.add_parser('batch', help='Submit batch job')
     batch_parser.add_argument('--job-file', default='jobs.yaml', help='Job configuration file')
-    batch_parser.add_argument('--execution', choices=['sequential', 'parallel'], default='sequential')
+    batch_parser.add_argument('--execution', choices=['sequential', 'parallel', 'array', 'dag', 'pack', 'pilot'], default='sequential')
     batch_parser.add_argument('--profile', help='Execution profile')
     batch_parser.add_argument('--config', default='.slurmparams', help='SLURM config file')
     batch_parser.add_argument('--output', default='batch_job.sh', help='Output script name')
     batch_parser.add_argument('--dry-run', action='store_true', help='Show what would be done')
+    batch_parser.add_argument('--no-cache', action='store_true', help='Ignore the cached workflow plan')
+    batch_parser.add_argument('--incremental', action='store_true', help='Only submit steps with missing or stale outputs')
+    batch_parser.add_argument('--hash', action='store_true', help='With --incremental, compare inputs by content instead of mtime')
+    batch_parser.add_argument('--ledger', default=JobLedger.DEFAULT_DB, help='Ledger database recording submitted job IDs')
+    batch_parser.add_argument('--no-ledger', action='store_true', help='Do not record job IDs in the ledger')
+    
+    # Submit command
+    submit_parser = subparsers.add_parser('submit', help='Submit workflow directly via sbatch')
+    submit_parser.add_argument('--job-file', nargs='+', default=['jobs.yaml'],
+                               help='Job configuration file; several are submitted concurrently')
+    submit_parser.add_argument('--profile', help='Execution profile')
+    submit_parser.add_argument('--config', default='.slurmparams', help='SLURM config file')
+    submit_parser.add_argument('--execution', choices=['sequential', 'dag'], default='sequential')
+    submit_parser.add_argument('--max-workers', type=int, default=4, help='Concurrent sbatch calls')
+    submit_parser.add_argument('--max-concurrent', type=int, default=16,
+                               help='Concurrent sbatch calls across all job files when several are given')
+    submit_parser.add_argument('--dry-run', action='store_true', help='Show what would be done')
+    submit_parser.add_argument('--no-cache', action='store_true', help='Ignore the cached workflow plan')
+    submit_parser.add_argument('--incremental', action='store_true', help='Only submit steps with missing or stale outputs')
+    submit_parser.add_argument('--hash', action='store_true', help='With --incremental, compare inputs by content instead of mtime')
+    submit_parser.add_argument('--ledger', default=JobLedger.DEFAULT_DB, help='Ledger database recording submitted job IDs')
+    submit_parser.add_argument('--no-ledger', action='store_true', help='Do not record job IDs in the ledger')
+    submit_parser.add_argument('--throttle', type=int, metavar='K',
+                               help='Keep at most K of your jobs queued, submitting more as they leave the queue')
+    submit_parser.add_argument('--poll-interval', type=float, default=60.0, help='Seconds between queue checks with --throttle')
+    submit_parser.add_argument('--user', help='User whose queue --throttle counts (default: current user)')
+    
+    # Ledger commands
+    ledger_parser = subparsers.add_parser('ledger', help='List submitted steps from the ledger')
+    ledger_parser.add_argument('--db', default=JobLedger.DEFAULT_DB, help='Ledger database')
+    ledger_parser.add_argument('--workflow', help='Only this workflow (name, or name@job-file key)')
+    ledger_parser.add_argument('--state', help='Only steps in this state')
+    
+    status_parser = subparsers.add_parser('status', help='Show per-step SLURM state of tracked workflows')
+    status_parser.add_argument('--db', default=JobLedger.DEFAULT_DB, help='Ledger database')
+    status_parser.add_argument('--workflow', help='Only this workflow (name, or name@job-file key)')
+    status_parser.add_argument('--ttl', type=float, default=60.0, help='Seconds to reuse cached sacct results')
+    status_parser.add_argument('--refresh', action='store_true', help='Ignore cached sacct results')
+    status_parser.add_argument('--summary', action='store_true', help='Only show state counts per workflow')
+    
+    report_parser = subparsers.add_parser('report', help='CPU efficiency, memory use and ns/day of workflow steps')
+    report_parser.add_argument('--db', default=JobLedger.DEFAULT_DB, help='Ledger database')
+    report_parser.add_argument('--workflow', help='Only this workflow (name, or name@job-file key)')
+    report_parser.add_argument('--min-cpu-efficiency', type=float, default=0.5, help='Flag steps below this CPU efficiency')
+    report_parser.add_argument('--min-memory-use', type=float, default=0.25, help='Flag steps using less of their memory')
+    
+    record_parser = subparsers.add_parser('ledger-record', help='Record a submitted job in the ledger (used by batch scripts)')
+    record_parser.add_argument('--db', default=JobLedger.DEFAULT_DB, help='Ledger database')
+    record_parser.add_argument('--workflow', required=True, help='Workflow key')
+    record_target = add_record_arguments(record_parser)
+    record_target.add_argument('--from-file', help='Tab-separated options of one job per line, as written by record_job')
+    
+    # Plan command
+    plan_parser = subparsers.add_parser('plan', help='Simulate a workflow and predict makespan and core-hours')
+    plan_parser.add_argument('--job-file', default='jobs.yaml', help='Job configuration file')
+    plan_parser.add_argument('--config', default='.slurmparams', help='SLURM config file')
+    plan_parser.add_argument('--execution', choices=['sequential', 'dag'], default='sequential')
+    plan_parser.add_argument('--nodes', type=int, nargs='+', help='Candidate node counts for production jobs')
+    plan_parser.add_argument('--budget', type=float, help='Core-hour budget for the recommendation')
+    plan_parser.add_argument('--max-nodes', type=int, help='Nodes available to the workflow at once')
+    plan_parser.add_argument('--scaling', type=float, default=0.8,
+                             help='Parallel scaling exponent: speedup is (nodes / configured) ** scaling')
+    plan_parser.add_argument('--no-cache', action='store_true', help='Ignore the cached workflow plan')
+    
+    # Enqueue command
+    enqueue_parser = subparsers.add_parser('enqueue', help='Add workflow steps to a pilot work queue')
+    enqueue_parser.add_argument('--job-file', default='jobs.yaml', help='Job configuration file')
+    enqueue_parser.add_argument('--profile', help='Execution profile')
+    enqueue_parser.add_argument('--config', default='.slurmparams', help='SLURM config file')
+    enqueue_parser.add_argument('--queue', help='Work queue directory (default: PILOT_QUEUE)')
+    enqueue_parser.add_argument('--no-cache', action='store_true', help='Ignore the cached workflow plan')
+    
+    # Queue status command
+    queue_parser = subparsers.add_parser('queue-status', help='Show pilot work queue status')
+    queue_parser.add_argument('--queue', default=BatchManager.DEFAULT_PILOT_QUEUE, help='Work queue directory')
+    queue_parser.add_argument('--recover', action='store_true', help='Return tasks of killed pilots to pending')
+    
+    # Preflight command
+    preflight_parser = subparsers.add_parser('preflight', help='Check all workflow inputs exist before submission')
+    preflight_parser.add_argument('--job-file', default='jobs.yaml', help='Job configuration file')
+    preflight_parser.add_argument('--profile', help='Execution profile')
+    preflight_parser.add_argument('--config', default='.slurmparams', help='SLURM config file')
+    preflight_parser.add_argument('--workers', type=int, default=8, help='Directories scanned concurrently')
+    preflight_parser.add_argument('--no-cache', action='store_true', help='Ignore the cached workflow plan')
+    
+    # Size command
+    size_parser = subparsers.add_parser('size', help='Suggest resources from a .gro structure')
+    size_parser.add_argument('--structure', required=True, help='Structure file (.gro)')
+    size_parser.add_argument('--job-type', default='production', help='Job type section to size')
+    size_parser.add_argument('--config', default='.slurmparams', help='SLURM config file')
+    
+    # Estimate walltime command
+    walltime_parser = subparsers.add_parser('estimate-walltime', help='Estimate chunk walltime from completed md.log files')
+    walltime_parser.add_argument('--path', default='.', help='Directory containing chunk logs')
+    walltime_parser.add_argument('--pattern', action='append',
+                                 help=f'Glob pattern of chunk logs, repeatable (default: prod_chunk*.log and {CHAINED_CHUNK_LOGS})')
+    walltime_parser.add_argument('--chunk-length', type=float, default=10, help='Chunk length in ns')
+    walltime_parser.add_argument('--margin', type=float, default=0.25, help='Safety margin as a fraction')
     
     # Generate scripts command
     gen_parser = subparsers.add_parser('generate-scripts', help='Generate scripts from templates')
@@ -47,6 +170,9 @@ def setup_argument_parser():
     chunk_parser.add_argument('--length-ns', type=int, required=True, help='Length per chunk (ns)')
     chunk_parser.add_argument('--path', default='.', help='Output path')
     chunk_parser.add_argument('--template', default='step7_production.mdp', help='MDP template')
+    chunk_parser.add_argument('--chain', action='store_true', help='Generate one self-resubmitting chain script instead')
+    chunk_parser.add_argument('--target-ns', type=float, help='Chain target in ns, editable later in target_ns (default: chunks x length)')
+    chunk_parser.add_argument('--config', default='.slurmparams', help='SLURM config file for the chain headers')
     
     # Show config command
     config_parser = subparsers.add_parser('show-config', help='Show SLURM configuration')
@@ -55,9 +181,40 @@ def setup_argument_parser():
     # Validate workflow command
     validate_parser = subparsers.add_parser('validate-workflow', help='Validate job workflow')
     validate_parser.add_argument('--job-file', default='jobs.yaml', help='Job file to validate')
+    validate_parser.add_argument('--profile', help='Execution profile')
+    validate_parser.add_argument('--config', default='.slurmparams', help='SLURM config file')
+    validate_parser.add_argument('--no-cache', action='store_true', help='Ignore the cached workflow plan')
     
     return parser
 
+def plan_incremental(jobs, args, execution_mode):
+    """Trim jobs to their stale steps when --incremental is given"""
+    if not getattr(args, 'incremental', False):
+        return jobs
+    
+    planned = IncrementalPlanner(jobs, execution_mode, args.hash).plan()
+    skipped = {job['name']: job['skipped_steps'] for job in planned}
+    for job in jobs:
+        if job['name'] not in skipped:
+            print(f"  ✓ {job['name']}: up to date")
+        elif skipped[job['name']]:
+            print(f"  ↻ {job['name']}: resuming at step {skipped[job['name']] + 1}")
+    return planned
+
+def ledger_file(args):
+    """Ledger database for a command, or None with --no-ledger"""
+    return None if getattr(args, 'no_ledger', False) else getattr(args, 'ledger', JobLedger.DEFAULT_DB)
+
+def create_job_parser(args, job_file=None):
+    """Create a JobParser for a command, reusing the cached plan unless disabled"""
+    cache_dir = None if getattr(args, 'no_cache', False) else PlanCache.DEFAULT_CACHE_DIR
+    return JobParser(
+        job_file or args.job_file,
+        getattr(args, 'profile', None),
+        config_file=getattr(args, 'config', None),
+        cache_dir=cache_dir
+    )
+
 def cmd_batch(args):
     """Handle batch command"""
     try:
@@ -99,6 +256,304 @@ def cmd_batch(args):
         print(f"Error in batch mode: {e}")
         return 1
 
+def cmd_submit(args):
+    """Handle submit command"""
+    if len(args.job_file) > 1:
+        return cmd_submit_many(args)
+    
+    try:
+        config = SlurmConfig(args.config)
+        job_parser = create_job_parser(args, args.job_file[0])
+        jobs = job_parser.get_jobs()
+        
+        if not jobs:
+            print("No jobs found in workflow")
+            return 1
+        
+        jobs = plan_incremental(jobs, args, args.execution)
+        if not jobs:
+            print("All steps are up to date; nothing to submit")
+            return 0
+        
+        batch_manager = BatchManager(config, job_parser.workflow_key)
+        submitter = Submitter(max_workers=args.max_workers, dry_run=args.dry_run)
+        ledger = JobLedger(ledger_file(args)) if ledger_file(args) else None
+        if args.throttle and not args.dry_run:
+            if ledger is None:
+                print("Error: --throttle keeps its state in the ledger and cannot be used with --no-ledger")
+                return 1
+            throttled = ThrottledSubmission(batch_manager, ledger, submitter, args.throttle,
+                                            args.poll_interval, args.user)
+            steps = throttled.run(jobs, args.execution)
+        else:
+            steps = batch_manager.submit(jobs, submitter, args.execution, ledger)
+        
+        print(f"Submitted {len(steps)} steps:")
+        for step in steps:
+            print(f"  {step['job_id'] or 'skipped':>12}  {step['name']}")
+        
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    
+    return 0
+
+def cmd_submit_many(args):
+    """Handle submit with several job files, submitting the workflows concurrently"""
+    if args.throttle:
+        print("Error: --throttle takes a single job file")
+        return 1
+    
+    try:
+        config = SlurmConfig(args.config)
+        workflows = []
+        for job_file in args.job_file:
+            job_parser = create_job_parser(args, job_file)
+            print(f"{job_file}:")
+            jobs = plan_incremental(job_parser.get_jobs(), args, args.execution)
+            if jobs:
+                workflows.append((BatchManager(config, job_parser.workflow_key), jobs))
+        
+        if not workflows:
+            print("All steps are up to date; nothing to submit")
+            return 0
+        
+        submitter = Submitter(dry_run=args.dry_run)
+        ledger = JobLedger(ledger_file(args)) if ledger_file(args) else None
+        results = asyncio.run(BatchManager.submit_many_async(
+            workflows, submitter, args.execution, ledger, args.max_concurrent
+        ))
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    
+    failed = 0
+    for (batch_manager, _), result in zip(workflows, results):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"✗ {batch_manager.workflow}: {result}")
+        else:
+            print(f"✓ {batch_manager.workflow}: submitted {len(result)} steps")
+            for step in result:
+                print(f"  {step['job_id']:>12}  {step['name']}")
+    
+    return 1 if failed else 0
+
+def cmd_plan(args):
+    """Handle plan command"""
+    try:
+        config = SlurmConfig(args.config)
+        cache_dir = None if args.no_cache else PlanCache.DEFAULT_CACHE_DIR
+        base_parser = JobParser(args.job_file, config_file=args.config, cache_dir=cache_dir)
+        variants = {'default': base_parser.get_jobs()}
+        for profile in base_parser.workflow_data.get('execution_profiles', {}):
+            variants[profile] = JobParser(args.job_file, profile, config_file=args.config, cache_dir=cache_dir).get_jobs()
+        
+        planner = WorkflowPlanner(config, args.scaling, args.max_nodes)
+        results, best = planner.compare(variants, args.nodes, args.execution, args.budget)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    
+    print(f"=== Workflow Plan ({args.job_file}) ===")
+    print(f"  {'profile':<16} {'nodes':>6} {'makespan':>14} {'core-hours':>12}")
+    for result in results:
+        nodes = result['nodes'] or 'config'
+        marker = '  <- recommended' if result is best else ''
+        print(f"  {result['variant']:<16} {nodes:>6} {format_slurm_time(int(result['makespan'])):>14}"
+              f" {result['core_hours']:>12.0f}{marker}")
+    
+    if best is None:
+        print(f"\nNo option fits the budget of {args.budget:.0f} core-hours")
+        return 1
+    
+    timeline = {entry['name']: entry for entry in best['timeline']}
+    print(f"\nCritical path ({best['variant']}, nodes: {best['nodes'] or 'config'}):")
+    for name in best['critical_path']:
+        entry = timeline[name]
+        print(f"  {name:<36} waits {format_slurm_time(int(entry['start'] - entry['eligible'])):>12}"
+              f"  runs {format_slurm_time(int(entry['end'] - entry['start'])):>12}")
+    return 0
+
+def cmd_enqueue(args):
+    """Handle enqueue command"""
+    try:
+        config = SlurmConfig(args.config)
+        job_parser = create_job_parser(args)
+        jobs = job_parser.get_jobs()
+        queue_dir = args.queue or config.get_job_params('pilot').get('PILOT_QUEUE', BatchManager.DEFAULT_PILOT_QUEUE)
+        
+        filenames = BatchManager(config, job_parser.workflow_key).enqueue_steps(jobs, queue_dir)
+        print(f"Queued {len(filenames)} new steps in {queue_dir}")
+        
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    
+    return 0
+
+def cmd_queue_status(args):
+    """Handle queue-status command"""
+    queue = WorkQueue(args.queue)
+    if args.recover:
+        print(f"Returned {queue.recover()} running tasks to pending")
+    
+    print(f"=== Work Queue ({args.queue}) ===")
+    for state, count in queue.counts().items():
+        print(f"  {state:<8} {count}")
+    return 0
+
+def cmd_ledger(args):
+    """Handle ledger command"""
+    with JobLedger(args.db) as ledger:
+        steps = ledger.steps(args.workflow, args.state)
+        
+        print(f"=== Job Ledger ({args.db}) ===")
+        for step in steps:
+            array = '' if step['array_index'] is None else f"_{step['array_index']}"
+            print(f"  {(step['slurm_id'] or '-') + array:>14}  {step['state']:<12} {step['workflow']}: {step['job']}/{step['step']}")
+        
+        counts = ledger.state_counts(args.workflow)
+        print(f"\n{len(steps)} steps; " + ', '.join(f"{state}: {count}" for state, count in sorted(counts.items())))
+    return 0
+
+def cmd_status(args):
+    """Handle status command"""
+    with JobLedger(args.db) as ledger:
+        status = WorkflowStatus(ledger, StatusFetcher(ttl=args.ttl))
+        status.refresh(args.workflow, args.refresh)
+        
+        for workflow, counts in status.summary(args.workflow):
+            print(f"=== {workflow} ===")
+            if not args.summary:
+                for step in ledger.steps(workflow):
+                    array = '' if step['array_index'] is None else f"_{step['array_index']}"
+                    exit_code = '' if step['exit_code'] is None else f" (exit {step['exit_code']})"
+                    print(f"  {(step['slurm_id'] or '-') + array:>14}  {step['state']:<12} {step['job']}/{step['step']}{exit_code}")
+            print("  " + ', '.join(f"{state}: {count}" for state, count in sorted(counts.items())))
+    return 0
+
+def cmd_report(args):
+    """Handle report command"""
+    with JobLedger(args.db) as ledger:
+        steps = ledger.steps(args.workflow)
+    if not steps:
+        print(f"No steps recorded in {args.db}")
+        return 0
+    
+    report = EfficiencyReport(min_cpu_efficiency=args.min_cpu_efficiency, min_memory_use=args.min_memory_use)
+    rows = report.build(steps)
+    print(format_report(rows))
+    
+    print("\n=== By job type (medians) ===")
+    for job_type, summary in report.summarize(rows).items():
+        values = ', '.join(
+            f"{field}: {value:.2f}" for field, value in summary.items() if field != 'steps' and value is not None
+        )
+        print(f"  {job_type} ({summary['steps']} steps) {values}")
+    return 0
+
+def recorded_steps(args):
+    """Ledger rows of one job described by add_record_arguments options"""
+    if not (args.job and args.slurm_id and (args.step or args.chunks)):
+        raise TaskManagerError("ledger-record needs --job, --slurm-id and --step or --chunks")
+    if args.chunks:
+        prefix, first, last = args.chunks[0], int(args.chunks[1]), int(args.chunks[2])
+        steps = [
+            {'job': args.job, 'step': f"{prefix}{chunk}.sh", 'slurm_id': args.slurm_id, 'array_index': chunk - first + 1}
+            for chunk in range(first, last + 1)
+        ]
+    else:
+        steps = [{'job': args.job, 'step': args.step, 'slurm_id': args.slurm_id}]
+    for step in steps:
+        step.update(path=args.path, job_type=args.job_type)
+    return steps
+
+def cmd_ledger_record(args):
+    """Handle ledger-record command"""
+    try:
+        if args.from_file:
+            line_parser = argparse.ArgumentParser(prog='ledger-record --from-file')
+            add_record_arguments(line_parser)
+            steps = []
+            with open(args.from_file) as f:
+                for line in f:
+                    if line.strip():
+                        steps.extend(recorded_steps(line_parser.parse_args(line.rstrip('\n').split('\t'))))
+        else:
+            steps = recorded_steps(args)
+    except (OSError, TaskManagerError) as e:
+        print(f"Error: {e}")
+        return 1
+    
+    with JobLedger(args.db) as ledger:
+        ledger.record_submissions(args.workflow, steps)
+    return 0
+
+def cmd_preflight(args):
+    """Handle preflight command"""
+    try:
+        jobs = create_job_parser(args).get_jobs()
+        preflight = Preflight(jobs, max_workers=args.workers)
+        checked = len(preflight.collect_inputs())
+        missing = preflight.run()
+        
+        print(f"=== Preflight ({args.job_file}) ===")
+        print(f"Checked {checked} input files")
+        
+        if missing:
+            print(f"\n❌ {len(missing)} missing:")
+            for item in missing:
+                print(f"  [{item['job']}] {item['kind']}: {item['path']}")
+            return 1
+        
+        print("\n✅ All workflow inputs present")
+        
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    
+    return 0
+
+def cmd_size(args):
+    """Handle size command"""
+    try:
+        config = SlurmConfig(args.config)
+        header = read_gro_header(args.structure)
+        suggested = config.suggest_resources(header['atoms'], args.job_type)
+        box = ' x '.join(f"{value:.3f}" for value in header['box'])
+        
+        print(f"=== Resource Sizing ({args.structure}) ===")
+        print(f"Atoms: {header['atoms']}")
+        print(f"Box: {box} nm")
+        print(f"\nSuggested [{args.job_type.upper()}] resources:")
+        for key, value in suggested.items():
+            print(f"  {key}={value}")
+        
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    
+    return 0
+
+def cmd_estimate_walltime(args):
+    """Handle estimate-walltime command"""
+    estimator = WalltimeEstimator(args.margin)
+    patterns = args.pattern or ['prod_chunk*.log', CHAINED_CHUNK_LOGS]
+    log_files = estimator.find_chunk_logs(args.path, patterns)
+    performance = estimator.collect_performance(log_files)
+    
+    print(f"=== Walltime Estimate ({args.path}/{','.join(patterns)}) ===")
+    print(f"Logs found: {len(log_files)}, completed: {len(performance)}")
+    if not performance:
+        print("❌ No completed runs with a Performance line")
+        return 1
+    
+    time = estimator.estimate(args.chunk_length, log_files)
+    print(f"ns/day: min {min(performance):.2f}, max {max(performance):.2f}")
+    print(f"Suggested TIME for {args.chunk_length:g} ns chunks: {time}")
+    return 0
+
 def cmd_generate_chunks(args):
     """Handle generate-chunks command"""
     try:
@@ -107,9 +562,18 @@ def cmd_generate_chunks(args):
             chunk_length_ns=args.length_ns
         )
         
+        if args.chain:
+            target_ns = args.target_ns or chunker.total_length_ns
+            headers = SlurmConfig(args.config).format_sbatch_headers('production')
+            script = chunker.generate_chain_script(args.path, target_ns, headers, args.template)
+            print(f"Generated chain script: {script} ({chunker.writer.summary()})")
+            print(f"Target: {target_ns:g} ns in {args.path}/target_ns (edit to extend or stop the chain)")
+            print(f"Start with: cd {args.path} && sbatch {Path(script).name}")
+            return 0
+        
         scripts = chunker.generate_chunk_scripts(args.path, args.template)
         
-        print(f"Generated {len(scripts)} chunk scripts:")
+        print(f"Generated {len(scripts)} chunk scripts ({chunker.writer.summary()}):")
         for script in scripts:
             print(f"  {script}")
         
@@ -162,7 +626,7 @@ def cmd_validate_workflow(args):
             return 1
         
         # Parse and validate jobs
-        job_parser = JobParser(args.job_file)
+        job_parser = create_job_parser(args)
         jobs = job_parser.get_jobs()
         
         print(f"=== Workflow Validation ({args.job_file}) ===")
@@ -207,7 +671,7 @@ def main():
             config = SlurmConfig(config_file)  # Pass the file path string, not the object
             
             # Load job configuration  
-            job_parser = JobParser(args.job_file, getattr(args, 'profile', None))
+            job_parser = create_job_parser(args)
             jobs = job_parser.get_jobs()
             
             if not jobs:
@@ -215,26 +679,77 @@ def main():
                 return
             
             # Create batch manager with config object
-            batch_manager = BatchManager(config)  # This should receive the config object
+            batch_manager = BatchManager(config, job_parser.workflow_key, ledger_file(args))
+            
+            execution_mode = getattr(args, 'execution', 'sequential')
+            jobs = plan_incremental(jobs, args, execution_mode)
+            if not jobs:
+                print("All steps are up to date; nothing to submit")
+                return 0
+            output_file = getattr(args, 'output', 'batch_job.sh')
             
-            # Generate script
-            execution_mode = getattr(args, 'execution_mode', 'sequential')
-            script_content = batch_manager.generate_script(jobs, execution_mode)
+            # Array and DAG modes submit from the login node with per-step dependencies
+            if execution_mode in ('array', 'dag', 'pack', 'pilot'):
+                batch_script = batch_manager.generate_batch_script(
+                    jobs, output_file, execution_mode, args.dry_run
+                )
+                print(f"Generated batch script: {batch_script}")
+                if args.dry_run:
+                    print("\n=== Generated Script Content ===")
+                    with open(batch_script, 'r') as f:
+                        print(f.read())
+                else:
+                    print(f"\nTo submit jobs, run: ./{batch_script}")
+                return 0
             
             # Handle dry run or actual file creation
             if args.dry_run:
                 print("Generated batch script: batch_job.sh")
                 print("\n=== Generated Script Content ===")
-                print(script_content)
+                print(batch_manager.generate_script(jobs, execution_mode))
             else:
-                output_file = getattr(args, 'output', 'batch_job.sh')
-                with open(output_file, 'w') as f:
-                    f.write(script_content)
-                
-                # Make executable
-                os.chmod(output_file, 0o755)
+                batch_manager.write_script(jobs, output_file, execution_mode)
                 print(f"Generated batch script: {output_file}")
                 
+        elif args.command == 'submit':
+            return cmd_submit(args)
+            
+        elif args.command == 'validate-workflow':
+            return cmd_validate_workflow(args)
+            
+        elif args.command == 'ledger':
+            return cmd_ledger(args)
+            
+        elif args.command == 'status':
+            return cmd_status(args)
+            
+        elif args.command == 'report':
+            return cmd_report(args)
+            
+        elif args.command == 'ledger-record':
+            return cmd_ledger_record(args)
+            
+        elif args.command == 'plan':
+            return cmd_plan(args)
+            
+        elif args.command == 'enqueue':
+            return cmd_enqueue(args)
+            
+        elif args.command == 'queue-status':
+            return cmd_queue_status(args)
+            
+        elif args.command == 'preflight':
+            return cmd_preflight(args)
+            
+        elif args.command == 'size':
+            return cmd_size(args)
+            
+        elif args.command == 'generate-chunks':
+            return cmd_generate_chunks(args)
+            
+        elif args.command == 'estimate-walltime':
+            return cmd_estimate_walltime(args)
+            
         elif args.command == 'validate-config':
             config_file = getattr(args, 'config', '.slurmparams')
             success = validate_configuration(config_file)  # Pass file path string
@@ -2,20 +2,53 @@
 Enhanced batch job manager with proper SLURM job submission
 """
 
+import asyncio
 import os
+import json
+import inspect
+import itertools
+import shlex
 import subprocess
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+from . import executor, pilot
 from .config import SlurmConfig
 from .job_parser import JobParser
-from .utils import TaskManagerError
+from .submitter import Submitter
+from .dag import WorkflowDAG
+from .chunks import ChunkRange
+from .packing import AllocationPacker
+from .pilot import WorkQueue
+from .production_chunker import CHUNK_OUTPUT_PREFIX
+from .ledger import JobLedger
+from .sizing import read_gro_header, PerformanceModel
+from .walltime import WalltimeEstimator, chunk_log_patterns
+from .utils import (
+    TaskManagerError, SubmissionError, ValidationError, find_missing_paths,
+    parse_slurm_time, format_slurm_time
+)
 
 class BatchManager:
-    def __init__(self, config: SlurmConfig):
-        """Initialize batch manager with SLURM configuration"""
+    # SLURM's default MaxArraySize; array indices must be strictly below it
+    DEFAULT_MAX_ARRAY_SIZE = 1001
+    GROMACS_MODULE = "gromacs/2024.3-gcc-14.2.0"
+    DEFAULT_PILOT_QUEUE = ".taskmanager/queue"
+    # Seconds a pilot keeps free before its walltime
+    PILOT_RESERVE = 300
+    
+    def __init__(self, config: SlurmConfig, workflow: str = "workflow", ledger_file: Optional[str] = None):
+        """Initialize batch manager with SLURM configuration
+        
+        Generated submission scripts record job IDs under the workflow name
+        in ledger_file, if given.
+        """
         if not isinstance(config, SlurmConfig):
             raise TypeError("config must be a SlurmConfig instance")
         self.config = config
+        self.workflow = workflow
+        self.ledger_file = ledger_file
+        # Walltime estimates by (path, log patterns, chunk length, margin)
+        self._walltime_estimates: Dict[Tuple, Optional[str]] = {}
         
     def generate_batch_script(self, jobs: List[Dict[str, Any]], output_file: str = "batch_job.sh", 
                             execution_mode: str = "sequential", dry_run: bool = False) -> str:
@@ -23,12 +56,575 @@ class BatchManager:
         
         if execution_mode == "sequential":
             return self._generate_sequential_batch(jobs, output_file, dry_run)
+        elif execution_mode == "array":
+            return self._generate_array_batch(jobs, output_file, dry_run)
+        elif execution_mode == "dag":
+            return self._generate_dag_batch(jobs, output_file, dry_run)
+        elif execution_mode == "pack":
+            return self._generate_pack_batch(jobs, output_file, dry_run)
+        elif execution_mode == "pilot":
+            return self._generate_pilot_batch(jobs, output_file, dry_run)
         else:
             return self._generate_parallel_batch(jobs, output_file, dry_run)
     
     def _generate_sequential_batch(self, jobs: List[Dict[str, Any]], output_file: str, dry_run: bool) -> str:
         """Generate script that submits jobs with dependencies"""
         
+        def script_lines():
+            yield from self._submission_preamble(jobs, dry_run, "sequential")
+            for job in jobs:
+                yield f"# Job: {job.get('name', 'unknown')}"
+                yield from self._job_step_lines(job)
+            yield from self._submission_footer()
+        
+        return self._write_script(output_file, script_lines())
+    
+    def _generate_array_batch(self, jobs: List[Dict[str, Any]], output_file: str, dry_run: bool) -> str:
+        """Generate script that submits each chunked job as a throttled job array"""
+        
+        script_lines = self._submission_preamble(jobs, dry_run, "array")
+        script_lines.extend([
+            "# Function to submit a chunk range as a job array",
+            "submit_array_step() {",
+            "    local submit_script=\"$1\"",
+            "    local array_spec=\"$2\"",
+            "    local chunk_offset=\"$3\"",
+            "    local dependency=\"$4\"",
+            "",
+            "    local sbatch_cmd=(sbatch --parsable \"--array=$array_spec\" \"--export=ALL,CHUNK_OFFSET=$chunk_offset\")",
+            "    if [[ -n \"$dependency\" ]]; then",
+            "        sbatch_cmd+=(\"--dependency=afterok:$dependency\")",
+            "    fi",
+            "    sbatch_cmd+=(\"$submit_script\")",
+            "",
+            "    if [[ \"$DRY_RUN\" == \"true\" ]]; then",
+            "        log_info \"Would execute: ${sbatch_cmd[*]}\"",
+            "        echo \"fake_job_id_$(date +%s)\"",
+            "    else",
+            "        log_info \"Submitting array: $submit_script ($array_spec)\"",
+            "        local job_id=$(\"${sbatch_cmd[@]}\" | cut -d';' -f1)",
+            "        if [[ -n \"$job_id\" ]]; then",
+            "            log_info \"Submitted array job ID: $job_id\"",
+            "            echo \"$job_id\"",
+            "        else",
+            "            log_error \"Failed to submit $submit_script\"",
+            "            return 1",
+            "        fi",
+            "    fi",
+            "}",
+            ""
+        ])
+        
+        def job_lines():
+            for job in jobs:
+                yield f"# Job: {job.get('name', 'unknown')}"
+                if job.get('is_chunked', False):
+                    yield from self._job_array_lines(job)
+                else:
+                    yield from self._job_step_lines(job)
+            yield from self._submission_footer()
+        
+        return self._write_script(output_file, itertools.chain(script_lines, job_lines()))
+    
+    def _generate_dag_batch(self, jobs: List[Dict[str, Any]], output_file: str, dry_run: bool) -> str:
+        """Generate script that submits the workflow DAG with per-edge afterok dependencies"""
+        
+        steps = self.build_steps(jobs, "dag")
+        step_vars = {step['name']: f"job_id_{i}" for i, step in enumerate(steps)}
+        jobs_by_name = {job.get('name', 'unknown'): job for job in jobs}
+        
+        def script_lines():
+            yield from self._submission_preamble(jobs, dry_run, "dag")
+            current_job = None
+            looped = set()
+            
+            for step in steps:
+                if step['job_name'] in looped:
+                    continue
+                first_step = step['job_name'] != current_job
+                if first_step:
+                    current_job = step['job_name']
+                    yield f"# Job: {current_job}"
+                
+                dependency = ':'.join(f"${{{step_vars[parent]}}}" for parent in step['depends_on'])
+                scripts = jobs_by_name[current_job].get('scripts', [])
+                
+                # A chunk chain is one loop; its last chunk's ID is what children wait for
+                if first_step and self._is_chunk_loop(scripts):
+                    last_var = step_vars[f"{current_job}/{scripts[-1]}"]
+                    yield f"prev_job_id=\"{dependency}\""
+                    yield from self._chunk_loop_lines(current_job, scripts, step['path'], step['job_type'],
+                                                      self._header_key(step['resources']))
+                    yield f"{last_var}=\"$prev_job_id\""
+                    yield ""
+                    looped.add(current_job)
+                    continue
+                
+                script = Path(step['script_path']).name
+                job_var = step_vars[step['name']]
+                yield from [
+                    f"log_info \"Submitting {script}...\"",
+                    f"{job_var}=$(submit_job_step \"{step['script_path']}\" \"{dependency}\" \"{self._header_key(step['resources'])}\")",
+                    f"log_info \"Queued {script} with job ID: ${job_var}\"",
+                    f"record_job --job \"{current_job}\" --step \"{script}\" --slurm-id \"${job_var}\""
+                    f" --path \"{step['path']}\" --job-type \"{step['job_type']}\"",
+                    ""
+                ]
+            
+            yield from self._submission_footer()
+        
+        return self._write_script(output_file, script_lines())
+    
+    def _generate_pack_batch(self, jobs: List[Dict[str, Any]], output_file: str, dry_run: bool) -> str:
+        """Generate script that submits independent jobs packed into shared allocations"""
+        
+        allocations = self.pack_jobs(jobs)
+        script_lines = self._submission_preamble(jobs, dry_run, "pack")
+        script_lines.extend(self._submit_allocation_lines())
+        script_lines.extend([
+            f"log_info \"Packed {len(jobs)} jobs into {len(allocations)} allocations\"",
+            ""
+        ])
+        
+        for i, allocation in enumerate(allocations, start=1):
+            submit_script = f"pack_allocation_{i}.sh"
+            names = ', '.join(item['name'] for item in allocation['items'])
+            script_lines.extend([
+                f"# Allocation {i}: {names}",
+                f"cat > \"{submit_script}\" << 'PACKEOF'",
+                *self._pack_allocation_lines(allocation, i),
+                "PACKEOF",
+                f"job_id=$(submit_allocation \"{submit_script}\")",
+                ""
+            ])
+        
+        script_lines.extend(self._submission_footer())
+        
+        return self._write_script(output_file, script_lines)
+    
+    def _generate_pilot_batch(self, jobs: List[Dict[str, Any]], output_file: str, dry_run: bool) -> str:
+        """Enqueue the workflow's steps and generate script that submits a pilot job to run them
+        
+        The pilot's walltime is TIME of the [pilot] section of .slurmparams
+        or, when that is not set, sized to run the queued steps one chain
+        after another (see pilot_walltime).
+        """
+        
+        queue_dir = self.config.get_job_params('pilot').get('PILOT_QUEUE', self.DEFAULT_PILOT_QUEUE)
+        tasks = self.pilot_tasks(jobs)
+        walltime = self.pilot_walltime(tasks)
+        if dry_run:
+            queued = f"{len(tasks)} steps would be queued in {queue_dir}"
+        else:
+            queued = f"{len(WorkQueue(queue_dir).enqueue_many(tasks))} steps queued in {queue_dir}"
+        
+        script_lines = self._submission_preamble(jobs, dry_run, "pilot")
+        script_lines.extend(self._submit_allocation_lines())
+        script_lines.extend([
+            f"log_info \"{queued}\"",
+            "cat > \"pilot.sh\" << 'PILOTEOF'",
+            *self.pilot_script_lines(queue_dir, walltime),
+            "PILOTEOF",
+            "job_id=$(submit_allocation \"pilot.sh\")",
+            ""
+        ])
+        script_lines.extend(self._submission_footer())
+        
+        return self._write_script(output_file, script_lines)
+    
+    def enqueue_steps(self, jobs: List[Dict[str, Any]], queue_dir: str) -> List[str]:
+        """Add every step of the workflow to a pilot work queue
+        
+        Steps keep the workflow's DAG edges as 'after' dependencies, so they
+        can be enqueued while a pilot is already running. Task names are
+        prefixed with the workflow, so several workflows can share a queue,
+        and steps already pending, running or done are not queued again.
+        Returns the files of the newly queued steps.
+        """
+        return WorkQueue(queue_dir).enqueue_many(self.pilot_tasks(jobs))
+    
+    def pilot_tasks(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Work queue tasks of every step, with the 'seconds' of its job type's TIME"""
+        cores = {job['name']: job['cores'] for job in jobs if 'cores' in job}
+        tasks = []
+        
+        for step in self.build_steps(jobs, "dag"):
+            params = self.config.get_job_params(**step['resources'])
+            task = {
+                'name': f"{self.workflow}:{step['name']}",
+                'path': step['path'],
+                'script': Path(step['script_path']).name,
+                'after': [f"{self.workflow}:{name}" for name in step['depends_on']],
+                'seconds': parse_slurm_time(params.get('TIME', '1-00:00:00'))
+            }
+            if step['job_name'] in cores:
+                task['cores'] = int(cores[step['job_name']])
+            else:
+                task['nodes'] = int(params.get('NODES', 1))
+            tasks.append(task)
+        
+        return tasks
+    
+    def pilot_walltime(self, tasks: List[Dict[str, Any]]) -> int:
+        """Walltime in seconds of a pilot running tasks
+        
+        An explicit [pilot] TIME is used as given; otherwise the pilot gets
+        the longest chain of 'after' dependencies plus PILOT_RESERVE. A
+        pilot in which no task fits is refused, as it would end without
+        running anything.
+        """
+        explicit = self.config.job_configs.get('pilot', {}).get('TIME')
+        if explicit:
+            walltime = parse_slurm_time(explicit)
+        else:
+            finish = {}
+            for task in tasks:
+                finish[task['name']] = task['seconds'] + max((finish.get(name, 0) for name in task['after']), default=0)
+            walltime = max(finish.values(), default=0) + self.PILOT_RESERVE
+        
+        if tasks and not any(task['seconds'] <= walltime - self.PILOT_RESERVE for task in tasks):
+            raise ValidationError(
+                f"No step fits the pilot walltime of {format_slurm_time(walltime)} "
+                f"less {self.PILOT_RESERVE}s reserve; raise TIME in [pilot] or lower the steps' TIME"
+            )
+        return walltime
+    
+    def pilot_script_lines(self, queue_dir: str, walltime: int) -> List[str]:
+        """Batch script of a pilot job pulling steps from queue_dir for walltime seconds"""
+        params = self.config.get_job_params('pilot')
+        idle_timeout = params.get('PILOT_IDLE_TIMEOUT', 300)
+        
+        return [
+            *self.config.format_sbatch_headers('pilot', time=format_slurm_time(walltime)).rstrip('\n').split('\n'),
+            "",
+            "cd \"$SLURM_SUBMIT_DIR\"",
+            "",
+            "# Load modules",
+            "module purge",
+            f"module load {self.GROMACS_MODULE}",
+            "",
+            *self._executor_lines(),
+            "cat > \"$EXECUTOR_DIR/pilot.py\" <<'PYEOF'",
+            inspect.getsource(pilot).rstrip('\n'),
+            "PYEOF",
+            "",
+            "# Walltime from TIME in the [pilot] section of .slurmparams, or sized from the queued steps",
+            f"python3 \"$EXECUTOR_DIR/pilot.py\" \"{queue_dir}\" --walltime {walltime} --reserve {self.PILOT_RESERVE} "
+            f"--idle-timeout {idle_timeout}"
+        ]
+    
+    def _submit_allocation_lines(self) -> List[str]:
+        """Function submitting a self-contained batch script with no dependency"""
+        return [
+            "# Function to submit an allocation script",
+            "submit_allocation() {",
+            "    local submit_script=\"$1\"",
+            "",
+            "    if [[ \"$DRY_RUN\" == \"true\" ]]; then",
+            "        log_info \"Would execute: sbatch --parsable $submit_script\"",
+            "        echo \"fake_job_id_$(date +%s)\"",
+            "    else",
+            "        log_info \"Submitting allocation: $submit_script\"",
+            "        local job_id=$(sbatch --parsable \"$submit_script\" | cut -d';' -f1)",
+            "        if [[ -n \"$job_id\" ]]; then",
+            "            log_info \"Submitted allocation job ID: $job_id\"",
+            "            echo \"$job_id\"",
+            "        else",
+            "            log_error \"Failed to submit $submit_script\"",
+            "            return 1",
+            "        fi",
+            "    fi",
+            "}",
+            ""
+        ]
+    
+    def pack_jobs(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bin-pack independent jobs into allocations of the [PACK] job type
+        
+        Each job is one item: its declared 'cores' (or the cores of its job
+        type) held for its declared 'time' (or the job type's TIME), running
+        its scripts in order.
+        """
+        params = self.config.get_job_params('pack')
+        model = PerformanceModel.from_params(params)
+        max_time = params.get('PACK_MAX_TIME')
+        packer = AllocationPacker(
+            model.cores_per_node,
+            int(params.get('NODES', 1)),
+            parse_slurm_time(max_time) if max_time else None
+        )
+        
+        items = []
+        for job in jobs:
+            if job.get('depends_on'):
+                raise ValidationError(f"Job '{job['name']}' has dependencies; pack mode needs independent jobs")
+            if not job.get('scripts'):
+                continue
+            
+            resources = self._job_resources(job)
+            job_params = self.config.get_job_params(**resources)
+            cores = job.get('cores') or (
+                int(job_params.get('NODES', 1))
+                * int(job_params.get('NTASKS_PER_NODE', 1))
+                * int(job_params.get('CPUS_PER_TASK', 1))
+            )
+            items.append({
+                'name': job['name'],
+                'path': job.get('path', '.'),
+                'scripts': list(job['scripts']),
+                'cores': int(cores),
+                'cpus_per_task': int(job_params.get('CPUS_PER_TASK', 1)),
+                'seconds': parse_slurm_time(job.get('time') or job_params.get('TIME', '1-00:00:00'))
+            })
+        
+        return packer.pack(items)
+    
+    def _pack_allocation_lines(self, allocation: Dict[str, Any], index: int) -> List[str]:
+        """Batch script of one packed allocation, running its jobs through the step executor"""
+        params = self.config.get_job_params('pack')
+        nodes = int(params.get('NODES', 1))
+        headers = self.config.format_sbatch_headers('pack', nodes, time=format_slurm_time(allocation['seconds']))
+        lines = headers.rstrip('\n').split('\n')
+        if 'NTASKS_PER_NODE' not in params:
+            # Inner srun calls need one task slot per core they use
+            lines.append(f"#SBATCH --ntasks-per-node={PerformanceModel.from_params(params).cores_per_node}")
+        
+        manifest = json.dumps([
+            {'name': item['name'], 'scripts': item['scripts'], 'path': item['path'], 'cores': item['cores'],
+             'cpus_per_task': item['cpus_per_task']}
+            for item in allocation['items']
+        ], indent=2)
+        
+        return [
+            *lines,
+            "",
+            "cd \"$SLURM_SUBMIT_DIR\"",
+            "",
+            "# Load modules",
+            "module purge",
+            f"module load {self.GROMACS_MODULE}",
+            "",
+            *self._executor_lines(),
+            f"cat > \"$EXECUTOR_DIR/pack_{index}.json\" <<'MANIFESTEOF'",
+            manifest,
+            "MANIFESTEOF",
+            "# Packed jobs are independent: a failed one does not stop the others",
+            f"python3 \"$EXECUTOR_DIR/executor.py\" \"$EXECUTOR_DIR/pack_{index}.json\" --keep-going"
+        ]
+    
+    def _write_script(self, output_file: str, lines: Iterable[str]) -> str:
+        """Write script lines to an executable file as they are produced"""
+        with open(output_file, 'w') as f:
+            for line in lines:
+                f.write(line)
+                f.write('\n')
+        
+        os.chmod(output_file, 0o755)
+        return output_file
+    
+    @staticmethod
+    def _is_chunk_loop(scripts) -> bool:
+        """Whether a job's scripts are a chunk range that one bash loop can cover"""
+        return isinstance(scripts, ChunkRange) and len(scripts.suffixes) == 1 and len(scripts) > 0
+    
+    def _chunk_loop_lines(self, job_name: str, scripts: ChunkRange, path: str, job_type: str,
+                          header_key: str) -> List[str]:
+        """One loop submitting every chunk after the previous one, starting after $prev_job_id"""
+        first, last = scripts.start, scripts.stop - 1
+        return [
+            f"for (( chunk = {first}; chunk <= {last}; chunk++ )); do",
+            f"    script=\"{scripts.prefix}${{chunk}}{scripts.suffixes[0]}\"",
+            "    log_info \"Submitting $script...\"",
+            f"    job_id=$(submit_job_step \"{path}/$script\" \"$prev_job_id\" \"{header_key}\")",
+            "    if [[ $? -eq 0 ]]; then",
+            "        prev_job_id=\"$job_id\"",
+            "        log_info \"Queued $script with job ID: $job_id\"",
+            f"        record_job --job \"{job_name}\" --step \"$script\" --slurm-id \"$job_id\""
+            f" --path \"{path}\" --job-type \"{job_type}\"",
+            "    else",
+            "        log_error \"Failed to submit $script\"",
+            "        exit 1",
+            "    fi",
+            "done",
+        ]
+    
+    def _job_step_lines(self, job: Dict[str, Any]) -> List[str]:
+        """Submission lines chaining every script of a job with afterok
+        
+        Chunk ranges become a single loop, so the script does not grow with
+        the number of chunks.
+        """
+        resources = self._job_resources(job)
+        header_key = self._header_key(resources)
+        job_type = resources['job_type']
+        path = job.get('path', '.')
+        scripts = job.get('scripts', [])
+        
+        if self._is_chunk_loop(scripts):
+            return [*self._chunk_loop_lines(job.get('name', 'unknown'), scripts, path, job_type, header_key), ""]
+        
+        lines = []
+        for script in job.get('scripts', []):
+            script_path = f"{path}/{script}"
+            lines.extend([
+                f"log_info \"Submitting {script}...\"",
+                f"job_id=$(submit_job_step \"{script_path}\" \"$prev_job_id\" \"{header_key}\")",
+                "if [[ $? -eq 0 ]]; then",
+                "    prev_job_id=\"$job_id\"",
+                f"    log_info \"Queued {script} with job ID: $job_id\"",
+                f"    record_job --job \"{job.get('name', 'unknown')}\" --step \"{script}\" --slurm-id \"$job_id\""
+                f" --path \"{path}\" --job-type \"{job_type}\"",
+                "else",
+                f"    log_error \"Failed to submit {script}\"",
+                "    exit 1",
+                "fi",
+                ""
+            ])
+        
+        return lines
+    
+    def _job_array_lines(self, job: Dict[str, Any]) -> List[str]:
+        """Submission lines for a chunked job as one or more `%1`-throttled arrays
+
+        Each array task checks that the previous chunk left its checkpoint
+        and cancels the remaining tasks if not, as an afterok chain would.
+        """
+        job_name = job.get('name', 'unknown')
+        resources = self._job_resources(job)
+        path = job.get('path', '.')
+        chunk_meta = job.get('chunk_metadata', {})
+        scripts = job.get('scripts', [])
+        script_prefix = chunk_meta.get('script_prefix', 'prod_chunk')
+        outputs = job.get('outputs')
+        output_prefix = outputs.prefix if isinstance(outputs, ChunkRange) else CHUNK_OUTPUT_PREFIX
+        
+        # An incremental plan may start part-way through the chunks
+        if isinstance(scripts, ChunkRange):
+            first_chunk, total_chunks = scripts.start, len(scripts)
+        else:
+            first_chunk, total_chunks = 1, chunk_meta.get('total_chunks', len(scripts))
+        submit_script = f"submit_{job_name}_array.sh"
+        
+        # Array indices must stay below MaxArraySize, so larger chunk counts are
+        # split into several arrays and the wrapper adds CHUNK_OFFSET back
+        max_array_size = int(self.config.get_global_params().get('MAX_ARRAY_SIZE', self.DEFAULT_MAX_ARRAY_SIZE))
+        chunks_per_array = max(max_array_size - 1, 1)
+        
+        lines = [
+            f"cat > \"{submit_script}\" << 'EOF'",
+            *self.config.format_sbatch_headers(**resources).split('\n'),
+            "# Change to job directory",
+            "cd \"$SLURM_SUBMIT_DIR\"",
+            "",
+            "# Load modules",
+            "module purge",
+            f"module load {self.GROMACS_MODULE}",
+            "",
+            "# Map the array index onto the chunk number",
+            "CHUNK_NUM=$(( SLURM_ARRAY_TASK_ID + ${CHUNK_OFFSET:-0} ))",
+            "",
+            "# %1 runs one chunk at a time but, unlike afterok, also after a failed one:",
+            "# without the previous chunk's checkpoint, cancel the rest of the array",
+            "if (( CHUNK_NUM > 1 )); then",
+            f"    PREV_OUTPUT=\"{output_prefix}$(( CHUNK_NUM - 1 ))\"",
+            "    if [[ ! -f \"${PREV_OUTPUT}.cpt\" || ! -f \"${PREV_OUTPUT}.gro\" ]]; then",
+            "        echo \"ERROR: ${PREV_OUTPUT}.cpt or .gro missing; cancelling chunks from $CHUNK_NUM\" >&2",
+            "        scancel \"$SLURM_ARRAY_JOB_ID\"",
+            "        exit 1",
+            "    fi",
+            "fi",
+            f"bash \"{path}/{script_prefix}${{CHUNK_NUM}}.sh\"",
+            "EOF",
+            ""
+        ]
+        
+        for index in range(0, total_chunks, chunks_per_array):
+            count = min(chunks_per_array, total_chunks - index)
+            offset = first_chunk - 1 + index
+            first, last = offset + 1, offset + count
+            lines.extend([
+                f"log_info \"Submitting {job_name} chunks {first}-{last} as array...\"",
+                f"job_id=$(submit_array_step \"{submit_script}\" \"1-{count}%1\" \"{offset}\" \"$prev_job_id\")",
+                "prev_job_id=\"$job_id\"",
+                f"log_info \"Queued {job_name} chunks {first}-{last} with job ID: $job_id\"",
+                f"record_job --job \"{job_name}\" --chunks \"{script_prefix}\" {first} {last} --slurm-id \"$job_id\""
+                f" --path \"{path}\" --job-type \"{resources['job_type']}\"",
+                ""
+            ])
+        
+        return lines
+    
+    def _job_resources(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Arguments for format_sbatch_headers describing one job
+        
+        The atom count comes from an explicit 'atoms' key or the header of the
+        job's 'structure' file. When it is known and AUTO_SIZE is on for the
+        job type, an undeclared node count is left to the sizing model;
+        otherwise it defaults to one node. Chunked jobs get a TIME estimated
+        from completed chunks when enabled.
+        """
+        job_type = job.get('job_type', 'production')
+        atoms = job.get('atoms')
+        structure = job.get('structure')
+        if atoms is None and structure:
+            structure_path = Path(job.get('path', '.')) / structure
+            if structure_path.is_file():
+                atoms = read_gro_header(str(structure_path))['atoms']
+        sized = atoms is not None and self.config.auto_size_enabled(job_type)
+        
+        return {
+            'job_type': job_type,
+            'nodes': job.get('nodes', None if sized else 1),
+            'atoms': atoms,
+            'time': self._estimate_walltime(job)
+        }
+    
+    def _estimate_walltime(self, job: Dict[str, Any]) -> Optional[str]:
+        """Per-chunk TIME from the ns/day of completed chunks, if ESTIMATE_WALLTIME is on
+        
+        Logs are globbed and parsed once per job; later calls reuse the estimate.
+        """
+        params = self.config.get_job_params(job.get('job_type', 'production'))
+        if not job.get('is_chunked', False) or params.get('ESTIMATE_WALLTIME', 'false').lower() not in ('true', 'yes', '1'):
+            return None
+        
+        chunk_length_ns = job.get('chunk_metadata', {}).get('chunk_length_ns', 10)
+        margin = float(job.get('chunk_config', {}).get('walltime_margin', params.get('WALLTIME_MARGIN', 0.25)))
+        patterns = chunk_log_patterns(job)
+        key = (job.get('path', '.'), tuple(patterns), chunk_length_ns, margin)
+        
+        if key not in self._walltime_estimates:
+            estimator = WalltimeEstimator(margin)
+            log_files = estimator.find_chunk_logs(job.get('path', '.'), patterns)
+            self._walltime_estimates[key] = estimator.estimate(chunk_length_ns, log_files)
+        return self._walltime_estimates[key]
+    
+    @staticmethod
+    def _header_key(resources: Dict[str, Any]) -> str:
+        """Key of the sbatch_headers case for a job's resources"""
+        nodes = resources['nodes']
+        key = f"{resources['job_type']}:{'' if nodes is None else nodes}"
+        if resources['atoms'] is not None:
+            key += f":{resources['atoms']}"
+        if resources['time'] is not None:
+            key += f"@{resources['time']}"
+        return key
+    
+    def _submission_footer(self) -> List[str]:
+        """Closing lines shared by submission scripts"""
+        return [
+            "if [[ \"$DRY_RUN\" == \"true\" ]]; then",
+            "    log_info \"Dry run completed. No jobs were actually submitted.\"",
+            "else",
+            "    log_info \"All jobs submitted successfully!\"",
+            "    log_info \"Monitor with: squeue -u $USER\"",
+            "    log_info \"Check logs in: logs/\"",
+            "fi"
+        ]
+    
+    def _submission_preamble(self, jobs: List[Dict[str, Any]], dry_run: bool, execution_mode: str) -> List[str]:
+        """Shared header and helper functions for submission scripts"""
+        
         script_lines = [
             "#!/bin/bash",
             "# SLURM Batch Job Submission Script",
@@ -39,6 +635,8 @@ class BatchManager:
             "# Configuration",
             "DRY_RUN=" + ("true" if dry_run else "false"),
             "VERBOSE=true",
+            f"WORKFLOW={shlex.quote(self.workflow)}",
+            f"LEDGER_DB=\"{self.ledger_file or ''}\"",
             "",
             "# Colors for output",
             "RED='\\033[0;31m'",
@@ -46,16 +644,38 @@ class BatchManager:
             "YELLOW='\\033[1;33m'",
             "NC='\\033[0m' # No Color",
             "",
-            "log_info() { echo -e \"${GREEN}[INFO]${NC} $1\"; }",
-            "log_warn() { echo -e \"${YELLOW}[WARN]${NC} $1\"; }",
-            "log_error() { echo -e \"${RED}[ERROR]${NC} $1\"; }",
+            "# Log to stderr so that job IDs are the only thing captured from stdout",
+            "log_info() { echo -e \"${GREEN}[INFO]${NC} $1\" >&2; }",
+            "log_warn() { echo -e \"${YELLOW}[WARN]${NC} $1\" >&2; }",
+            "log_error() { echo -e \"${RED}[ERROR]${NC} $1\" >&2; }",
+            "",
+            "# Record submitted job IDs in the workflow ledger; submission goes on if this fails.",
+            "# Calls are collected in a file and recorded by one ledger-record run on exit.",
+            "LEDGER_PENDING=\"\"",
+            "record_job() {",
+            "    if [[ -n \"$LEDGER_PENDING\" ]]; then",
+            "        (IFS=$'\\t'; echo \"$*\") >> \"$LEDGER_PENDING\"",
+            "    fi",
+            "}",
+            "flush_ledger() {",
+            "    if [[ -s \"$LEDGER_PENDING\" ]] && ! python3 -m taskmanager ledger-record --db \"$LEDGER_DB\" \\",
+            "            --workflow \"$WORKFLOW\" --from-file \"$LEDGER_PENDING\" > /dev/null; then",
+            "        log_warn \"Could not record submitted jobs in $LEDGER_DB; they are listed in $LEDGER_PENDING\"",
+            "        return 0",
+            "    fi",
+            "    rm -f \"$LEDGER_PENDING\"",
+            "}",
+            "if [[ \"$DRY_RUN\" != \"true\" && -n \"$LEDGER_DB\" ]]; then",
+            "    mkdir -p \"$(dirname \"$LEDGER_DB\")\"",
+            "    LEDGER_PENDING=$(mktemp \"$LEDGER_DB.pending.XXXXXX\") || LEDGER_PENDING=\"\"",
+            "    trap flush_ledger EXIT",
+            "fi",
             "",
             "# Function to submit a job step",
             "submit_job_step() {",
             "    local script_path=\"$1\"",
             "    local dependency=\"$2\"",
-            "    local job_type=\"$3\"",
-            "    local nodes=\"$4\"",
+            "    local header_key=\"$3\"",
             "    ",
             "    if [[ ! -f \"$script_path\" ]]; then",
             "        log_error \"Script not found: $script_path\"",
@@ -67,7 +687,7 @@ class BatchManager:
             "",
             "    # Generate SLURM submission script",
             "    local submit_script=\"submit_$(basename \"$script_path\" .sh).sh\"",
-            "    generate_slurm_script \"$script_path\" \"$submit_script\" \"$job_type\" \"$nodes\"",
+            "    generate_slurm_script \"$script_path\" \"$submit_script\" \"$header_key\"",
             "",
             "    # Build sbatch command",
             "    local sbatch_cmd=\"sbatch\"",
@@ -92,44 +712,59 @@ class BatchManager:
             "    fi",
             "}",
             "",
-            "# Function to generate SLURM wrapper script",
-            "generate_slurm_script() {",
-            "    local original_script=\"$1\"",
-            "    local slurm_script=\"$2\"",
-            "    local job_type=\"$3\"",
-            "    local nodes=\"$4\"",
-            "",
-            "    cat > \"$slurm_script\" << 'EOF'",
+            "# SBATCH headers for each job's resources, rendered from .slurmparams",
+            "sbatch_headers() {",
+            "    case \"$1\" in",
         ]
         
-        # Add SLURM headers using the first job's config
-        first_job = jobs[0] if jobs else {}
-        job_type = first_job.get('job_type', 'production')
-        nodes = first_job.get('nodes', 1)
+        # Render headers per step so each stage gets its own section's resources
+        rendered = set()
+        for job in jobs:
+            resources = self._job_resources(job)
+            header_key = self._header_key(resources)
+            if header_key in rendered:
+                continue
+            rendered.add(header_key)
+            
+            script_lines.extend([
+                f"        \"{header_key}\")",
+                "            cat << 'EOF'",
+                *self.config.format_sbatch_headers(**resources).split('\n'),
+                "EOF",
+                "            ;;",
+            ])
         
-        # Get SLURM headers
-        headers = self.config.format_sbatch_headers(job_type, nodes).split('\n')
-        script_lines.extend(headers)
         script_lines.extend([
+            "        *)",
+            "            log_error \"No SBATCH headers for $1\"",
+            "            return 1",
+            "            ;;",
+            "    esac",
+            "}",
             "",
+            "# Function to generate SLURM wrapper script",
+            "generate_slurm_script() {",
+            "    local original_script=\"$1\"",
+            "    local slurm_script=\"$2\"",
+            "    local header_key=\"$3\"",
+            "",
+            "    sbatch_headers \"$header_key\" > \"$slurm_script\"",
+            "    cat >> \"$slurm_script\" << EOF",
             "# Change to job directory",
-            "cd \"$SLURM_SUBMIT_DIR\"",
+            "cd \"\\$SLURM_SUBMIT_DIR\"",
             "",
             "# Load modules",
             "module purge",
-            "module load gromacs/2024.3-gcc-14.2.0",
+            f"module load {self.GROMACS_MODULE}",
             "",
             "# Execute the actual script",
-            "bash \"$1\"",
+            "bash \"$original_script\"",
             "EOF",
-            "",
-            "    # Replace placeholder with actual script path",
-            "    sed -i \"s|\\$1|$original_script|g\" \"$slurm_script\"",
             "}",
             "",
             "# Main submission logic",
             "echo \"=== SLURM Batch Job Submission ===\"",
-            "echo \"Execution mode: sequential\"",
+            f"echo \"Execution mode: {execution_mode}\"",
             f"echo \"Dry run: {'yes' if dry_run else 'no'}\"",
             "echo",
             "",
@@ -137,47 +772,7 @@ class BatchManager:
             ""
         ])
         
-        # Add job submission commands
-        for job in jobs:
-            job_name = job.get('name', 'unknown')
-            job_type = job.get('job_type', 'production')
-            nodes = job.get('nodes', 1)
-            scripts = job.get('scripts', [])
-            path = job.get('path', '.')
-            
-            script_lines.append(f"# Job: {job_name}")
-            
-            for script in scripts:
-                script_path = f"{path}/{script}"
-                script_lines.extend([
-                    f"log_info \"Submitting {script}...\"",
-                    f"job_id=$(submit_job_step \"{script_path}\" \"$prev_job_id\" \"{job_type}\" \"{nodes}\")",
-                    "if [[ $? -eq 0 ]]; then",
-                    "    prev_job_id=\"$job_id\"",
-                    f"    log_info \"Queued {script} with job ID: $job_id\"",
-                    "else",
-                    f"    log_error \"Failed to submit {script}\"",
-                    "    exit 1",
-                    "fi",
-                    ""
-                ])
-        
-        script_lines.extend([
-            "if [[ \"$DRY_RUN\" == \"true\" ]]; then",
-            "    log_info \"Dry run completed. No jobs were actually submitted.\"",
-            "else",
-            "    log_info \"All jobs submitted successfully!\"",
-            "    log_info \"Monitor with: squeue -u $USER\"",
-            "    log_info \"Check logs in: logs/\"",
-            "fi"
-        ])
-        
-        # Write the batch script
-        with open(output_file, 'w') as f:
-            f.write('\n'.join(script_lines))
-        
-        os.chmod(output_file, 0o755)
-        return output_file
+        return script_lines
     
     def _generate_parallel_batch(self, jobs: List[Dict[str, Any]], output_file: str, dry_run: bool) -> str:
         """Generate script that submits all jobs in parallel"""
@@ -192,27 +787,40 @@ class BatchManager:
             ""
         ]
         
+        # Scripts within a job run in parallel; declared depends_on edges are kept
+        dag = WorkflowDAG(jobs)
+        job_vars = {}
         job_ids = []
-        for i, job in enumerate(jobs):
+        for i, job in enumerate(dag.ordered_jobs()):
             job_name = job.get('name', f'job_{i}')
-            job_type = job.get('job_type', 'production')
-            nodes = job.get('nodes', 1)
             scripts = job.get('scripts', [])
             path = job.get('path', '.')
             
+            parent_vars = [var for parent in dag.parents[job_name] for var in job_vars[parent]]
+            dependency = ""
+            if parent_vars:
+                dependency = " --dependency=afterok:" + ':'.join(f"${{{var}}}" for var in parent_vars)
+            
+            job_vars[job_name] = []
             for script in scripts:
                 script_path = f"{path}/{script}"
                 job_var = f"job_id_{i}_{script.replace('.', '_').replace('-', '_')}"
                 job_ids.append(job_var)
+                job_vars[job_name].append(job_var)
                 
                 if dry_run:
-                    script_lines.append(f"echo \"Would submit: {script_path}\"")
+                    after = f" (after: {', '.join(dag.parents[job_name])})" if parent_vars else ""
+                    script_lines.append(f"echo \"Would submit: {script_path}{after}\"")
                 else:
                     script_lines.extend([
                         f"echo \"Submitting {script_path}...\"",
-                        f"{job_var}=$(sbatch --parsable {script_path})",
+                        f"{job_var}=$(sbatch --parsable{dependency} {script_path})",
                         f"echo \"Job {script}: ${job_var}\""
                     ])
+            
+            # A job without scripts passes its parents' IDs through to its children
+            if not scripts:
+                job_vars[job_name] = parent_vars
         
         if not dry_run:
             script_lines.extend([
@@ -221,28 +829,162 @@ class BatchManager:
                 *[f"echo \"  {job_id}: ${job_id}\"" for job_id in job_ids]
             ])
         
-        with open(output_file, 'w') as f:
-            f.write('\n'.join(script_lines))
-        
-        os.chmod(output_file, 0o755)
-        return output_file
+        return self._write_script(output_file, script_lines)
 
+    def build_steps(self, jobs: List[Dict[str, Any]], execution_mode: str = "sequential") -> List[Dict[str, Any]]:
+        """Flatten jobs into submission steps with afterok dependencies
+        
+        Sequential mode chains every step linearly. DAG mode chains the
+        scripts of each job and starts a job after the last step of every
+        job it depends_on, so independent branches are queued together.
+        """
+        dag = None
+        if execution_mode == "dag":
+            dag = WorkflowDAG(jobs)
+            jobs = dag.ordered_jobs()
+        
+        steps = []
+        prev_steps = []
+        final_steps = {}
+        
+        for job in jobs:
+            job_name = job.get('name', 'unknown')
+            resources = self._job_resources(job)
+            path = job.get('path', '.')
+            
+            if dag is not None:
+                prev_steps = [step for parent in dag.parents[job_name] for step in final_steps[parent]]
+            
+            for script in job.get('scripts', []):
+                step = {
+                    'name': f"{job_name}/{script}",
+                    'job_name': job_name,
+                    'job_type': resources['job_type'],
+                    'nodes': resources['nodes'],
+                    'resources': resources,
+                    'path': path,
+                    'script_path': f"{path}/{script}",
+                    'depends_on': prev_steps
+                }
+                steps.append(step)
+                prev_steps = [step['name']]
+            
+            # A job without scripts passes its parents' steps through to its children
+            final_steps[job_name] = prev_steps
+        
+        return steps
+    
+    def render_step_script(self, step: Dict[str, Any]) -> str:
+        """Render the SLURM wrapper submitted for a single step"""
+        lines = self.config.format_sbatch_headers(**step['resources']).split('\n')
+        lines.extend([
+            "# Change to job directory",
+            "cd \"$SLURM_SUBMIT_DIR\"",
+            "",
+            "# Load modules",
+            "module purge",
+            f"module load {self.GROMACS_MODULE}",
+            "",
+            "# Execute the actual script",
+            f"bash \"{step['script_path']}\"",
+            ""
+        ])
+        return '\n'.join(lines)
+    
+    def prepare_steps(self, jobs: List[Dict[str, Any]], execution_mode: str = "sequential") -> List[Dict[str, Any]]:
+        """Steps with their rendered scripts, after checking every script exists"""
+        steps = self.build_steps(jobs, execution_mode)
+        
+        missing = find_missing_paths([step['script_path'] for step in steps])
+        if missing:
+            raise SubmissionError(f"Scripts not found: {', '.join(missing)}")
+        
+        for step in steps:
+            step['script'] = self.render_step_script(step)
+        return steps
+    
+    def submit(self, jobs: List[Dict[str, Any]], submitter: Optional[Submitter] = None,
+               execution_mode: str = "sequential", ledger: Optional[JobLedger] = None) -> List[Dict[str, Any]]:
+        """Submit jobs directly through sbatch and return steps with their job IDs
+        
+        Submitted steps are recorded in the ledger unless this is a dry run,
+        including those submitted before a failure.
+        """
+        submitter = submitter or Submitter()
+        steps = self.prepare_steps(jobs, execution_mode)
+        job_ids = {}
+        
+        try:
+            submitter.submit_steps(steps, job_ids)
+        finally:
+            submitted = [step for step in steps if step['name'] in job_ids]
+            for step in steps:
+                step['job_id'] = job_ids.get(step['name'])
+                del step['script']
+            if ledger is not None and not submitter.dry_run and submitted:
+                ledger.record_submitted_steps(self.workflow, submitted)
+        
+        return steps
+    
+    async def submit_async(self, jobs: List[Dict[str, Any]], submitter: Optional[Submitter] = None,
+                           execution_mode: str = "sequential", ledger: Optional[JobLedger] = None,
+                           semaphore: Optional[asyncio.Semaphore] = None) -> List[Dict[str, Any]]:
+        """Asynchronous form of submit; steps submitted before a failure are still recorded"""
+        submitter = submitter or Submitter()
+        steps = self.prepare_steps(jobs, execution_mode)
+        job_ids = {}
+        
+        try:
+            await submitter.submit_steps_async(steps, semaphore, job_ids)
+        finally:
+            submitted = [step for step in steps if step['name'] in job_ids]
+            for step in steps:
+                step['job_id'] = job_ids.get(step['name'])
+                del step['script']
+            if ledger is not None and not submitter.dry_run and submitted:
+                ledger.record_submitted_steps(self.workflow, submitted)
+        
+        return steps
+    
+    @staticmethod
+    async def submit_many_async(workflows: List[Tuple['BatchManager', List[Dict[str, Any]]]],
+                                submitter: Optional[Submitter] = None, execution_mode: str = "sequential",
+                                ledger: Optional[JobLedger] = None, max_concurrent: int = 16) -> List[Any]:
+        """Submit several workflows at once, sharing a bound on concurrent sbatch calls
+        
+        Each workflow keeps its own dependency order while independent
+        workflows progress in parallel. Returns, per workflow, its submitted
+        steps or the exception that stopped it.
+        """
+        submitter = submitter or Submitter()
+        semaphore = asyncio.Semaphore(max_concurrent)
+        return await asyncio.gather(
+            *(manager.submit_async(jobs, submitter, execution_mode, ledger, semaphore) for manager, jobs in workflows),
+            return_exceptions=True
+        )
+    
     def generate_script(self, jobs: List[Dict[str, Any]], execution_mode: str = "sequential") -> str:
         """Generate batch script that executes jobs directly (not submits them)"""
-        script_parts = []
-        
+        return '\n'.join(self._workflow_script_lines(jobs, execution_mode))
+    
+    def write_script(self, jobs: List[Dict[str, Any]], output_file: str, execution_mode: str = "sequential") -> str:
+        """Stream the script of generate_script to an executable file"""
+        return self._write_script(output_file, self._workflow_script_lines(jobs, execution_mode))
+    
+    def _workflow_script_lines(self, jobs: List[Dict[str, Any]], execution_mode: str) -> Iterable[str]:
+        """Lines of the in-allocation workflow script; chunk ranges run as loops"""
         # Add SLURM headers for the workflow job
-        script_parts.extend([
+        yield from [
             "#!/bin/bash",
             "",
             "# SLURM directives for the workflow job"
-        ])
+        ]
         
         # Add SLURM headers
         sbatch_options = self.config.format_sbatch_options('workflow')
-        script_parts.extend([f"#SBATCH {opt}" for opt in sbatch_options])
+        yield from [f"#SBATCH {opt}" for opt in sbatch_options]
         
-        script_parts.extend([
+        yield from [
             "",
             "# Generated SLURM workflow script",
             f"# Configuration: {self.config.config_file}",
@@ -291,15 +1033,16 @@ class BatchManager:
             "    echo",
             "}",
             "",
+            *(self._executor_lines() if execution_mode == "parallel" else []),
             "# Workflow execution starts here",
             "echo \"Starting workflow execution...\"",
-            "echo \"Mode: $execution_mode\"",
+            f"echo \"Mode: {execution_mode}\"",
             "echo \"Node: $SLURM_JOB_NODELIST\"",
             "echo \"Job ID: $SLURM_JOB_ID\"",
             "echo \"Working directory: $(pwd)\"",
             "echo",
             ""
-        ])
+        ]
         
         # Process each job
         for job_idx, job in enumerate(jobs):
@@ -310,9 +1053,7 @@ class BatchManager:
             if not scripts:
                 continue
             
-            script_parts.extend([
-                f"# === JOB {job_idx + 1}: {job_name.upper()} ===",
-            ])
+            yield f"# === JOB {job_idx + 1}: {job_name.upper()} ==="
             
             # Add chunking info if applicable
             if job.get('is_chunked', False):
@@ -320,53 +1061,101 @@ class BatchManager:
                 total_chunks = chunk_meta.get('total_chunks', 1)
                 chunk_length = chunk_meta.get('chunk_length_ns', 1)
                 total_time = total_chunks * chunk_length
-                script_parts.append(f"# Chunked simulation: {total_chunks} chunks × {chunk_length} ns = {total_time} ns total")
+                yield f"# Chunked simulation: {total_chunks} chunks × {chunk_length} ns = {total_time} ns total"
             
-            script_parts.append("")
+            yield ""
+            
+            if self._is_chunk_loop(scripts):
+                yield from self._chunk_execution_lines(job, execution_mode, job_idx)
+                yield ""
+                continue
             
             # Execute job scripts
             for i, script in enumerate(scripts):
                 step_name = f"{job_name}_{script.replace('.sh', '')}"
                 
                 if execution_mode == "sequential":
-                    script_parts.extend([
+                    yield from [
                         f"echo \"Step {i+1}/{len(scripts)}: {script}\"",
                         f"execute_job_step \"{step_name}\" \"{script}\" \"{job_path}\"",
                         ""
-                    ])
+                    ]
                 elif execution_mode == "parallel":
-                    # For parallel execution, run in background
-                    script_parts.extend([
-                        f"echo \"Step {i+1}/{len(scripts)}: {script} (parallel)\"",
-                        f"execute_job_step \"{step_name}\" \"{script}\" \"{job_path}\" &",
-                        f"pids+=($!)",
-                        ""
-                    ])
+                    yield f"echo \"Step {i+1}/{len(scripts)}: {script} (parallel)\""
             
-            # Wait for parallel jobs to complete
+            # Run the stage through the executor; the next job starts once all its steps are done
             if execution_mode == "parallel":
-                script_parts.extend([
-                    "# Wait for all parallel jobs in this stage to complete",
-                    "for pid in \"${pids[@]}\"; do",
-                    "    wait $pid",
-                    "    if [[ $? -ne 0 ]]; then",
-                    "        echo \"Parallel job failed\"",
-                    "        exit 1",
-                    "    fi",
-                    "done",
-                    "pids=()",
-                    ""
+                yield from self._stage_lines(job_name, job_idx, [
+                    {
+                        'name': f"{job_name}_{script.replace('.sh', '')}",
+                        'script': script,
+                        'path': job_path,
+                        'nodes': int(job.get('nodes', 1))
+                    }
+                    for script in scripts
                 ])
             
-            script_parts.append("")
+            yield ""
         
         # Add completion message
-        script_parts.extend([
+        yield from [
             "echo \"========================================\"",
             "echo \"All workflow steps completed successfully!\"", 
             "echo \"Completion time: $(date)\"",
             "echo \"========================================\"",
             ""
-        ])
+        ]
+    
+    def _chunk_execution_lines(self, job: Dict[str, Any], execution_mode: str, job_idx: int) -> List[str]:
+        """Run a chunk range in the workflow job with one loop or one manifest entry"""
+        job_name = job['name']
+        job_path = job.get('path', '.')
+        scripts = job['scripts']
+        first, last = scripts.start, scripts.stop - 1
+        script = f"{scripts.prefix}{{chunk}}{scripts.suffixes[0]}"
+        step_name = f"{job_name}_{script.replace('.sh', '')}"
         
-        return '\n'.join(script_parts)
\ No newline at end of file
+        if execution_mode == "parallel":
+            return [
+                f"echo \"Steps {first}-{last}: {scripts.prefix}{{{first}..{last}}}{scripts.suffixes[0]} (parallel)\"",
+                *self._stage_lines(job_name, job_idx, [{
+                    'name': step_name,
+                    'script': script,
+                    'path': job_path,
+                    'nodes': int(job.get('nodes', 1)),
+                    'chunks': [first, last]
+                }])
+            ]
+        
+        bash_script = script.replace('{chunk}', '${chunk}')
+        return [
+            f"for (( chunk = {first}; chunk <= {last}; chunk++ )); do",
+            f"    echo \"Step $(( chunk - {first - 1} ))/{last - first + 1}: {bash_script}\"",
+            f"    execute_job_step \"{step_name.replace('{chunk}', '${chunk}')}\" \"{bash_script}\" \"{job_path}\"",
+            "done",
+        ]
+    
+    def _stage_lines(self, job_name: str, job_idx: int, manifest: List[Dict[str, Any]]) -> List[str]:
+        """Write a stage manifest and run it through the embedded executor"""
+        return [
+            f"cat > \"$EXECUTOR_DIR/stage_{job_idx + 1}.json\" <<'EOF'",
+            json.dumps(manifest, indent=2),
+            "EOF",
+            f"if ! python3 \"$EXECUTOR_DIR/executor.py\" \"$EXECUTOR_DIR/stage_{job_idx + 1}.json\"; then",
+            f"    echo \"✗ Stage {job_name} failed\"",
+            "    exit 1",
+            "fi",
+            ""
+        ]
+    
+    def _executor_lines(self) -> List[str]:
+        """Write the step executor to a temporary directory of the workflow job"""
+        return [
+            "# Step executor: runs each stage's steps on disjoint subsets of the allocated nodes",
+            "EXECUTOR_DIR=$(mktemp -d)",
+            "trap 'rm -rf \"$EXECUTOR_DIR\"' EXIT",
+            "cat > \"$EXECUTOR_DIR/executor.py\" <<'PYEOF'",
+            inspect.getsource(executor).rstrip('\n'),
+            "PYEOF",
+            ""
+        ]
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Lazy chunk name sequences for chunked production jobs
+"""
+
+from collections.abc import Sequence
+from typing import Tuple
+
+
+class ChunkRange(Sequence):
+    """Sequence of per-chunk file names computed on demand
+    
+    Covers chunks ``start`` to ``stop - 1`` (half-open, like ``range``) and
+    yields ``f"{prefix}{chunk}{suffix}"`` for every suffix of every chunk, so
+    a 10k-chunk job costs a few integers instead of 10k strings.
+    """
+    
+    __slots__ = ('prefix', 'start', 'stop', 'suffixes')
+    
+    def __init__(self, prefix: str, start: int, stop: int, suffixes: Tuple[str, ...] = ('.sh',)):
+        self.prefix = prefix
+        self.start = start
+        self.stop = max(stop, start)
+        self.suffixes = tuple(suffixes)
+    
+    @property
+    def chunk_numbers(self) -> range:
+        """Chunk numbers covered by this range"""
+        return range(self.start, self.stop)
+    
+    def __len__(self) -> int:
+        return (self.stop - self.start) * len(self.suffixes)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            first, last, step = index.indices(len(self))
+            if step == 1 and len(self.suffixes) == 1:
+                return ChunkRange(self.prefix, self.start + first, self.start + max(last, first), self.suffixes)
+            return [self[i] for i in range(first, last, step)]
+        
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ChunkRange index out of range")
+        
+        chunk, suffix_idx = divmod(index, len(self.suffixes))
+        return f"{self.prefix}{self.start + chunk}{self.suffixes[suffix_idx]}"
+    
+    def __iter__(self):
+        for chunk in self.chunk_numbers:
+            for suffix in self.suffixes:
+                yield f"{self.prefix}{chunk}{suffix}"
+    
+    def __contains__(self, name) -> bool:
+        if not isinstance(name, str) or not name.startswith(self.prefix):
+            return False
+        for suffix in self.suffixes:
+            if suffix and not name.endswith(suffix):
+                continue
+            number = name[len(self.prefix):len(name) - len(suffix)]
+            if number.isdigit() and int(number) in self.chunk_numbers and str(int(number)) == number:
+                return True
+        return False
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ChunkRange):
+            if len(self) == 0 and len(other) == 0:
+                return True
+            return (self.prefix, self.start, self.stop, self.suffixes) == \
+                   (other.prefix, other.start, other.stop, other.suffixes)
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return f"ChunkRange({self.prefix!r}, {self.start}, {self.stop}, {self.suffixes!r})"
@@ -1,5 +1,6 @@
 import re
 from pathlib import Path
+from .sizing import PerformanceModel
 from .utils import ConfigurationError
 
 class SlurmConfig:
@@ -12,17 +13,66 @@ class SlurmConfig:
         'ERROR_PATTERN': 'TASKMANAGER.%A_%a.%N.err'
     }
 
+    # Keys consumed by taskmanager itself and never forwarded to sbatch
+    INTERNAL_KEYS = {
+        'OUTPUT_DIR', 'MAX_ARRAY_SIZE',
+        'AUTO_SIZE', 'CORES_PER_NODE', 'ATOMS_PER_CORE', 'MEM_PER_ATOM_KB', 'MEM_BASE_MB',
+        'ESTIMATE_WALLTIME', 'WALLTIME_MARGIN', 'PACK_MAX_TIME',
+        'PILOT_QUEUE', 'PILOT_IDLE_TIMEOUT', 'QUEUE_WAIT', 'QUEUE_WAIT_PER_NODE',
+    }
+
+    # sbatch flag for each key; keys not listed map to --lower-hyphen-case
+    SBATCH_FLAGS = {
+        'OUTPUT_PATTERN': 'output',
+        'ERROR_PATTERN': 'error',
+        'JOB_NAME': 'job-name',
+        'MEM_PER_CPU': 'mem-per-cpu',
+        'NTASKS_PER_NODE': 'ntasks-per-node',
+        'NTASKS_PER_CORE': 'ntasks-per-core',
+        'CPUS_PER_TASK': 'cpus-per-task',
+        'GRES': 'gres',
+    }
+
+    # Keys whose value is a file name placed under OUTPUT_DIR
+    LOG_PATTERN_KEYS = {'OUTPUT_PATTERN', 'ERROR_PATTERN'}
+
     def __init__(self, config_file):
         """Initialize SLURM configuration"""
         self.config_file = Path(config_file)
         self.global_params = {}
         self.job_configs = {}
+        self._options_cache = {}
+        self._headers_cache = {}
+        self._file_signature = None
         
         if not self.config_file.exists():
             print(f"Created default configuration: {self.config_file}")
             self._create_default_config()
         
         self._load_config()
+        self._file_signature = self._stat_signature()
+
+    def _stat_signature(self):
+        """(mtime, size) of the config file, or None if it is gone"""
+        try:
+            stat = self.config_file.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh_if_changed(self):
+        """Reload configuration and drop rendered headers if the file changed on disk"""
+        signature = self._stat_signature()
+        if signature == self._file_signature:
+            return
+        
+        self._file_signature = signature
+        self._options_cache.clear()
+        self._headers_cache.clear()
+        if signature is not None:
+            self.global_params = {}
+            self.job_configs = {}
+            self._load_config()
 
     def _create_default_config(self):
         """Create default configuration file"""
@@ -80,59 +130,93 @@ class SlurmConfig:
                 return True
         return False
 
-    def get_job_params(self, job_type, nodes=None):
-        """Get parameters for specific job type"""
+    def get_job_params(self, job_type, nodes=None, atoms=None, time=None):
+        """Get parameters for specific job type
+        
+        With AUTO_SIZE=true and an atom count, resources not set explicitly in
+        the job type's section are filled from the partition performance model.
+        An explicit time (e.g. a walltime estimate) replaces TIME.
+        """
         params = self.global_params.copy()
+        section = self.job_configs.get(job_type.lower(), {})
+        params.update(section)
         
-        if job_type.lower() in self.job_configs:
-            params.update(self.job_configs[job_type.lower()])
+        if atoms is not None and self._auto_size_enabled(params):
+            suggested = self.suggest_resources(atoms, job_type)
+            for key, value in suggested.items():
+                if key not in section:
+                    params[key] = value
             
         if nodes is not None:
             params['NODES'] = str(nodes)
+        
+        if time is not None:
+            params['TIME'] = time
             
         return params
 
-    def format_sbatch_options(self, job_type, nodes=None):
+    def _auto_size_enabled(self, params):
+        """Whether AUTO_SIZE is switched on for these parameters"""
+        return params.get('AUTO_SIZE', 'false').lower() in ('true', 'yes', '1')
+
+    def auto_size_enabled(self, job_type):
+        """Whether jobs of this type are sized from their atom count"""
+        params = self.global_params.copy()
+        params.update(self.job_configs.get(job_type.lower(), {}))
+        return self._auto_size_enabled(params)
+
+    def suggest_resources(self, atoms, job_type='production'):
+        """Suggest per-job resources for a system of the given size"""
+        params = self.global_params.copy()
+        params.update(self.job_configs.get(job_type.lower(), {}))
+        model = PerformanceModel.from_params(params)
+        return model.suggest(atoms, int(params.get('CPUS_PER_TASK', 1)))
+
+    def format_sbatch_options(self, job_type, nodes=None, atoms=None, time=None):
         """Format parameters as SBATCH options"""
-        params = self.get_job_params(job_type, nodes)
-        options = []
-        
-        for key, value in params.items():
-            if key == 'OUTPUT_DIR':
-                continue
-            elif key == 'OUTPUT_PATTERN':
-                options.append(f"--output={params.get('OUTPUT_DIR', 'logs')}/{value}")
-            elif key == 'ERROR_PATTERN':
-                options.append(f"--error={params.get('OUTPUT_DIR', 'logs')}/{value}")
-            elif key == 'JOB_NAME':
-                options.append(f"--job-name={value}")
-            elif key == 'MEM_PER_CPU':
-                options.append(f"--mem-per-cpu={value}")
-            elif key == 'NTASKS_PER_NODE':
-                options.append(f"--ntasks-per-node={value}")
-            elif key == 'NTASKS_PER_CORE':
-                options.append(f"--ntasks-per-core={value}")
-            elif key == 'CPUS_PER_TASK':
-                options.append(f"--cpus-per-task={value}")
-            elif key == 'GRES':
-                options.append(f"--gres={value}")
-            else:
-                # Convert underscore to hyphen for SLURM compatibility
-                slurm_key = key.lower().replace('_', '-')
-                options.append(f"--{slurm_key}={value}")
-                
-        return options
+        return list(self._render_options(job_type, nodes, atoms, time))
 
-    def format_sbatch_headers(self, job_type, nodes=None):
+    def format_sbatch_headers(self, job_type, nodes=None, atoms=None, time=None):
         """Format complete SBATCH headers as strings"""
-        options = self.format_sbatch_options(job_type, nodes)
-        headers = ["#!/bin/bash", "", "# SLURM job parameters"]
+        key = self._cache_key(job_type, nodes, atoms, time)
+        headers = self._headers_cache.get(key)
         
-        for option in options:
-            headers.append(f"#SBATCH {option}")
+        if headers is None:
+            lines = ["#!/bin/bash", "", "# SLURM job parameters"]
+            lines.extend(f"#SBATCH {option}" for option in self._render_options(job_type, nodes, atoms, time))
+            lines.append("")
+            headers = "\n".join(lines)
+            self._headers_cache[key] = headers
         
-        headers.append("")
-        return "\n".join(headers)
+        return headers
+
+    def _cache_key(self, job_type, nodes, atoms=None, time=None):
+        """Cache key for rendered options, checking the file for changes first"""
+        self._refresh_if_changed()
+        return (job_type.lower(), None if nodes is None else str(nodes), atoms, time)
+
+    def _render_options(self, job_type, nodes, atoms=None, time=None):
+        """Render SBATCH options once per (job_type, nodes, atoms, time)"""
+        key = self._cache_key(job_type, nodes, atoms, time)
+        options = self._options_cache.get(key)
+        
+        if options is None:
+            params = self.get_job_params(job_type, nodes, atoms, time)
+            output_dir = params.get('OUTPUT_DIR', 'logs')
+            rendered = []
+            
+            for param, value in params.items():
+                if param in self.INTERNAL_KEYS:
+                    continue
+                flag = self.SBATCH_FLAGS.get(param) or param.lower().replace('_', '-')
+                if param in self.LOG_PATTERN_KEYS:
+                    value = f"{output_dir}/{value}"
+                rendered.append(f"--{flag}={value}")
+            
+            options = tuple(rendered)
+            self._options_cache[key] = options
+        
+        return options
 
     def validate_config(self):
         """Validate configuration parameters"""
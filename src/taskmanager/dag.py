@@ -0,0 +1,68 @@
+"""
+Workflow dependency graph built from job depends_on declarations
+"""
+
+from typing import List, Dict, Any
+from .utils import ValidationError
+
+
+class WorkflowDAG:
+    """Directed acyclic graph of workflow jobs"""
+    
+    def __init__(self, jobs: List[Dict[str, Any]]):
+        self.jobs = {}
+        self.parents = {}
+        
+        for job in jobs:
+            name = job.get('name')
+            if name in self.jobs:
+                raise ValidationError(f"Duplicate job name: {name}")
+            self.jobs[name] = job
+            self.parents[name] = self._normalize_depends_on(job.get('depends_on'))
+        
+        for name, parents in self.parents.items():
+            for parent in parents:
+                if parent not in self.jobs:
+                    raise ValidationError(f"Job {name} depends on unknown job: {parent}")
+        
+        self.children = {name: [] for name in self.jobs}
+        for name, parents in self.parents.items():
+            for parent in parents:
+                self.children[parent].append(name)
+    
+    @staticmethod
+    def _normalize_depends_on(depends_on) -> List[str]:
+        """Accept a single job name or a list of names"""
+        if not depends_on:
+            return []
+        if isinstance(depends_on, str):
+            return [depends_on]
+        return list(depends_on)
+    
+    def roots(self) -> List[str]:
+        """Jobs without dependencies, in declaration order"""
+        return [name for name, parents in self.parents.items() if not parents]
+    
+    def topological_order(self) -> List[str]:
+        """Order jobs so that parents precede children (stable w.r.t. declaration)"""
+        remaining = {name: len(parents) for name, parents in self.parents.items()}
+        ready = self.roots()
+        order = []
+        
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for child in self.children[name]:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+        
+        if len(order) != len(self.jobs):
+            cyclic = [name for name in self.jobs if name not in order]
+            raise ValidationError(f"Dependency cycle between jobs: {', '.join(cyclic)}")
+        
+        return order
+    
+    def ordered_jobs(self) -> List[Dict[str, Any]]:
+        """Job dicts in topological order"""
+        return [self.jobs[name] for name in self.topological_order()]
@@ -2,10 +2,11 @@
 Equilibration script generator for existing MDP files - optimized for modelbound structure
 """
 
-import os
 import re
 from pathlib import Path
 from typing import List, Dict, Any, Optional
+from .mdrun import MDRUN_ARGS, mdrun_setup
+from .writer import BulkWriter
 
 
 class EquilibrationGenerator:
@@ -13,6 +14,7 @@ class EquilibrationGenerator:
     
     def __init__(self, mdp_directory: str = "modelbound"):
         self.mdp_directory = Path(mdp_directory)
+        self.writer = BulkWriter()
         self.discovered_mdps = self.discover_mdp_files()
     
     def discover_mdp_files(self) -> Dict[str, List[str]]:
@@ -102,15 +104,24 @@ class EquilibrationGenerator:
             return True
         
         if overwrite:
-            # Backup existing file
-            backup_path = script_path.with_suffix('.sh.bak')
-            script_path.rename(backup_path)
-            print(f"Backed up existing script to {backup_path}")
+            # Backed up in _write_script unless the content is unchanged
             return True
         
         print(f"Skipping {script_path.name} (already exists)")
         return False
     
+    def _write_script(self, script_path: Path, script_content: str):
+        """Write a script, backing up an existing script with different content"""
+        if script_path.exists() and not self.writer.unchanged(script_path, script_content):
+            backup_path = script_path.with_suffix('.sh.bak')
+            script_path.rename(backup_path)
+            print(f"Backed up existing script to {backup_path}")
+        
+        if self.writer.write(script_path, script_content):
+            print(f"Generated {script_path.name}")
+        else:
+            print(f"Unchanged {script_path.name}")
+    
     def _generate_minimization_script(self, mdp_file: str, script_name: str, output_path: Path):
         """Generate minimization script for specific MDP file"""
         
@@ -136,9 +147,10 @@ done
 echo "Generating TPR file for steepest descent..."
 gmx grompp -f {mdp_file} -c step5_input.gro -p topol.top -o step6.0_steep.tpr -maxwarn 1
 
+{mdrun_setup(dynamics=False, thread_mpi=True)}
 # Run minimization
 echo "Running steepest descent minimization..."
-gmx mdrun -v -deffnm step6.0_steep
+gmx mdrun -v -deffnm step6.0_steep {MDRUN_ARGS}
 
 # Check convergence
 if gmx check -f step6.0_steep.log 2>/dev/null | grep -q "converged"; then
@@ -186,9 +198,10 @@ fi
 echo "Generating TPR file for conjugate gradient..."
 gmx grompp -f {mdp_file} -c step6.0_steep.gro -p topol.top -o step6.0_cg.tpr -maxwarn 1
 
+{mdrun_setup(dynamics=False, thread_mpi=True)}
 # Run minimization
 echo "Running conjugate gradient minimization..."
-gmx mdrun -v -deffnm step6.0_cg
+gmx mdrun -v -deffnm step6.0_cg {MDRUN_ARGS}
 
 # Check final energy
 echo "Final potential energy:"
@@ -207,12 +220,7 @@ echo "Output: step6.0_cg.gro, step6.0_cg.edr, step6.0_cg.log"
 echo "System ready for equilibration"
 """
         
-        script_path = output_path / script_name
-        with open(script_path, 'w') as f:
-            f.write(script_content)
-        os.chmod(script_path, 0o755)
-        
-        print(f"Generated {script_name}")
+        self._write_script(output_path / script_name, script_content)
     
     def _generate_equilibration_script(self, mdp_file: str, stage_num: int, script_name: str, output_path: Path):
         """Generate equilibration script for specific stage"""
@@ -265,9 +273,10 @@ if [[ ! -f "{output_prefix}.tpr" ]]; then
     exit 1
 fi
 
+{mdrun_setup(thread_mpi=True)}
 # Run equilibration
 echo "Running stage {stage_num} equilibration ({stage_info['duration']}, {stage_info['ensemble']})..."
-gmx mdrun -v -deffnm {output_prefix}
+gmx mdrun -v -deffnm {output_prefix} {MDRUN_ARGS}
 
 # Verify output
 if [[ ! -f "{output_prefix}.gro" ]]; then
@@ -305,12 +314,7 @@ echo "Stage {stage_num} equilibration completed successfully"
 echo "Output: {output_prefix}.gro, {output_prefix}.cpt, {output_prefix}.edr"
 """
         
-        script_path = output_path / script_name
-        with open(script_path, 'w') as f:
-            f.write(script_content)
-        os.chmod(script_path, 0o755)
-        
-        print(f"Generated {script_name}")
+        self._write_script(output_path / script_name, script_content)
     
     def _analyze_mdp_stage(self, mdp_file: str) -> Dict[str, str]:
         """Analyze MDP file to extract stage information"""
@@ -0,0 +1,233 @@
+"""
+In-allocation step executor
+
+Runs the steps of one workflow stage inside a SLURM allocation, giving each
+step its own subset of the allocated nodes, or cores on a shared node for
+steps that declare 'cores', and queueing steps that do not fit.
+Only the standard library is used: generated workflow scripts embed this
+module's source and run it with python3 on the batch host.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+
+
+def expand_nodelist(nodelist=None, runner=subprocess.run):
+    """Host names of a SLURM nodelist, via `scontrol show hostnames`"""
+    nodelist = nodelist or os.environ.get('SLURM_JOB_NODELIST', '')
+    if not nodelist:
+        return [os.uname().nodename]
+
+    try:
+        result = runner(['scontrol', 'show', 'hostnames', nodelist],
+                        capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        # Without scontrol only plain comma-separated lists can be expanded
+        return [host for host in nodelist.split(',') if host]
+    return result.stdout.split()
+
+
+def cpus_on_node():
+    """Cores per node of the allocation, or of this host outside SLURM"""
+    cpus = os.environ.get('SLURM_CPUS_ON_NODE', '')
+    return int(cpus) if cpus.isdigit() else (os.cpu_count() or 1)
+
+
+class StepExecutor:
+    """Runs steps on disjoint node or core subsets of the allocation"""
+
+    def __init__(self, nodes, cores_per_node=None, poll_interval=1.0, popen=subprocess.Popen, clock=time.monotonic):
+        self.nodes = list(nodes)
+        self.cores_per_node = cores_per_node or cpus_on_node()
+        self.poll_interval = poll_interval
+        self.popen = popen
+        self.clock = clock
+
+    def allocate(self, step, free):
+        """Cores taken on each node by a step, or None if it does not fit now
+
+        Steps declaring 'cores' share a node with others; all other steps
+        take 'nodes' whole, idle nodes.
+        """
+        if 'cores' in step:
+            cores = int(step['cores'])
+            for node, available in free.items():
+                if available >= cores:
+                    return {node: cores}
+            return None
+
+        idle = [node for node, available in free.items() if available == self.cores_per_node]
+        needed = int(step.get('nodes', 1))
+        if needed > len(idle):
+            return None
+        return {node: self.cores_per_node for node in idle[:needed]}
+
+    def fits_allocation(self, step):
+        """Whether the step could ever run in this allocation"""
+        if 'cores' in step:
+            return int(step['cores']) <= self.cores_per_node
+        return int(step.get('nodes', 1)) <= len(self.nodes)
+
+    def step_env(self, assigned, cores=None, cpus_per_task=None):
+        """Environment describing a step's share of the allocation
+
+        SLURM's node variables are narrowed to the step's nodes, which srun
+        does not enforce by itself: srun calls must pass
+        --nodelist="$TASKMANAGER_NODELIST" --exact, as the mdrun launcher does.
+        A step of 'cores' runs cores / cpus_per_task tasks on its node.
+        """
+        env = dict(os.environ)
+        nodelist = ','.join(assigned)
+        tasks_per_node = env.get('SLURM_NTASKS_PER_NODE', '').split('(')[0]
+        cpus = str(cpus_per_task or env.get('SLURM_CPUS_PER_TASK', ''))
+        cpus_per_task = int(cpus) if cpus.isdigit() and int(cpus) > 0 else 1
+
+        env.update({
+            'SLURM_JOB_NODELIST': nodelist,
+            'SLURM_NODELIST': nodelist,
+            'SLURM_NNODES': str(len(assigned)),
+            'SLURM_JOB_NUM_NODES': str(len(assigned)),
+            'TASKMANAGER_NODELIST': nodelist,
+        })
+        if cores is not None:
+            env['SLURM_NTASKS'] = str(max(1, cores // cpus_per_task))
+            env['SLURM_NPROCS'] = env['SLURM_NTASKS']
+            env['SLURM_NTASKS_PER_NODE'] = env['SLURM_NTASKS']
+            env['SLURM_CPUS_PER_TASK'] = str(cpus_per_task)
+        elif tasks_per_node.isdigit():
+            env['SLURM_NTASKS'] = str(len(assigned) * int(tasks_per_node))
+            env['SLURM_NPROCS'] = env['SLURM_NTASKS']
+        return env
+
+    def launch(self, step, assigned):
+        """Start a step in its working directory
+
+        A step runs one 'script', or its 'scripts' in order, stopping at the
+        first that fails.
+        """
+        scripts = step.get('scripts') or [step['script']]
+        command = ['bash', '-c', 'set -e; for script in "$@"; do bash "$script"; done', step['name'], *scripts]
+        cores = int(step['cores']) if 'cores' in step else None
+        env = self.step_env(list(assigned), cores, step.get('cpus_per_task'))
+
+        print(f"[executor] start {step['name']} on {','.join(assigned)}", flush=True)
+        return self.popen(command, cwd=step.get('path') or '.', env=env)
+
+    def run(self, steps, keep_going=False):
+        """Run all steps, at most as many at once as the nodes allow
+
+        Steps start in order, but a later step that fits the free nodes is
+        started ahead of an earlier one that does not. After a failure no
+        further steps are started; running steps are left to finish. A step
+        larger than the allocation fails the stage up front. With keep_going,
+        as for independent packed jobs, a failed or unschedulable step only
+        ends its own scripts and the other steps still run.
+        """
+        queue = deque(steps)
+        free = {node: self.cores_per_node for node in self.nodes}
+        running = []
+        results = []
+        failed = False
+
+        for step in list(queue):
+            if not self.fits_allocation(step):
+                queue.remove(step)
+                results.append(self._result(step, [], 'unschedulable', None, None, None))
+                failed = not keep_going
+
+        while queue or running:
+            if not failed:
+                for step in list(queue):
+                    assigned = self.allocate(step, free)
+                    if assigned is not None:
+                        for node, cores in assigned.items():
+                            free[node] -= cores
+                        queue.remove(step)
+                        running.append((step, assigned, self.launch(step, assigned), self.clock()))
+            elif queue:
+                results.extend(self._result(step, [], 'skipped', None, None, None) for step in queue)
+                queue.clear()
+
+            still_running = []
+            for step, assigned, process, start in running:
+                exit_code = process.poll()
+                if exit_code is None:
+                    still_running.append((step, assigned, process, start))
+                    continue
+                for node, cores in assigned.items():
+                    free[node] += cores
+                status = 'completed' if exit_code == 0 else 'failed'
+                failed = failed or (exit_code != 0 and not keep_going)
+                results.append(self._result(step, assigned, status, exit_code, start, self.clock()))
+                print(f"[executor] {status} {step['name']} (exit {exit_code})", flush=True)
+
+            if len(still_running) == len(running) and running:
+                time.sleep(self.poll_interval)
+            running = still_running
+
+        return results
+
+    @staticmethod
+    def _result(step, assigned, status, exit_code, start, end):
+        return {
+            'name': step['name'],
+            'nodes': ','.join(assigned),
+            'status': status,
+            'exit_code': exit_code,
+            'elapsed': None if start is None else end - start,
+        }
+
+
+def format_report(results):
+    """Table of per-step status, exit code and elapsed time"""
+    lines = [f"{'STEP':<40} {'STATUS':<14} {'EXIT':>4} {'ELAPSED':>10}  NODES"]
+    for result in results:
+        exit_code = '-' if result['exit_code'] is None else result['exit_code']
+        elapsed = '-' if result['elapsed'] is None else f"{result['elapsed']:.1f}s"
+        lines.append(f"{result['name']:<40} {result['status']:<14} {exit_code:>4} {elapsed:>10}  {result['nodes']}")
+    return '\n'.join(lines)
+
+
+def expand_chunks(steps):
+    """Expand manifest entries with 'chunks': [first, last] into one step per chunk
+
+    '{chunk}' in such an entry's string fields is replaced by the chunk
+    number, so a manifest stays small however many chunks a job has.
+    """
+    expanded = []
+    for step in steps:
+        if 'chunks' not in step:
+            expanded.append(step)
+            continue
+        first, last = step['chunks']
+        template = {key: value for key, value in step.items() if key != 'chunks'}
+        for chunk in range(first, last + 1):
+            expanded.append({
+                key: value.replace('{chunk}', str(chunk)) if isinstance(value, str) else value
+                for key, value in template.items()
+            })
+    return expanded
+
+
+def main(argv):
+    """Run the steps listed in a JSON manifest; exit non-zero if any did not complete"""
+    parser = argparse.ArgumentParser(description='In-allocation step executor')
+    parser.add_argument('manifest', help='JSON list of steps')
+    parser.add_argument('--keep-going', action='store_true', help='Run the other steps after a failure')
+    args = parser.parse_args(argv)
+
+    with open(args.manifest) as f:
+        steps = expand_chunks(json.load(f))
+
+    results = StepExecutor(expand_nodelist()).run(steps, args.keep_going)
+    print(format_report(results), flush=True)
+    return 0 if all(result['status'] == 'completed' for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,224 @@
+"""
+Make-style incremental planning: drop workflow steps whose outputs are current
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from .chunks import ChunkRange
+from .dag import WorkflowDAG
+from .preflight import Preflight
+
+
+class IncrementalPlanner:
+    """Trims a workflow to the steps that are missing or out of date
+
+    A step is current when all of its declared outputs exist and none of its
+    inputs (its script, the job's input files and the outputs of the step
+    before it) is newer than the oldest output. With use_hashes, the script
+    and the job's input files are compared by content against the hashes
+    recorded the last time the step was found current, so touching a file
+    does not force a rerun. The previous step's outputs (trajectories and
+    energy files, often gigabytes) are never hashed and always compared by
+    mtime, so rerunning a step makes every later one stale. Once a step is
+    stale, every later step of the job and every downstream job is too.
+    """
+
+    DEFAULT_MANIFEST = '.taskmanager/incremental.json'
+
+    def __init__(self, jobs: List[Dict[str, Any]], execution_mode: str = "sequential",
+                 use_hashes: bool = False, manifest_file: Optional[str] = None):
+        self.jobs = jobs
+        self.execution_mode = execution_mode
+        self.use_hashes = use_hashes
+        self.manifest_file = Path(manifest_file or self.DEFAULT_MANIFEST)
+        self._mtimes = {}
+        self._manifest = None
+
+    def step_outputs(self, job: Dict[str, Any]) -> List[List[str]]:
+        """Declared outputs of each script of a job, relative to the job path
+
+        Chunked jobs have one group of outputs per chunk. Otherwise outputs
+        pair up with scripts when there is one per script, and all belong to
+        the last script when there is not.
+        """
+        scripts = job.get('scripts', [])
+        outputs = job.get('outputs', [])
+
+        if isinstance(outputs, ChunkRange):
+            return [
+                [f"{outputs.prefix}{chunk}{suffix}" for suffix in outputs.suffixes]
+                for chunk in outputs.chunk_numbers
+            ]
+        if len(outputs) == len(scripts):
+            return [[output] for output in outputs]
+        return [[] for _ in scripts[:-1]] + [list(outputs)] if scripts else []
+
+    def job_inputs(self, job: Dict[str, Any]) -> List[str]:
+        """Input files shared by every step of a job"""
+        return [
+            item['path'] for item in Preflight([job]).collect_inputs()
+            if item['kind'] != 'script'
+        ]
+
+    def plan(self) -> List[Dict[str, Any]]:
+        """Jobs trimmed to their first stale step; complete jobs are dropped"""
+        dag = WorkflowDAG(self.jobs)
+        ordered = dag.ordered_jobs() if self.execution_mode == "dag" else list(self.jobs)
+
+        remaining = {}
+        final_outputs = {}
+        planned = []
+        previous = None
+
+        for job in ordered:
+            name = job['name']
+            parents = dag.parents[name] if self.execution_mode == "dag" else ([previous] if previous else [])
+            previous = name
+
+            path = job.get('path', '.')
+            scripts = job.get('scripts', [])
+            outputs = [[os.path.normpath(os.path.join(path, output)) for output in group]
+                       for group in self.step_outputs(job)]
+            upstream = [output for parent in parents for output in final_outputs[parent]]
+
+            if any(remaining[parent] for parent in parents):
+                first_stale = 0
+            else:
+                first_stale = self.first_stale_step(job, outputs, upstream)
+
+            remaining[name] = first_stale < len(scripts)
+            final_outputs[name] = next((group for group in reversed(outputs) if group), upstream)
+            if remaining[name]:
+                planned.append(self.trim_job(job, first_stale, remaining))
+
+        self._save_manifest()
+        return planned
+
+    def first_stale_step(self, job: Dict[str, Any], outputs: List[List[str]], upstream: List[str]) -> int:
+        """Index of the first step to rerun, or the number of steps if all are current
+
+        Steps without declared outputs count as current when a later step
+        with outputs is.
+        """
+        path = job.get('path', '.')
+        shared_inputs = self.job_inputs(job)
+        unknown_from = None
+
+        for i, script in enumerate(job.get('scripts', [])):
+            if not outputs[i]:
+                unknown_from = i if unknown_from is None else unknown_from
+                continue
+
+            inputs = shared_inputs + [os.path.join(path, script)]
+            if not self.is_current(f"{job['name']}/{script}", outputs[i], inputs, outputs[i - 1] if i else upstream):
+                return i if unknown_from is None else unknown_from
+            unknown_from = None
+
+        return len(job.get('scripts', [])) if unknown_from is None else unknown_from
+
+    def trim_job(self, job: Dict[str, Any], first_stale: int, remaining: Dict[str, bool]) -> Dict[str, Any]:
+        """Copy of a job starting at its first stale step, without complete dependencies"""
+        trimmed = dict(job)
+        scripts = job.get('scripts', [])
+        outputs = job.get('outputs', [])
+
+        trimmed['scripts'] = scripts[first_stale:]
+        if isinstance(outputs, ChunkRange):
+            trimmed['outputs'] = ChunkRange(outputs.prefix, outputs.start + first_stale, outputs.stop, outputs.suffixes)
+        elif len(outputs) == len(scripts):
+            trimmed['outputs'] = outputs[first_stale:]
+
+        if 'depends_on' in job:
+            trimmed['depends_on'] = [
+                parent for parent in WorkflowDAG._normalize_depends_on(job['depends_on'])
+                if remaining.get(parent)
+            ]
+        trimmed['skipped_steps'] = first_stale
+        return trimmed
+
+    def is_current(self, step: str, outputs: List[str], inputs: List[str], upstream: List[str] = ()) -> bool:
+        """Whether a step's outputs exist and are up to date with its inputs
+
+        upstream lists outputs of earlier steps; they are always compared by
+        mtime, and with use_hashes only the step's own inputs may be excused
+        by matching content.
+        """
+        if not outputs:
+            return False
+        output_times = [self._mtime(output) for output in outputs]
+        if None in output_times:
+            return False
+
+        oldest_output = min(output_times)
+        if any(self._mtime(path) is not None and self._mtime(path) > oldest_output for path in upstream):
+            return False
+
+        existing_inputs = [path for path in inputs if self._mtime(path) is not None]
+        current = all(self._mtime(path) <= oldest_output for path in existing_inputs)
+        if not self.use_hashes:
+            return current
+
+        # Inputs that were only touched still match the hashes recorded when the step was last current
+        steps = self._load_manifest()['steps']
+        hashes = {path: self._hash(path) for path in existing_inputs}
+        if current or steps.get(step) == hashes:
+            steps[step] = hashes
+            return True
+        return False
+
+    def _mtime(self, path: str) -> Optional[int]:
+        """mtime of a file, read with one scandir per directory"""
+        directory, name = os.path.split(os.path.normpath(path))
+        directory = directory or '.'
+
+        if directory not in self._mtimes:
+            entries = {}
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            entries[entry.name] = entry.stat().st_mtime_ns
+                        except FileNotFoundError:
+                            continue
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+            self._mtimes[directory] = entries
+
+        return self._mtimes[directory].get(name)
+
+    def _hash(self, path: str) -> str:
+        """sha256 of a file, reused while its mtime and size are unchanged"""
+        stat = os.stat(path)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        cached = self._load_manifest()['files'].get(path)
+        if cached and cached['signature'] == signature:
+            return cached['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self._manifest['files'][path] = {'signature': signature, 'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if self._manifest is None:
+            try:
+                with open(self.manifest_file) as f:
+                    self._manifest = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._manifest = {'files': {}, 'steps': {}}
+        return self._manifest
+
+    def _save_manifest(self):
+        """Write recorded hashes atomically; nothing to do in mtime mode"""
+        if self._manifest is None:
+            return
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.manifest_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp_file, self.manifest_file)
@@ -2,20 +2,52 @@
 Enhanced job parser with dynamic production chunk handling
 """
 
+import copy
 import yaml
 import json
 from pathlib import Path
 from typing import List, Dict, Any, Optional
+from .chunks import ChunkRange
+from .plan_cache import PlanCache
+from .production_chunker import CHUNK_OUTPUT_PREFIX
 from .utils import ValidationError, TaskManagerError
 
+# libyaml's C loader is an order of magnitude faster on large campaign files
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 
 class JobParser:
     """Enhanced job parser with automatic chunk script generation"""
     
-    def __init__(self, job_file: str, profile: Optional[str] = None):
+    def __init__(self, job_file: str, profile: Optional[str] = None,
+                 config_file: Optional[str] = None, cache_dir: Optional[str] = None):
         self.job_file = job_file
         self.profile = profile
+        self._jobs = None
+        
+        if cache_dir is None:
+            self.workflow_data = self.load_workflow()
+        else:
+            self._load_cached_plan(PlanCache(cache_dir), config_file)
+    
+    def _load_cached_plan(self, cache: PlanCache, config_file: Optional[str]):
+        """Load the expanded plan from cache, building and storing it on a miss"""
+        if not Path(self.job_file).exists():
+            raise ValidationError(f"Job file not found: {self.job_file}")
+        
+        key = cache.make_key(self.job_file, self.profile, config_file)
+        plan = cache.load(key)
+        
+        if plan is not None:
+            self.workflow_data = plan['workflow_data']
+            self._jobs = plan['jobs']
+            return
+        
         self.workflow_data = self.load_workflow()
+        cache.store(key, {'workflow_data': self.workflow_data, 'jobs': self.get_jobs()})
     
     def load_workflow(self) -> Dict[str, Any]:
         """Load workflow configuration with better error handling"""
@@ -27,7 +59,7 @@ class JobParser:
         try:
             with open(job_path, 'r') as f:
                 if job_path.suffix.lower() in ['.yaml', '.yml']:
-                    data = yaml.safe_load(f)
+                    data = yaml.load(f, Loader=YamlLoader)
                 else:
                     data = json.load(f)
             
@@ -47,16 +79,31 @@ class JobParser:
         except Exception as e:
             raise ValidationError(f"Error loading {self.job_file}: {e}")
     
+    @property
+    def workflow_name(self) -> str:
+        """Workflow name from the job file, or the file's stem if it has none"""
+        return self.workflow_data.get('workflow', {}).get('name') or Path(self.job_file).stem
+    
+    @property
+    def workflow_key(self) -> str:
+        """Ledger key of the workflow, its name and resolved job file
+        
+        Copies of a job file for several systems share a workflow name; the
+        path keeps their steps apart.
+        """
+        return f"{self.workflow_name}@{Path(self.job_file).resolve()}"
+    
     def get_jobs(self) -> List[Dict[str, Any]]:
-        """Get processed jobs with dynamic chunk generation"""
-        jobs = self.workflow_data.get('jobs', [])
-        processed_jobs = []
+        """Get processed jobs with dynamic chunk generation
         
-        for job in jobs:
-            processed_job = self.process_job(job)
-            processed_jobs.append(processed_job)
+        Jobs are expanded once per parser instance and cached; callers get
+        their own copies, so changing one never alters the cached plan.
+        """
+        if self._jobs is None:
+            jobs = self.workflow_data.get('jobs', [])
+            self._jobs = [self.process_job(job) for job in jobs]
         
-        return processed_jobs
+        return copy.deepcopy(self._jobs)
     
     def process_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
         """Process individual job with chunk handling and profile overrides"""
@@ -84,21 +131,11 @@ class JobParser:
         total_chunks = chunk_config.get('total_chunks', 5)
         script_prefix = chunk_config.get('script_prefix', 'prod_chunk')
         
-        # Generate script list dynamically
-        scripts = []
-        outputs = []
-        
-        for chunk_num in range(1, total_chunks + 1):
-            script_name = f"{script_prefix}{chunk_num}.sh"
-            scripts.append(script_name)
-            
-            # Generate expected outputs
-            output_prefix = f"{script_prefix}{chunk_num}"
-            outputs.extend([
-                f"{output_prefix}.xtc",
-                f"{output_prefix}.edr",
-                f"{output_prefix}.gro"
-            ])
+        # Chunk names are computed on demand rather than materialized; outputs
+        # carry the prefix the generate-chunks scripts write
+        scripts = ChunkRange(script_prefix, 1, total_chunks + 1)
+        outputs = ChunkRange(chunk_config.get('output_prefix', CHUNK_OUTPUT_PREFIX), 1, total_chunks + 1,
+                             ('.xtc', '.edr', '.gro'))
         
         # Update job with generated scripts
         job['scripts'] = scripts
@@ -110,6 +147,7 @@ class JobParser:
         job['chunk_metadata'] = {
             'total_chunks': total_chunks,
             'chunk_length_ns': chunk_config.get('chunk_length_ns', 10),
+            'script_prefix': script_prefix,
             'template_mdp': chunk_config.get('template_mdp', 'step7_production.mdp')
         }
         
@@ -135,7 +173,7 @@ class JobParser:
             
             # Apply chunk_config overrides
             if 'chunk_config' in job_overrides:
-                current_chunk_config = job.get('chunk_config', {})
+                current_chunk_config = dict(job.get('chunk_config', {}))
                 chunk_overrides = job_overrides['chunk_config']
                 current_chunk_config.update(chunk_overrides)
                 job['chunk_config'] = current_chunk_config
@@ -186,7 +224,7 @@ class JobParser:
         
         try:
             with open(job_path, 'r') as f:
-                workflow = yaml.safe_load(f)
+                workflow = yaml.load(f, Loader=YamlLoader)
         except yaml.YAMLError as e:
             raise ValidationError(f"Invalid YAML in {job_file}: {e}")
         
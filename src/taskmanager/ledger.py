@@ -0,0 +1,218 @@
+"""
+Persistent SQLite ledger of submitted workflow steps
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+
+class JobLedger:
+    """Records every submitted step keyed by (workflow, job, step)
+
+    Resubmitting a step replaces its row, so the ledger always holds the
+    latest SLURM job of each step. Times are Unix timestamps. Workflows are
+    keyed as 'name@/path/to/jobs.yaml' (JobParser.workflow_key) so copies
+    of a job file stay apart; queries accept a key or a bare name, which
+    matches every job file of that name.
+    """
+
+    DEFAULT_DB = '.taskmanager/ledger.db'
+
+    # SLURM states after which a job will not change any more
+    TERMINAL_STATES = {
+        'COMPLETED', 'FAILED', 'CANCELLED', 'TIMEOUT', 'OUT_OF_MEMORY',
+        'NODE_FAIL', 'BOOT_FAIL', 'DEADLINE', 'PREEMPTED',
+        # Set by taskmanager for planned steps that will never be submitted
+        'SKIPPED',
+    }
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS steps (
+            workflow    TEXT NOT NULL,
+            job         TEXT NOT NULL,
+            step        TEXT NOT NULL,
+            slurm_id    TEXT,
+            array_index INTEGER,
+            job_type    TEXT,
+            nodes       INTEGER,
+            resources   TEXT,
+            path        TEXT,
+            script      TEXT,
+            state       TEXT NOT NULL DEFAULT 'SUBMITTED',
+            submit_time REAL,
+            start_time  REAL,
+            end_time    REAL,
+            exit_code   INTEGER,
+            PRIMARY KEY (workflow, job, step)
+        );
+        CREATE INDEX IF NOT EXISTS idx_steps_state ON steps (state);
+        CREATE INDEX IF NOT EXISTS idx_steps_workflow_state ON steps (workflow, state);
+        CREATE INDEX IF NOT EXISTS idx_steps_slurm_id ON steps (slurm_id, array_index);
+    """
+
+    def __init__(self, db_file: str = DEFAULT_DB):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_file), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        # WAL lets status queries read while a submission is writing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record_submissions(self, workflow: str, steps: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace submitted steps in one transaction
+
+        Each step needs 'job', 'step' and 'slurm_id'; 'array_index',
+        'job_type', 'nodes', 'resources', 'path', 'script' and
+        'submit_time' are optional.
+        """
+        now = time.time()
+        rows = [
+            (
+                workflow, step['job'], step['step'], str(step['slurm_id']), step.get('array_index'),
+                step.get('job_type'), step.get('nodes'), json.dumps(step.get('resources') or {}),
+                step.get('path'), step.get('script'), 'SUBMITTED', step.get('submit_time', now),
+            )
+            for step in steps
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO steps (workflow, job, step, slurm_id, array_index, job_type, nodes,"
+                " resources, path, script, state, submit_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def plan_steps(self, workflow: str, steps: Iterable[Dict[str, Any]]) -> int:
+        """Record steps as PLANNED, without a job ID, before they are submitted"""
+        now = time.time()
+        rows = [
+            (workflow, step['job_name'], Path(step['script_path']).name, step['job_type'], step['nodes'],
+             json.dumps(step.get('resources') or {}), step['path'], step['script_path'], 'PLANNED', now)
+            for step in steps
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO steps (workflow, job, step, job_type, nodes, resources, path, script,"
+                " state, submit_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def set_state(self, workflow: str, job: str, step: str, state: str):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE steps SET state = ? WHERE workflow = ? AND job = ? AND step = ?", (state, workflow, job, step)
+            )
+
+    def record_submitted_steps(self, workflow: str, steps: List[Dict[str, Any]]) -> int:
+        """Record steps as returned by BatchManager.submit"""
+        return self.record_submissions(workflow, (
+            {
+                'job': step['job_name'],
+                'step': Path(step['script_path']).name,
+                'slurm_id': step['job_id'],
+                'job_type': step['job_type'],
+                'nodes': step['nodes'],
+                'resources': step.get('resources'),
+                'path': step['path'],
+                'script': step['script_path'],
+            }
+            for step in steps
+        ))
+
+    def update_states(self, updates: Iterable[Dict[str, Any]]) -> int:
+        """Apply state changes keyed by 'slurm_id' and optional 'array_index'
+
+        Updates may carry 'state', 'start_time', 'end_time' and 'exit_code';
+        missing values leave the column unchanged.
+        """
+        rows = [
+            (
+                update.get('state'), update.get('start_time'), update.get('end_time'), update.get('exit_code'),
+                str(update['slurm_id']), update.get('array_index'), update.get('array_index'),
+            )
+            for update in updates
+        ]
+        with self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE steps SET state = COALESCE(?, state), start_time = COALESCE(?, start_time),"
+                " end_time = COALESCE(?, end_time), exit_code = COALESCE(?, exit_code)"
+                " WHERE slurm_id = ? AND (? IS NULL OR array_index = ?)",
+                rows
+            )
+        return cursor.rowcount
+
+    def get(self, workflow: str, job: str, step: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT * FROM steps WHERE workflow = ? AND job = ? AND step = ?", (workflow, job, step)
+        ).fetchone()
+        return self._to_dict(row) if row else None
+
+    @staticmethod
+    def _workflow_clause(workflow: str) -> Tuple[str, List[str]]:
+        """SQL matching a workflow key, or every key 'name@...' of a workflow name"""
+        # 'A' follows '@', so the range holds exactly the keys starting with 'name@'
+        return "(workflow = ? OR (workflow >= ? AND workflow < ?))", [workflow, f"{workflow}@", f"{workflow}A"]
+
+    def steps(self, workflow: Optional[str] = None, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Steps filtered by workflow and/or state, in submission order"""
+        query = "SELECT * FROM steps"
+        clauses, params = [], []
+        if workflow is not None:
+            clause, clause_params = self._workflow_clause(workflow)
+            clauses.append(clause)
+            params.extend(clause_params)
+        if state is not None:
+            clauses.append("state = ?")
+            params.append(state)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY submit_time, rowid"
+        return [self._to_dict(row) for row in self.conn.execute(query, params)]
+
+    def active_steps(self, workflow: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Steps not yet in a terminal state"""
+        placeholders = ', '.join('?' for _ in self.TERMINAL_STATES)
+        query = f"SELECT * FROM steps WHERE state NOT IN ({placeholders})"
+        params = list(self.TERMINAL_STATES)
+        if workflow is not None:
+            clause, clause_params = self._workflow_clause(workflow)
+            query += f" AND {clause}"
+            params.extend(clause_params)
+        return [self._to_dict(row) for row in self.conn.execute(query + " ORDER BY submit_time, rowid", params)]
+
+    def state_counts(self, workflow: Optional[str] = None) -> Dict[str, int]:
+        """Number of steps in each state"""
+        query = "SELECT state, COUNT(*) FROM steps"
+        params = []
+        if workflow is not None:
+            clause, params = self._workflow_clause(workflow)
+            query += f" WHERE {clause}"
+        return dict(self.conn.execute(query + " GROUP BY state", params).fetchall())
+
+    def workflows(self, workflow: Optional[str] = None) -> List[str]:
+        """Workflow keys in the ledger, optionally only those matching a key or name"""
+        query, params = "SELECT DISTINCT workflow FROM steps", []
+        if workflow is not None:
+            clause, params = self._workflow_clause(workflow)
+            query += f" WHERE {clause}"
+        return [row[0] for row in self.conn.execute(query + " ORDER BY workflow", params)]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        step = dict(row)
+        step['resources'] = json.loads(step['resources']) if step['resources'] else {}
+        return step
@@ -0,0 +1,97 @@
+"""
+mdrun parallelization flags derived from the SLURM allocation at run time
+"""
+
+from typing import List
+
+# Arguments that run mdrun with the flags set up by mdrun_setup_lines()
+MDRUN_LAUNCH = '"${MDRUN_LAUNCHER[@]}"'
+MDRUN_ARGS = '"${MDRUN_FLAGS[@]}"'
+
+
+def mdrun_setup_lines(dynamics: bool = True, thread_mpi: bool = False) -> List[str]:
+    """Bash setting OMP_NUM_THREADS, MDRUN_LAUNCHER and MDRUN_FLAGS from the allocation
+
+    OpenMP threads follow SLURM_CPUS_PER_TASK and ranks SLURM_NTASKS, either
+    started by srun (gmx_mpi, run as "${MDRUN_LAUNCHER[@]}" gmx_mpi mdrun)
+    or, with thread_mpi, as thread-MPI ranks of the gmx binary (-ntmpi),
+    counting the tasks of one node only. Steps run by the step executor
+    have srun confined to their own nodes. Pinning is left to GROMACS, as
+    concurrent steps may share a node. With GPUs allocated through
+    GRES, nonbonded work is offloaded and, for dynamics, PME, bonded and
+    update too, with direct GPU communication between ranks; energy
+    minimization only supports the nonbonded offload. Outside SLURM one
+    thread (or the caller's OMP_NUM_THREADS) and no pinning are used.
+    """
+    gpu_flags = '-nb gpu -pme gpu -bonded gpu -update gpu' if dynamics else '-nb gpu'
+    lines = [
+        "# mdrun parallelization from the SLURM allocation",
+        "MDRUN_THREADS=\"${OMP_NUM_THREADS:-1}\"",
+        "if [[ -n \"${SLURM_CPUS_PER_TASK:-}\" ]]; then",
+        "    MDRUN_THREADS=\"$SLURM_CPUS_PER_TASK\"",
+        "fi",
+        "export OMP_NUM_THREADS=\"$MDRUN_THREADS\"",
+        "MDRUN_RANKS=\"${SLURM_NTASKS:-1}\"",
+        "MDRUN_GPUS=\"${SLURM_GPUS_ON_NODE:-0}\"",
+        "if [[ \"$MDRUN_GPUS\" == \"0\" && -n \"${SLURM_JOB_GPUS:-}\" ]]; then",
+        "    MDRUN_GPUS=$(awk -F, '{ print NF }' <<< \"$SLURM_JOB_GPUS\")",
+        "fi",
+        "",
+        "MDRUN_FLAGS=(-ntomp \"$OMP_NUM_THREADS\")",
+    ]
+    if thread_mpi:
+        lines += [
+            "# Thread-MPI ranks are threads of one process, so only this node's tasks count",
+            "MDRUN_NODES=\"${SLURM_NNODES:-1}\"",
+            "if [[ -n \"${SLURM_NTASKS_PER_NODE:-}\" ]]; then",
+            "    MDRUN_RANKS=\"${SLURM_NTASKS_PER_NODE%%[(,]*}\"",
+            "elif (( MDRUN_NODES > 1 )); then",
+            "    MDRUN_RANKS=$(( MDRUN_RANKS / MDRUN_NODES ))",
+            "fi",
+            "if (( MDRUN_NODES > 1 )); then",
+            "    echo \"WARNING: thread-MPI mdrun uses one of $MDRUN_NODES allocated nodes\" >&2",
+            "fi",
+            "MDRUN_FLAGS+=(-ntmpi \"$MDRUN_RANKS\")",
+        ]
+    lines += [
+        "if [[ -n \"${SLURM_CPUS_PER_TASK:-}\" ]]; then",
+        "    # Other steps may share the node: GROMACS pins only when it fills the node",
+        "    # and otherwise keeps the core affinity SLURM gave the job",
+        "    MDRUN_FLAGS+=(-pin auto)",
+        "fi",
+        "if (( MDRUN_GPUS > 0 )); then",
+        f"    MDRUN_FLAGS+=({gpu_flags})",
+        "    if (( MDRUN_RANKS > 1 )); then",
+    ]
+    if dynamics:
+        # GPU PME runs on a single separate rank
+        lines.append("        MDRUN_FLAGS+=(-npme 1)")
+    lines += [
+        "        # Direct GPU halo and PME exchange (GROMACS 2022+, and the older 2020-2021 switches)",
+        "        export GMX_ENABLE_DIRECT_GPU_COMM=1 GMX_GPU_DD_COMMS=true GMX_GPU_PME_PP_COMMS=true",
+        "    fi",
+        "fi",
+    ]
+    if not thread_mpi:
+        lines += [
+            "",
+            "# srun no longer passes --cpus-per-task on from sbatch, so ask for it explicitly",
+            "if [[ -n \"${SLURM_JOB_ID:-}\" ]]; then",
+            "    MDRUN_LAUNCHER=(srun --ntasks=\"$MDRUN_RANKS\" --cpus-per-task=\"$OMP_NUM_THREADS\")",
+            "    if [[ -n \"${TASKMANAGER_NODELIST:-}\" ]]; then",
+            "        # Run by the step executor: stay on the step's nodes and only its cores",
+            "        MDRUN_LAUNCHER+=(--nodelist=\"$TASKMANAGER_NODELIST\" --exact)",
+            "    fi",
+            "else",
+            "    MDRUN_LAUNCHER=(env)",
+            "fi",
+        ]
+    lines += [
+        "echo \"mdrun: $MDRUN_RANKS rank(s) x $OMP_NUM_THREADS thread(s), $MDRUN_GPUS GPU(s): ${MDRUN_FLAGS[*]}\"",
+    ]
+    return lines
+
+
+def mdrun_setup(dynamics: bool = True, thread_mpi: bool = False) -> str:
+    """mdrun_setup_lines() as a block of text ending in a newline"""
+    return '\n'.join(mdrun_setup_lines(dynamics, thread_mpi)) + '\n'
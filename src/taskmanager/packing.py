@@ -0,0 +1,77 @@
+"""
+Packing of small independent jobs into shared allocations
+"""
+
+from typing import List, Dict, Any, Optional
+from .utils import ValidationError
+
+
+class AllocationPacker:
+    """First-fit-decreasing packing of jobs by cores and walltime
+
+    Each allocation holds jobs whose simulated run, under the same policy as
+    the step executor, finishes within the time budget. Without an explicit
+    budget the longest job sets it, so packing never makes the campaign wait
+    longer than its slowest member.
+    """
+
+    def __init__(self, cores_per_node: int, nodes_per_allocation: int = 1, max_seconds: Optional[int] = None):
+        self.cores_per_node = cores_per_node
+        self.nodes_per_allocation = nodes_per_allocation
+        self.max_seconds = max_seconds
+
+    def pack(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Group items with 'cores' and 'seconds' into allocations
+
+        Returns a list of {'items': [...], 'seconds': makespan} in the order
+        the allocations were opened.
+        """
+        for item in items:
+            if item['cores'] > self.cores_per_node:
+                raise ValidationError(
+                    f"Job '{item['name']}' needs {item['cores']} cores, more than one "
+                    f"{self.cores_per_node}-core node; submit it outside pack mode"
+                )
+
+        budget = self.max_seconds or max((item['seconds'] for item in items), default=0)
+        ordered = sorted(items, key=lambda item: (item['cores'] * item['seconds'], item['seconds']), reverse=True)
+        allocations = []
+
+        for item in ordered:
+            for allocation in allocations:
+                makespan = self.simulate(allocation['items'] + [item])
+                if makespan <= budget:
+                    allocation['items'].append(item)
+                    allocation['seconds'] = makespan
+                    break
+            else:
+                allocations.append({'items': [item], 'seconds': item['seconds']})
+
+        return allocations
+
+    def simulate(self, items: List[Dict[str, Any]]) -> int:
+        """Makespan of running items in one allocation
+
+        Mirrors StepExecutor: items start in order, any item that fits the
+        free cores of a node starts immediately, and cores are released when
+        an item finishes.
+        """
+        free = [self.cores_per_node] * self.nodes_per_allocation
+        queue = list(items)
+        running = []
+        now = 0
+
+        while queue or running:
+            for item in list(queue):
+                node = next((i for i, cores in enumerate(free) if cores >= item['cores']), None)
+                if node is not None:
+                    free[node] -= item['cores']
+                    running.append((now + item['seconds'], node, item['cores']))
+                    queue.remove(item)
+
+            now = min(end for end, _, _ in running)
+            for finished in [entry for entry in running if entry[0] == now]:
+                running.remove(finished)
+                free[finished[1]] += finished[2]
+
+        return now
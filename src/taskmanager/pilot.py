@@ -0,0 +1,248 @@
+"""
+Pilot jobs pulling workflow steps from a file-based work queue
+
+The queue is a directory with pending/, running/, done/ and failed/
+subdirectories holding one JSON file per task. Tasks move between them with
+os.rename, which is atomic within one file system, so pilots and taskmanager
+can share a queue without any server. Only the standard library is used:
+pilot batch scripts embed this module next to executor.py.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+try:
+    from .executor import StepExecutor, expand_nodelist, format_report
+except ImportError:
+    from executor import StepExecutor, expand_nodelist, format_report
+
+STATES = ('pending', 'running', 'done', 'failed')
+
+# Longest key kept verbatim in a task file name; longer ones end in a hash
+MAX_KEY_LENGTH = 160
+
+
+def task_key(name):
+    """File-name-safe form of a task name"""
+    key = re.sub(r'[^\w.-]', '_', name)
+    if len(key) > MAX_KEY_LENGTH:
+        digest = hashlib.sha1(name.encode()).hexdigest()[:16]
+        key = f"{key[-(MAX_KEY_LENGTH - 17):]}.{digest}"
+    return key
+
+
+class WorkQueue:
+    """Directory of task files moved between states by atomic renames"""
+
+    def __init__(self, root):
+        self.root = str(root)
+        for state in STATES + ('tmp',):
+            os.makedirs(os.path.join(self.root, state), exist_ok=True)
+
+    def _path(self, state, filename):
+        return os.path.join(self.root, state, filename)
+
+    def _write(self, state, filename, task):
+        """Write a task file so that readers never see it half-written"""
+        tmp_path = self._path('tmp', f"{os.getpid()}-{filename}")
+        with open(tmp_path, 'w') as f:
+            json.dump(task, f)
+        os.replace(tmp_path, self._path(state, filename))
+
+    def _read(self, state, filename):
+        try:
+            with open(self._path(state, filename)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def enqueue(self, task):
+        """Add a task; it is picked up in enqueue order once its 'after' tasks are done"""
+        filename = f"{time.time_ns():020d}-{task_key(task['name'])}.json"
+        self._write('pending', filename, task)
+        return filename
+
+    def enqueue_many(self, tasks):
+        """Add tasks not already pending, running or done; returns the new files
+
+        Enqueueing a workflow twice leaves one copy of each task. A task that
+        failed is queued again, and its old result is dropped so that tasks
+        after it are not failed on its account.
+        """
+        queued = self.names('pending') | self.names('running') | self.names('done')
+        failed = self.names('failed')
+        filenames = []
+        for task in tasks:
+            key = task_key(task['name'])
+            if key in queued:
+                continue
+            if key in failed:
+                for filename in self.listing('failed'):
+                    if filename.split('-', 1)[1][:-len('.json')] == key:
+                        os.remove(self._path('failed', filename))
+                failed.discard(key)
+            queued.add(key)
+            filenames.append(self.enqueue(task))
+        return filenames
+
+    def listing(self, state):
+        """Task files in a state, oldest first"""
+        return sorted(name for name in os.listdir(os.path.join(self.root, state)) if name.endswith('.json'))
+
+    def names(self, state):
+        """Keys of the tasks in a state"""
+        return {filename.split('-', 1)[1][:-len('.json')] for filename in self.listing(state)}
+
+    def counts(self):
+        return {state: len(self.listing(state)) for state in STATES}
+
+    def ready(self):
+        """Pending (filename, task) pairs whose 'after' tasks are all done
+
+        Tasks depending on a failed task are moved to failed/ on the way.
+        """
+        done = self.names('done')
+        failed = self.names('failed')
+        ready = []
+
+        for filename in self.listing('pending'):
+            task = self._read('pending', filename)
+            if task is None:
+                continue
+            after = {task_key(name) for name in task.get('after', [])}
+            if after & failed:
+                if self.claim(filename) is not None:
+                    self.finish(filename, dict(task, error='dependency failed'), None)
+                    failed.add(task_key(task['name']))
+            elif after <= done:
+                ready.append((filename, task))
+
+        return ready
+
+    def claim(self, filename):
+        """Move a pending task to running; None if another pilot claimed it first"""
+        try:
+            os.rename(self._path('pending', filename), self._path('running', filename))
+        except FileNotFoundError:
+            return None
+        return self._read('running', filename)
+
+    def finish(self, filename, task, exit_code, elapsed=None):
+        """Move a running task to done/ or failed/ and record its result"""
+        state = 'done' if exit_code == 0 else 'failed'
+        os.rename(self._path('running', filename), self._path(state, filename))
+        self._write(state, filename, dict(task, exit_code=exit_code, elapsed=elapsed))
+
+    def recover(self):
+        """Return tasks left in running/ by a pilot that was killed to pending/"""
+        filenames = self.listing('running')
+        for filename in filenames:
+            os.rename(self._path('running', filename), self._path('pending', filename))
+        return len(filenames)
+
+
+class Pilot:
+    """Runs ready queue tasks on the allocation's nodes until idle or out of time
+
+    A task is only started if its declared 'seconds' fit before the walltime
+    minus the reserve. The pilot stops once nothing is running and either
+    nothing has become ready for idle_timeout seconds, or the ready tasks no
+    longer fit in the remaining walltime; out_of_time then lists the latter.
+    """
+
+    def __init__(self, queue, nodes, cores_per_node=None, walltime=None, reserve=300,
+                 idle_timeout=300, poll_interval=5.0, clock=time.monotonic, popen=None):
+        self.queue = queue
+        executor_args = {} if popen is None else {'popen': popen}
+        self.executor = StepExecutor(nodes, cores_per_node, poll_interval, clock=clock, **executor_args)
+        self.clock = clock
+        self.deadline = None if walltime is None else clock() + walltime - reserve
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.out_of_time = []
+
+    def fits_walltime(self, task):
+        return self.deadline is None or self.clock() + float(task.get('seconds', 0)) <= self.deadline
+
+    def run(self):
+        """Run tasks until the pilot stops; returns per-task results"""
+        free = {node: self.executor.cores_per_node for node in self.executor.nodes}
+        running = []
+        results = []
+        idle_since = self.clock()
+
+        while True:
+            out_of_time = []
+            for filename, task in self.queue.ready():
+                if not self.executor.fits_allocation(task):
+                    if self.queue.claim(filename) is not None:
+                        self.queue.finish(filename, dict(task, error='larger than the pilot allocation'), None)
+                    continue
+                if not self.fits_walltime(task):
+                    out_of_time.append(task['name'])
+                    continue
+                assigned = self.executor.allocate(task, free)
+                if assigned is None or self.queue.claim(filename) is None:
+                    continue
+                for node, cores in assigned.items():
+                    free[node] -= cores
+                running.append((filename, task, assigned, self.executor.launch(task, assigned), self.clock()))
+
+            still_running = []
+            finished = False
+            for filename, task, assigned, process, start in running:
+                exit_code = process.poll()
+                if exit_code is None:
+                    still_running.append((filename, task, assigned, process, start))
+                    continue
+                finished = True
+                for node, cores in assigned.items():
+                    free[node] += cores
+                elapsed = self.clock() - start
+                self.queue.finish(filename, task, exit_code, elapsed)
+                status = 'completed' if exit_code == 0 else 'failed'
+                results.append(StepExecutor._result(task, list(assigned), status, exit_code, start, start + elapsed))
+                print(f"[pilot] {status} {task['name']} (exit {exit_code})", flush=True)
+            running = still_running
+
+            if finished:
+                # Finished tasks may have made others ready
+                idle_since = self.clock()
+                continue
+            if running:
+                idle_since = self.clock()
+            elif out_of_time or self.clock() - idle_since >= self.idle_timeout:
+                self.out_of_time = out_of_time
+                break
+            time.sleep(self.poll_interval)
+
+        return results
+
+
+def main(argv):
+    """Run a pilot against a queue directory inside a SLURM allocation"""
+    parser = argparse.ArgumentParser(description='Pilot job runner')
+    parser.add_argument('queue', help='Work queue directory')
+    parser.add_argument('--walltime', type=int, help='Allocation walltime in seconds')
+    parser.add_argument('--reserve', type=int, default=300, help='Seconds kept free before the walltime')
+    parser.add_argument('--idle-timeout', type=int, default=300, help='Seconds to wait for new tasks')
+    args = parser.parse_args(argv)
+
+    pilot = Pilot(WorkQueue(args.queue), expand_nodelist(), walltime=args.walltime,
+                  reserve=args.reserve, idle_timeout=args.idle_timeout)
+    results = pilot.run()
+    print(format_report(results), flush=True)
+    if pilot.out_of_time:
+        print(f"[pilot] {len(pilot.out_of_time)} ready task(s) left pending, too long for the remaining walltime: "
+              f"{', '.join(pilot.out_of_time)}", flush=True)
+        return 1
+    return 0 if all(result['status'] == 'completed' for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
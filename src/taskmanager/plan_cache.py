@@ -0,0 +1,57 @@
+"""
+On-disk cache of expanded workflow plans
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional
+from . import __version__
+
+
+class PlanCache:
+    """Stores fully expanded job plans keyed by the inputs that produced them"""
+    
+    # Bump when the shape of cached plans changes; the package version is
+    # part of the key too, so an upgrade never reads an older plan
+    CACHE_VERSION = 3
+    DEFAULT_CACHE_DIR = '.taskmanager/plans'
+    
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+    
+    @classmethod
+    def make_key(cls, job_file: str, profile: Optional[str] = None, config_file: Optional[str] = None) -> str:
+        """Hash the job file content, the selected profile, .slurmparams and the versions"""
+        digest = hashlib.sha256()
+        digest.update(f"v{cls.CACHE_VERSION}\0{__version__}\0{profile or ''}\0".encode())
+        digest.update(Path(job_file).read_bytes())
+        digest.update(b"\0")
+        if config_file and Path(config_file).exists():
+            digest.update(Path(config_file).read_bytes())
+        return digest.hexdigest()
+    
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pickle"
+    
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached plan, or None on a miss or unreadable entry"""
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+    
+    def store(self, key: str, plan: Dict[str, Any]):
+        """Atomically write a plan to the cache"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(plan, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,72 @@
+"""
+Preflight validation of every file a workflow needs before submission
+"""
+
+import os
+from typing import List, Dict, Any
+from .utils import find_missing_paths
+
+
+class Preflight:
+    """Collects workflow inputs and reports the missing ones in one pass"""
+    
+    # Optional job keys naming input files, relative to the job path
+    INPUT_KEYS = {
+        'mdp': 'mdp',
+        'topology': 'topology',
+        'structure': 'structure',
+        'checkpoint': 'checkpoint',
+        'inputs': 'input',
+    }
+    
+    def __init__(self, jobs: List[Dict[str, Any]], max_workers: int = 8):
+        self.jobs = jobs
+        self.max_workers = max_workers
+    
+    def collect_inputs(self) -> List[Dict[str, str]]:
+        """List every script, MDP, topology, structure and checkpoint the jobs reference"""
+        inputs = []
+        
+        for job in self.jobs:
+            job_name = job.get('name', 'unknown')
+            path = job.get('path', '.')
+            
+            def add(name, kind):
+                inputs.append({
+                    'job': job_name,
+                    'kind': kind,
+                    'path': os.path.normpath(os.path.join(path, str(name)))
+                })
+            
+            for script in job.get('scripts', []):
+                add(script, 'script')
+            
+            if job.get('is_chunked', False):
+                add(job.get('chunk_metadata', {}).get('template_mdp', 'step7_production.mdp'), 'mdp')
+            
+            for key, kind in self.INPUT_KEYS.items():
+                value = job.get(key)
+                if not value:
+                    continue
+                for name in ([value] if isinstance(value, str) else value):
+                    add(name, kind)
+        
+        return inputs
+    
+    def _produced_by_workflow(self, path: str) -> bool:
+        """Whether a file is a declared output of some step, so it may not exist yet"""
+        directory, name = os.path.split(path)
+        for job in self.jobs:
+            if os.path.normpath(job.get('path', '.')) == (directory or '.') and name in job.get('outputs', []):
+                return True
+        return False
+    
+    def run(self) -> List[Dict[str, str]]:
+        """Return inputs that are missing and not produced by an earlier step"""
+        inputs = self.collect_inputs()
+        missing = set(find_missing_paths([item['path'] for item in inputs], self.max_workers))
+        
+        return [
+            item for item in inputs
+            if item['path'] in missing and not self._produced_by_workflow(item['path'])
+        ]
@@ -2,10 +2,15 @@
 Production simulation chunker for long trajectories
 """
 
-import os
 import re
+from functools import partial
 from pathlib import Path
 from typing import List, Dict, Any
+from .mdrun import MDRUN_ARGS, MDRUN_LAUNCH, mdrun_setup_lines
+from .writer import BulkWriter
+
+# Output file prefix of chunk N (modelbound_N.gro, .cpt, .xtc, .edr, .log)
+CHUNK_OUTPUT_PREFIX = 'modelbound_'
 
 
 class ProductionChunker:
@@ -17,6 +22,7 @@ class ProductionChunker:
         self.total_length_ns = total_chunks * chunk_length_ns
         self.chunk_size = chunk_length_ns
         self.steps_per_ns = 500000  # For dt=0.002 ps
+        self.writer = BulkWriter()
     
     def generate_chunk_scripts(self, base_path: str, mdp_template: str = "step7_production.mdp") -> List[str]:
         """Generate production chunk scripts based on existing MDP template"""
@@ -28,20 +34,13 @@ class ProductionChunker:
         
         # Analyze original MDP to get parameters
         original_params = self._analyze_production_mdp(mdp_path)
-        scripts = []
-        
-        for chunk in range(1, self.total_chunks + 1):
-            script_name = f"prod_chunk{chunk}.sh"
-            script_path = base_path / script_name
-            
-            script_content = self._generate_chunk_script(chunk, mdp_template, original_params, base_path)
-            
-            with open(script_path, 'w') as f:
-                f.write(script_content)
-            
-            os.chmod(script_path, 0o755)
-            scripts.append(script_name)
+        scripts = [f"prod_chunk{chunk}.sh" for chunk in range(1, self.total_chunks + 1)]
         
+        self.writer.write_many(
+            (base_path / script_name,
+             partial(self._generate_chunk_script, chunk, mdp_template, original_params, base_path))
+            for chunk, script_name in enumerate(scripts, 1)
+        )
         return scripts
     
     def _analyze_production_mdp(self, mdp_path: Path) -> Dict[str, str]:
@@ -71,8 +70,8 @@ class ProductionChunker:
             prev_structure = self._find_last_equilibration_file(base_path)
             prev_checkpoint = ""
         else:
-            prev_structure = f"modelbound_{chunk_num-1}"
-            prev_checkpoint = f"modelbound_{chunk_num-1}.cpt"
+            prev_structure = f"{CHUNK_OUTPUT_PREFIX}{chunk_num-1}"
+            prev_checkpoint = f"{CHUNK_OUTPUT_PREFIX}{chunk_num-1}.cpt"
         
         script_parts = [
             "#!/bin/bash",
@@ -86,9 +85,8 @@ class ProductionChunker:
             "module load gromacs/2023.3_mpi",
             "",
             "# Configuration",
-            "export OMP_NUM_THREADS=2",
             f"CHUNK_NUM={chunk_num}",
-            f"OUTPUT_PREFIX=\"modelbound_${{CHUNK_NUM}}\"",
+            f"OUTPUT_PREFIX=\"{CHUNK_OUTPUT_PREFIX}${{CHUNK_NUM}}\"",
             f"MDP_TEMPLATE=\"{mdp_template}\"",
             f"CHUNK_MDP=\"chunk${{CHUNK_NUM}}_production.mdp\"",
             "",
@@ -124,10 +122,12 @@ class ProductionChunker:
             ])
         
         script_parts.extend([
+            "",
+            *mdrun_setup_lines(),
             "",
             "# Run production simulation",
             "echo \"Running production chunk $CHUNK_NUM...\"",
-            "srun gmx_mpi mdrun -v -deffnm \"$OUTPUT_PREFIX\" -dlb auto -nstlist 10 -ntomp 2",
+            f"{MDRUN_LAUNCH} gmx_mpi mdrun -v -deffnm \"$OUTPUT_PREFIX\" -dlb auto -nstlist 10 {MDRUN_ARGS}",
             "",
             "# Validate output",
             "if [[ ! -f \"${OUTPUT_PREFIX}.gro\" ]]; then",
@@ -144,6 +144,116 @@ class ProductionChunker:
         
         return "\n".join(script_parts)
     
+    def generate_chain_script(self, base_path: str, target_ns: float, sbatch_headers: str,
+                              mdp_template: str = "step7_production.mdp", script_name: str = "prod_chain.sh") -> str:
+        """Generate a self-resubmitting production chain
+        
+        Only one chunk is queued at a time: each chunk submits the next from
+        its epilogue until the total in the target_ns file is reached. The
+        target can be edited while the chain runs to extend or stop it.
+        """
+        base_path = Path(base_path)
+        mdp_path = base_path / mdp_template
+        
+        if not mdp_path.exists():
+            raise FileNotFoundError(f"MDP template not found: {mdp_path}")
+        
+        self._analyze_production_mdp(mdp_path)
+        nsteps = self.chunk_length_ns * self.steps_per_ns
+        start_structure = self._find_last_equilibration_file(base_path)
+        
+        script_parts = [
+            *sbatch_headers.rstrip('\n').split('\n'),
+            "",
+            f"# Production chain: {self.chunk_length_ns} ns chunks until the total in target_ns",
+            f"# Generated from template: {mdp_template}",
+            "",
+            "set -euo pipefail",
+            "",
+            "cd \"${SLURM_SUBMIT_DIR:-.}\"",
+            "",
+            "# Load required modules",
+            "module purge",
+            "module load gromacs/2023.3_mpi",
+            "",
+            "# Configuration",
+            f"CHAIN_SCRIPT=\"{script_name}\"",
+            f"CHUNK_LENGTH_NS={self.chunk_length_ns}",
+            "CHUNK_NUM=\"${CHUNK_NUM:-1}\"",
+            f"OUTPUT_PREFIX=\"{CHUNK_OUTPUT_PREFIX}${{CHUNK_NUM}}\"",
+            f"MDP_TEMPLATE=\"{mdp_template}\"",
+            "CHUNK_MDP=\"chunk${CHUNK_NUM}_production.mdp\"",
+            "",
+            "# The target is re-read at the start and end of every chunk",
+            "target_ns() { tr -d '[:space:]' < target_ns; }",
+            "reached_target() { awk -v done=\"$1\" -v target=\"$(target_ns)\" 'BEGIN { exit !(done >= target) }'; }",
+            "",
+            "if reached_target $(( (CHUNK_NUM - 1) * CHUNK_LENGTH_NS )); then",
+            "    echo \"Target of $(target_ns) ns already reached; chain finished\"",
+            "    exit 0",
+            "fi",
+            "",
+            "echo \"=== Production Chunk $CHUNK_NUM ($CHUNK_LENGTH_NS ns, target $(target_ns) ns) ===\"",
+            "",
+            "# Generate chunk-specific MDP and run input",
+            "if [[ ! -f \"${OUTPUT_PREFIX}.tpr\" ]]; then",
+            "    cp \"$MDP_TEMPLATE\" \"$CHUNK_MDP\"",
+            f"    sed -i 's/nsteps.*/nsteps = {nsteps}/' \"$CHUNK_MDP\"",
+            "    if [[ \"$CHUNK_NUM\" -eq 1 ]]; then",
+            "        gmx_mpi grompp -f \"$CHUNK_MDP\" \\",
+            f"            -c \"{start_structure}.gro\" \\",
+            "            -p topol.top \\",
+            "            -n index.ndx \\",
+            "            -o \"${OUTPUT_PREFIX}.tpr\" \\",
+            "            -maxwarn 1",
+            "    else",
+            f"        PREV_PREFIX=\"{CHUNK_OUTPUT_PREFIX}$(( CHUNK_NUM - 1 ))\"",
+            "        gmx_mpi grompp -f \"$CHUNK_MDP\" \\",
+            "            -c \"${PREV_PREFIX}.gro\" \\",
+            "            -t \"${PREV_PREFIX}.cpt\" \\",
+            "            -p topol.top \\",
+            "            -n index.ndx \\",
+            "            -o \"${OUTPUT_PREFIX}.tpr\"",
+            "    fi",
+            "    rm -f \"$CHUNK_MDP\"",
+            "fi",
+            "",
+            *mdrun_setup_lines(),
+            "",
+            "# Run production simulation, resuming from a checkpoint if this chunk was interrupted",
+            "CPI_ARGS=()",
+            "if [[ -f \"${OUTPUT_PREFIX}.cpt\" ]]; then",
+            "    CPI_ARGS=(-cpi \"${OUTPUT_PREFIX}.cpt\")",
+            "fi",
+            f"{MDRUN_LAUNCH} gmx_mpi mdrun -v -deffnm \"$OUTPUT_PREFIX\" -dlb auto -nstlist 10 {MDRUN_ARGS}"
+            " \"${CPI_ARGS[@]}\"",
+            "",
+            "# Validate output",
+            "if [[ ! -f \"${OUTPUT_PREFIX}.gro\" ]]; then",
+            "    echo \"ERROR: Production chunk $CHUNK_NUM failed; chain stopped\"",
+            "    exit 1",
+            "fi",
+            "",
+            "DONE_NS=$(( CHUNK_NUM * CHUNK_LENGTH_NS ))",
+            "echo \"$(date '+%F %T') chunk $CHUNK_NUM job ${SLURM_JOB_ID:-none} done ($DONE_NS ns)\" >> chain.log",
+            "",
+            "# Epilogue: queue the next chunk once this job has ended successfully",
+            "if reached_target \"$DONE_NS\"; then",
+            "    echo \"Target of $(target_ns) ns reached after chunk $CHUNK_NUM\"",
+            "else",
+            "    NEXT_JOB=$(sbatch --parsable --dependency=\"afterok:${SLURM_JOB_ID}\" \\",
+            "        --export=\"ALL,CHUNK_NUM=$(( CHUNK_NUM + 1 ))\" \"$CHAIN_SCRIPT\")",
+            "    echo \"Submitted chunk $(( CHUNK_NUM + 1 )) as job $NEXT_JOB\"",
+            "fi",
+            ""
+        ]
+        
+        script_path = base_path / script_name
+        self.writer.write(script_path, "\n".join(script_parts))
+        self.writer.write(base_path / "target_ns", f"{target_ns:g}\n", mode=0o644)
+        
+        return str(script_path)
+    
     def _find_last_equilibration_file(self, base_path: Path) -> str:
         """Find the last equilibration output file"""
         # Look for step6.6_equilibration first, then step6.X_equilibration
@@ -173,21 +283,17 @@ class ProductionChunker:
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        scripts = []
-        for i in range(self.total_chunks):
-            script_name = f"{prefix}{i+1}.sh"
-            script_path = output_dir / script_name
-            
-            with open(script_path, 'w') as f:
-                f.write(self._generate_chunk_script(i+1, mdp_template))
-            
-            script_path.chmod(0o755)  # Make executable
-            scripts.append(str(script_path))
-            
+        scripts = [str(output_dir / f"{prefix}{i+1}.sh") for i in range(self.total_chunks)]
+        
+        # Executable scripts; files with unchanged content are not rewritten
+        self.writer.write_many(
+            (script_path, partial(self._generate_template_chunk_script, i+1, mdp_template))
+            for i, script_path in enumerate(scripts)
+        )
         return scripts
         
-    def _generate_chunk_script(self, chunk_num: int, mdp_template: str = None) -> str:
-        """Generate individual chunk script content"""
+    def _generate_template_chunk_script(self, chunk_num: int, mdp_template: str = None) -> str:
+        """Generate individual chunk script content for generate_scripts()"""
         script = [
             "#!/bin/bash",
             "",
@@ -199,7 +305,9 @@ class ProductionChunker:
             'TPR_FILE="${TPR_FILE:-topol.tpr}"',
             f'OUTPUT_PREFIX="${{OUTPUT_PREFIX:-prod_chunk{chunk_num}}}"',
             "",
+            *mdrun_setup_lines(),
+            "",
             "# Run production",
-            "gmx_mpi mdrun -deffnm $OUTPUT_PREFIX -maxh 71"
+            f"{MDRUN_LAUNCH} gmx_mpi mdrun -deffnm $OUTPUT_PREFIX -maxh 71 {MDRUN_ARGS}"
         ]
         return "\n".join(script)
\ No newline at end of file
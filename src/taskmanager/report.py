@@ -0,0 +1,230 @@
+"""
+Efficiency report of finished workflow steps from sacct and md.log
+"""
+
+import os
+import re
+import statistics
+import subprocess
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from .status import StatusFetcher
+from .utils import TaskManagerError, ValidationError, parse_slurm_time
+from .walltime import parse_performance
+
+SIZE_UNITS = {'': 1 / 1024, 'K': 1, 'M': 1024, 'G': 1024 ** 2, 'T': 1024 ** 3, 'P': 1024 ** 4}
+SIZE_PATTERN = re.compile(r'^([\d.]+)([KMGTP]?)$')
+
+
+def parse_size_kb(value: str) -> Optional[float]:
+    """Kilobytes of a sacct size such as '1234K' or '187.50G'; plain numbers are bytes"""
+    match = SIZE_PATTERN.match(value.strip())
+    if not match:
+        return None
+    return float(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+
+def parse_cpu_time(value: str) -> Optional[float]:
+    """Seconds of a sacct CPU time, [D-][HH:]MM:SS[.mmm]"""
+    value = value.strip()
+    if not value:
+        return None
+    days = 0
+    try:
+        if '-' in value:
+            day_part, value = value.split('-', 1)
+            days = int(day_part)
+        parts = [float(part) for part in value.split(':')]
+    except ValueError:
+        return None
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return days * 86400 + seconds
+
+
+def parse_tres(value: str) -> Dict[str, str]:
+    """Fields of a TRES string such as 'billing=48,cpu=48,mem=187.50G,node=1'"""
+    return dict(item.split('=', 1) for item in value.split(',') if '=' in item)
+
+
+class EfficiencyReport:
+    """CPU efficiency, memory headroom and cost per ns of ledger steps
+
+    Accounting data for every step comes from one sacct call. The allocation
+    line gives Elapsed, TotalCPU and AllocTRES; MaxRSS is per task, so memory
+    use is taken as MaxRSS times NTasks of the largest job step. GROMACS
+    performance is read from the md.log each step wrote.
+    """
+
+    SACCT_FIELDS = 'JobID,State,Elapsed,TotalCPU,MaxRSS,NTasks,AllocTRES'
+
+    def __init__(self, runner=subprocess.run, min_cpu_efficiency: float = 0.5,
+                 min_memory_use: float = 0.25, min_elapsed: int = 60):
+        self.runner = runner
+        self.min_cpu_efficiency = min_cpu_efficiency
+        self.min_memory_use = min_memory_use
+        # Shorter steps are dominated by startup and are not flagged
+        self.min_elapsed = min_elapsed
+
+    def fetch(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Accounting of each job and array task, keyed like '123' or '123_4'"""
+        job_ids = sorted({str(job_id) for job_id in job_ids if str(job_id).isdigit()})
+        accounting = {}
+        for start in range(0, len(job_ids), StatusFetcher.MAX_IDS_PER_CALL):
+            cmd = ['sacct', '-j', ','.join(job_ids[start:start + StatusFetcher.MAX_IDS_PER_CALL]),
+                   '--parsable2', '--noheader', f'--format={self.SACCT_FIELDS}']
+            try:
+                result = self.runner(cmd, capture_output=True, text=True, timeout=120)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                raise TaskManagerError(f"sacct failed: {e}")
+            if result.returncode != 0:
+                raise TaskManagerError(f"sacct failed: {result.stderr.strip()}")
+            accounting.update(self.parse_sacct(result.stdout))
+        return accounting
+
+    @staticmethod
+    def parse_sacct(output: str) -> Dict[str, Dict[str, Any]]:
+        """Merge allocation and job step lines of sacct output per job"""
+        jobs = {}
+        for line in output.splitlines():
+            fields = line.split('|')
+            if len(fields) < 7:
+                continue
+            job_id, state, elapsed, total_cpu, max_rss, ntasks, alloc_tres = fields[:7]
+            key, _, job_step = job_id.partition('.')
+            job = jobs.setdefault(key, {'mem_used_kb': None})
+
+            if not job_step:
+                tres = parse_tres(alloc_tres)
+                try:
+                    elapsed_seconds = parse_slurm_time(elapsed)
+                except ValidationError:
+                    elapsed_seconds = None
+                job.update(
+                    state=state.split()[0] if state else 'UNKNOWN',
+                    elapsed=elapsed_seconds,
+                    cpu_seconds=parse_cpu_time(total_cpu),
+                    cpus=int(tres['cpu']) if 'cpu' in tres else None,
+                    nodes=int(tres['node']) if 'node' in tres else None,
+                    mem_alloc_kb=parse_size_kb(tres['mem']) if 'mem' in tres else None,
+                )
+                continue
+
+            rss = parse_size_kb(max_rss) if max_rss else None
+            if rss is not None:
+                used = rss * (int(ntasks) if ntasks.isdigit() else 1)
+                job['mem_used_kb'] = max(job['mem_used_kb'] or 0, used)
+        return jobs
+
+    def find_md_log(self, step: Dict[str, Any]) -> Optional[str]:
+        """md.log written by a step
+
+        The log named after the step script is preferred; otherwise the
+        newest log in the step directory written while the step ran.
+        """
+        path = Path(step.get('path') or '.')
+        named = path / f"{Path(step['step']).stem}.log"
+        if named.exists():
+            return str(named)
+
+        start, end = step.get('start_time'), step.get('end_time')
+        if start is None or end is None:
+            return None
+        candidates = []
+        for log_file in path.glob('*.log'):
+            mtime = log_file.stat().st_mtime
+            if start <= mtime <= end + 300:
+                candidates.append((mtime, str(log_file)))
+        return max(candidates)[1] if candidates else None
+
+    def build(self, steps: List[Dict[str, Any]], accounting: Optional[Dict[str, Dict[str, Any]]] = None
+              ) -> List[Dict[str, Any]]:
+        """One report row per ledger step"""
+        if accounting is None:
+            accounting = self.fetch([step['slurm_id'] for step in steps if step['slurm_id']])
+
+        rows = []
+        for step in steps:
+            if step['slurm_id'] is None:
+                continue
+            key = step['slurm_id'] if step['array_index'] is None else f"{step['slurm_id']}_{step['array_index']}"
+            job = accounting.get(key, {})
+            row = {
+                'workflow': step['workflow'],
+                'job': step['job'],
+                'step': step['step'],
+                'job_type': step.get('job_type'),
+                'slurm_id': key,
+                'state': job.get('state', step['state']),
+                'elapsed': job.get('elapsed'),
+                'cpus': job.get('cpus'),
+                'nodes': job.get('nodes'),
+                'cpu_efficiency': None,
+                'memory_use': None,
+                'ns_per_day': None,
+                'core_hours_per_ns': None,
+                'flags': [],
+            }
+
+            if job.get('elapsed') and job.get('cpus') and job.get('cpu_seconds') is not None:
+                row['cpu_efficiency'] = job['cpu_seconds'] / (job['elapsed'] * job['cpus'])
+            if job.get('mem_alloc_kb') and job.get('mem_used_kb') is not None:
+                row['memory_use'] = job['mem_used_kb'] / job['mem_alloc_kb']
+
+            log_file = self.find_md_log(step)
+            if log_file:
+                row['ns_per_day'] = parse_performance(log_file)
+            if row['ns_per_day'] and row['cpus']:
+                row['core_hours_per_ns'] = row['cpus'] * 24 / row['ns_per_day']
+
+            row['flags'] = self.flags(row)
+            rows.append(row)
+        return rows
+
+    def flags(self, row: Dict[str, Any]) -> List[str]:
+        """Warnings for resources a completed step used only a fraction of"""
+        if row['state'] != 'COMPLETED' or (row['elapsed'] or 0) < self.min_elapsed:
+            return []
+        section = f"[{row['job_type']}]" if row['job_type'] else 'its section'
+        flags = []
+        if row['cpu_efficiency'] is not None and row['cpu_efficiency'] < self.min_cpu_efficiency:
+            advice = 'fewer NODES' if (row['nodes'] or 1) > 1 else 'fewer NTASKS_PER_NODE'
+            flags.append(f"CPU efficiency {row['cpu_efficiency']:.0%}: try {advice} in {section}")
+        if row['memory_use'] is not None and row['memory_use'] < self.min_memory_use:
+            flags.append(f"used {row['memory_use']:.0%} of allocated memory: lower MEM_PER_CPU in {section}")
+        return flags
+
+    @staticmethod
+    def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Median efficiency, memory use and cost per job type"""
+        summary = {}
+        for job_type in sorted({row['job_type'] or 'unknown' for row in rows}):
+            typed = [row for row in rows if (row['job_type'] or 'unknown') == job_type]
+            summary[job_type] = {'steps': len(typed)}
+            for field in ('cpu_efficiency', 'memory_use', 'ns_per_day', 'core_hours_per_ns'):
+                values = [row[field] for row in typed if row[field] is not None]
+                summary[job_type][field] = statistics.median(values) if values else None
+        return summary
+
+
+def format_report(rows: List[Dict[str, Any]]) -> str:
+    """Table of report rows followed by their flags"""
+    def percent(value):
+        return '-' if value is None else f"{value:.0%}"
+
+    def number(value, digits=1):
+        return '-' if value is None else f"{value:.{digits}f}"
+
+    lines = [f"{'step':<36} {'job id':>12} {'state':<10} {'cpus':>5} {'cpu eff':>8} {'mem use':>8}"
+             f" {'ns/day':>8} {'core-h/ns':>10}"]
+    for row in rows:
+        name = os.path.join(row['job'], row['step'])
+        lines.append(
+            f"{name:<36} {row['slurm_id']:>12} {row['state']:<10} {row['cpus'] or '-':>5}"
+            f" {percent(row['cpu_efficiency']):>8} {percent(row['memory_use']):>8}"
+            f" {number(row['ns_per_day'], 2):>8} {number(row['core_hours_per_ns']):>10}"
+        )
+        for flag in row['flags']:
+            lines.append(f"  ! {flag}")
+    return '\n'.join(lines)
@@ -2,18 +2,22 @@
 Script generator with configurable templates and parameters
 """
 
-import os
 import re
 import yaml
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from functools import partial
+from typing import Dict, Any, Optional, List, Tuple
 from taskmanager.config import SlurmConfig
+from taskmanager.mdrun import mdrun_setup
+from taskmanager.template import load_template
+from taskmanager.writer import BulkWriter
 
 class ScriptGenerator:
     """Generate configurable GROMACS scripts from templates"""
     
     def __init__(self, config: SlurmConfig, template_dir: str = None):
         self.config = config  # Add config reference
+        self.writer = BulkWriter()
         if template_dir is None:
             # Default to taskmanager/templates directory
             self.template_dir = Path(__file__).parent / "templates"
@@ -50,7 +54,6 @@ module purge
 module load gromacs/2024.3-gcc-14.2.0
 
 # Configuration variables
-export OMP_NUM_THREADS=2
 INPUT_STRUCTURE="${INPUT_STRUCTURE:-step5_input.gro}"
 MDP_FILE="${MDP_FILE:-step6.0_steep.mdp}"
 TOPOLOGY_FILE="${TOPOLOGY_FILE:-topol.top}"
@@ -84,12 +87,13 @@ echo "Generating TPR file..."
 gmx grompp -f "$MDP_FILE" -c "$INPUT_STRUCTURE" -p "$TOPOLOGY_FILE" \\
            -o "${OUTPUT_PREFIX}.tpr" -maxwarn "$MAX_WARNINGS" -r step5_input.pdb
 
+''' + mdrun_setup(dynamics=False) + '''
 # Run minimization with srun for proper MPI execution
 echo "Running steepest descent minimization..."
 if [[ "$VERBOSE_OUTPUT" == "true" ]]; then
-    srun gmx_mpi mdrun -v -deffnm "$OUTPUT_PREFIX" -ntomp 2
+    "${MDRUN_LAUNCHER[@]}" gmx_mpi mdrun -v -deffnm "$OUTPUT_PREFIX" "${MDRUN_FLAGS[@]}"
 else
-    srun gmx_mpi mdrun -deffnm "$OUTPUT_PREFIX" -ntomp 2
+    "${MDRUN_LAUNCHER[@]}" gmx_mpi mdrun -deffnm "$OUTPUT_PREFIX" "${MDRUN_FLAGS[@]}"
 fi
 
 # Validate output
@@ -143,12 +147,13 @@ echo "Generating TPR file..."
 gmx grompp -f "$MDP_FILE" -c "$INPUT_STRUCTURE" -p "$TOPOLOGY_FILE" \\
            -o "${OUTPUT_PREFIX}.tpr" -maxwarn "$MAX_WARNINGS"
 
+''' + mdrun_setup(dynamics=False) + '''
 # Run minimization
 echo "Running conjugate gradient minimization..."
 if [[ "$VERBOSE_OUTPUT" == "true" ]]; then
-    gmx_mpi  mdrun -v -deffnm "$OUTPUT_PREFIX"
+    "${MDRUN_LAUNCHER[@]}" gmx_mpi mdrun -v -deffnm "$OUTPUT_PREFIX" "${MDRUN_FLAGS[@]}"
 else
-    gmx_mpi mdrun -deffnm "$OUTPUT_PREFIX"
+    "${MDRUN_LAUNCHER[@]}" gmx_mpi mdrun -deffnm "$OUTPUT_PREFIX" "${MDRUN_FLAGS[@]}"
 fi
 
 echo "Conjugate gradient minimization completed"
@@ -193,9 +198,10 @@ fi
 
 eval "$grompp_cmd"
 
+''' + mdrun_setup() + '''
 # Run equilibration
 echo "Running equilibration..."
-gmx_mpi mdrun -v -deffnm "$OUTPUT_PREFIX"
+"${MDRUN_LAUNCHER[@]}" gmx_mpi mdrun -v -deffnm "$OUTPUT_PREFIX" "${MDRUN_FLAGS[@]}"
 
 echo "$STAGE_NAME completed"
 echo "Output: ${OUTPUT_PREFIX}.gro, ${OUTPUT_PREFIX}.cpt, ${OUTPUT_PREFIX}.edr"
@@ -235,16 +241,21 @@ echo "Generating TPR file..."
 gmx_mpi grompp -f "$MDP_FILE" -c "$INPUT_STRUCTURE" -t "$INPUT_CHECKPOINT" \\
            -p "$TOPOLOGY_FILE" -o "${OUTPUT_PREFIX}.tpr" -maxwarn "$MAX_WARNINGS"
 
+''' + mdrun_setup() + '''
 # Run production
 echo "Starting production simulation..."
-gmx_mpi mdrun -v -deffnm "$OUTPUT_PREFIX"
+"${MDRUN_LAUNCHER[@]}" gmx_mpi mdrun -v -deffnm "$OUTPUT_PREFIX" "${MDRUN_FLAGS[@]}"
 
 echo "Production simulation completed"
 echo "Output: ${OUTPUT_PREFIX}.xtc, ${OUTPUT_PREFIX}.edr, ${OUTPUT_PREFIX}.gro"
 '''
     
-    def generate_script(self, script_type: str, output_path: str, custom_config: Dict[str, Any] = None) -> str:
-        """Generate script from template with SLURM headers"""
+    def render_script(self, script_type: str, custom_config: Dict[str, Any] = None, strict: bool = False) -> str:
+        """Render a script from its template with SLURM headers
+        
+        Config values replace $KEY, ${KEY} and ${KEY:-default} in the
+        template; other keys are ignored unless strict makes them an error.
+        """
         template_path = self.template_dir / f"{script_type}.sh.template"
         
         if not template_path.exists():
@@ -254,29 +265,37 @@ echo "Output: ${OUTPUT_PREFIX}.xtc, ${OUTPUT_PREFIX}.edr, ${OUTPUT_PREFIX}.gro"
                 f"Available templates: {', '.join(available)}"
             )
         
-        # Load template
-        with open(template_path, 'r') as f:
-            template_content = f.read()
-        
-        # Apply configuration
-        config = custom_config or {}
-        script_content = self._apply_template_config(template_content, config)
+        # Apply configuration to the compiled template
+        script_content = load_template(template_path).render(custom_config or {}, strict)
         
         # Add SLURM headers if not present
         if not script_content.startswith('#SBATCH'):
             script_content = self._add_slurm_headers(script_content, script_type)
         
-        # Write script
+        return script_content
+    
+    def generate_script(self, script_type: str, output_path: str, custom_config: Dict[str, Any] = None,
+                        strict: bool = False) -> str:
+        """Generate an executable script from template; an unchanged file is left as is"""
         output_file = Path(output_path)
         output_file.parent.mkdir(parents=True, exist_ok=True)
+        self.writer.write(output_file, self.render_script(script_type, custom_config, strict))
+        return str(output_file)
+    
+    def generate_scripts(self, requests: List[Tuple[str, str, Dict[str, Any]]], strict: bool = False) -> List[str]:
+        """Render and write many (script_type, output_path, config) scripts concurrently
         
-        with open(output_file, 'w') as f:
-            f.write(script_content)
-        
-        # Make executable
-        os.chmod(output_file, 0o755)
+        Files whose content is unchanged are not rewritten; self.writer
+        counts how many were written and skipped.
+        """
+        for parent in {Path(output_path).parent for _, output_path, _ in requests}:
+            parent.mkdir(parents=True, exist_ok=True)
         
-        return str(output_file)
+        self.writer.write_many(
+            (output_path, partial(self.render_script, script_type, config, strict))
+            for script_type, output_path, config in requests
+        )
+        return [str(output_path) for _, output_path, _ in requests]
     
     def _add_slurm_headers(self, content: str, script_type: str) -> str:
         """Add SLURM headers to script content"""
@@ -296,15 +315,6 @@ echo "Output: ${OUTPUT_PREFIX}.xtc, ${OUTPUT_PREFIX}.edr, ${OUTPUT_PREFIX}.gro"
         
         return '\n'.join(lines)
     
-    def _apply_template_config(self, content: str, config: Dict[str, Any]) -> str:
-        """Apply configuration to template content"""
-        for key, value in config.items():
-            # Replace template variables
-            content = content.replace(f"${{{key}}}", str(value))
-            content = content.replace(f"${key}", str(value))
-        
-        return content
-    
     def list_available_templates(self) -> List[str]:
         """List available script templates"""
         templates = []
@@ -315,19 +325,4 @@ echo "Output: ${OUTPUT_PREFIX}.xtc, ${OUTPUT_PREFIX}.edr, ${OUTPUT_PREFIX}.gro"
 
     def _format_sbatch_headers(self, job_type: str, nodes: int = None) -> str:
         """Format SBATCH headers for the script"""
-        headers = []
-        headers.append("#!/bin/bash\n")
-        headers.append("# SLURM job parameters")
-        
-        params = self.config.get_job_params(job_type, nodes)
-        for key, value in params.items():
-            if key == 'OUTPUT_DIR':
-                continue
-            if key == 'OUTPUT_PATTERN':
-                headers.append(f"#SBATCH --output={params.get('OUTPUT_DIR', 'logs')}/{value}")
-            elif key == 'ERROR_PATTERN':
-                headers.append(f"#SBATCH --error={params.get('OUTPUT_DIR', 'logs')}/{value}")
-            else:
-                headers.append(f"#SBATCH --{key.lower()}={value}")
-        
-        return "\n".join(headers)
\ No newline at end of file
+        return self.config.format_sbatch_headers(job_type, nodes)
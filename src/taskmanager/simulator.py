@@ -0,0 +1,202 @@
+"""
+Discrete-event simulation of workflows for makespan and cost planning
+"""
+
+import heapq
+import statistics
+from typing import List, Dict, Any, Optional, Tuple
+from .batch import BatchManager
+from .config import SlurmConfig
+from .sizing import PerformanceModel
+from .utils import ValidationError, parse_slurm_time
+from .walltime import WalltimeEstimator, chunk_log_patterns
+
+
+class WorkflowSimulator:
+    """Plays out steps with dependencies, queue waits and a node limit
+
+    Every step is submitted at time zero and becomes eligible when its last
+    parent finishes. It then waits its queue time and starts as soon as
+    enough of max_nodes are free, in the order steps left the queue.
+    """
+
+    def __init__(self, max_nodes: Optional[int] = None):
+        self.max_nodes = max_nodes
+
+    def simulate(self, tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Simulate tasks with 'name', 'depends_on', 'nodes', 'seconds', 'wait' and 'cores'
+
+        Returns the makespan, core-hours, per-task timeline and critical path.
+        """
+        by_name = {task['name']: task for task in tasks}
+        for task in tasks:
+            if self.max_nodes is not None and task['nodes'] > self.max_nodes:
+                raise ValidationError(f"Step {task['name']} needs {task['nodes']} nodes, more than {self.max_nodes}")
+
+        children = {name: [] for name in by_name}
+        waiting = {}
+        for task in tasks:
+            waiting[task['name']] = len(task['depends_on'])
+            for parent in task['depends_on']:
+                children[parent].append(task['name'])
+
+        timeline = {name: {'name': name} for name in by_name}
+        events = []
+        sequence = 0
+
+        def push(time, kind, name):
+            nonlocal sequence
+            heapq.heappush(events, (time, sequence, kind, name))
+            sequence += 1
+
+        for task in tasks:
+            if not task['depends_on']:
+                timeline[task['name']]['eligible'] = 0.0
+                push(task['wait'], 'queued', task['name'])
+
+        free = self.max_nodes
+        queue = []
+        while events:
+            now, _, kind, name = heapq.heappop(events)
+            task = by_name[name]
+
+            if kind == 'queued':
+                queue.append(name)
+            else:
+                timeline[name]['end'] = now
+                if free is not None:
+                    free += task['nodes']
+                for child in children[name]:
+                    waiting[child] -= 1
+                    if waiting[child] == 0:
+                        timeline[child]['eligible'] = now
+                        push(now + by_name[child]['wait'], 'queued', child)
+
+            for queued in list(queue):
+                nodes = by_name[queued]['nodes']
+                if free is None or nodes <= free:
+                    if free is not None:
+                        free -= nodes
+                    queue.remove(queued)
+                    timeline[queued]['start'] = now
+                    push(now + by_name[queued]['seconds'], 'finished', queued)
+
+        makespan = max((entry['end'] for entry in timeline.values()), default=0.0)
+        core_hours = sum(task['nodes'] * task['cores'] * task['seconds'] for task in tasks) / 3600
+        return {
+            'makespan': makespan,
+            'core_hours': core_hours,
+            'timeline': [timeline[task['name']] for task in tasks],
+            'critical_path': self.critical_path(by_name, timeline),
+        }
+
+    @staticmethod
+    def critical_path(by_name: Dict[str, Dict[str, Any]], timeline: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Chain of latest-finishing parents leading to the last step to finish"""
+        if not timeline:
+            return []
+        name = max(timeline, key=lambda name: timeline[name]['end'])
+        path = [name]
+        while by_name[name]['depends_on']:
+            name = max(by_name[name]['depends_on'], key=lambda parent: timeline[parent]['end'])
+            path.append(name)
+        return path[::-1]
+
+
+class WorkflowPlanner:
+    """Builds simulation tasks from jobs and compares resource choices
+
+    Chunk runtimes come from chunk_length_ns and the ns/day declared in
+    chunk_config or measured from completed chunk logs; other steps use
+    their 'runtime', or the configured TIME as an upper bound. Measured
+    and declared runtimes are taken to be at the configured node count and
+    scale to other counts as (nodes / configured) ** scaling. Queue waits
+    are QUEUE_WAIT plus QUEUE_WAIT_PER_NODE times the node count, both
+    SLURM times from the job type's .slurmparams section.
+    """
+
+    def __init__(self, config: SlurmConfig, scaling: float = 0.8, max_nodes: Optional[int] = None):
+        self.config = config
+        self.scaling = scaling
+        self.simulator = WorkflowSimulator(max_nodes)
+        self.batch_manager = BatchManager(config)
+
+    def measured_ns_per_day(self, job: Dict[str, Any]) -> Optional[float]:
+        """ns/day declared for a chunked job, or the median of its completed chunks"""
+        chunk_config = job.get('chunk_config', {})
+        if chunk_config.get('ns_per_day'):
+            return float(chunk_config['ns_per_day'])
+        estimator = WalltimeEstimator()
+        logs = estimator.find_chunk_logs(job.get('path', '.'), chunk_log_patterns(job))
+        performance = estimator.collect_performance(logs)
+        return statistics.median(performance) if performance else None
+
+    def step_seconds(self, job: Dict[str, Any], params: Dict[str, str], nodes: int) -> float:
+        """Predicted runtime of one step of a job on the given node count"""
+        seconds = None
+        if job.get('is_chunked'):
+            ns_per_day = self.measured_ns_per_day(job)
+            if ns_per_day:
+                seconds = job['chunk_metadata'].get('chunk_length_ns', 10) / ns_per_day * 86400
+        if seconds is None:
+            seconds = parse_slurm_time(job.get('runtime', params.get('TIME', '1-00:00:00')))
+
+        configured = int(params.get('NODES', 1))
+        return seconds * (configured / nodes) ** self.scaling
+
+    @staticmethod
+    def queue_wait(params: Dict[str, str], nodes: int) -> float:
+        base = parse_slurm_time(params.get('QUEUE_WAIT', '0'))
+        per_node = parse_slurm_time(params.get('QUEUE_WAIT_PER_NODE', '0'))
+        return base + per_node * nodes
+
+    def tasks(self, jobs: List[Dict[str, Any]], execution_mode: str = "sequential",
+              nodes: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Simulation tasks of a workflow, optionally with chunked jobs on another node count
+
+        Without chunked jobs, the node count applies to every job.
+        """
+        by_name = {job['name']: job for job in jobs}
+        chunked = any(job.get('is_chunked') for job in jobs)
+        tasks = []
+
+        for step in self.batch_manager.build_steps(jobs, execution_mode):
+            job = by_name[step['job_name']]
+            resources = step['resources']
+            params = self.config.get_job_params(resources['job_type'], resources['nodes'], resources['atoms'],
+                                                resources['time'])
+            step_nodes = int(params.get('NODES', 1))
+            if nodes is not None and (job.get('is_chunked') or not chunked):
+                step_nodes = nodes
+            tasks.append({
+                'name': step['name'],
+                'depends_on': step['depends_on'],
+                'nodes': step_nodes,
+                'cores': PerformanceModel.from_params(params).cores_per_node,
+                'seconds': self.step_seconds(job, params, step_nodes),
+                'wait': self.queue_wait(params, step_nodes),
+            })
+        return tasks
+
+    def plan(self, jobs: List[Dict[str, Any]], execution_mode: str = "sequential",
+             nodes: Optional[int] = None) -> Dict[str, Any]:
+        return self.simulator.simulate(self.tasks(jobs, execution_mode, nodes))
+
+    def compare(self, variants: Dict[str, List[Dict[str, Any]]], node_counts: Optional[List[Optional[int]]] = None,
+                execution_mode: str = "sequential", budget: Optional[float] = None
+                ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Simulate every variant (e.g. execution profile) on every node count
+
+        Returns all results and the one with the shortest makespan within the
+        core-hour budget (fewest core-hours on ties), or None if none fits.
+        """
+        results = []
+        for label, jobs in variants.items():
+            for nodes in node_counts or [None]:
+                result = self.plan(jobs, execution_mode, nodes)
+                result.update(variant=label, nodes=nodes)
+                results.append(result)
+
+        affordable = [result for result in results if budget is None or result['core_hours'] <= budget]
+        best = min(affordable, key=lambda result: (result['makespan'], result['core_hours']), default=None)
+        return results, best
@@ -0,0 +1,110 @@
+"""
+Resource sizing from system size and a per-partition performance model
+"""
+
+import math
+import os
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+from .utils import ValidationError
+
+
+def read_gro_header(gro_file: str) -> Dict[str, Any]:
+    """Read atom count (line 2) and box vectors (last line) of a .gro file
+    
+    Only the first two lines and the tail of the file are read, so this is
+    cheap even for multi-million atom systems.
+    """
+    path = Path(gro_file)
+    
+    with open(path, 'rb') as f:
+        f.readline()
+        count_line = f.readline()
+        
+        # Walk back from the end until the last non-empty line is complete
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        block = 256
+        tail = b""
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            tail = f.read(end - start) + tail
+            end = start
+            stripped = tail.rstrip()
+            if b"\n" in stripped:
+                break
+        box_line = tail.rstrip().rsplit(b"\n", 1)[-1]
+    
+    try:
+        atoms = int(count_line.strip())
+        box = tuple(float(value) for value in box_line.split()[:3])
+    except ValueError:
+        raise ValidationError(f"Not a valid .gro file: {gro_file}")
+    
+    if len(box) != 3:
+        raise ValidationError(f"Missing box vectors in {gro_file}")
+    
+    return {'atoms': atoms, 'box': box}
+
+
+class PerformanceModel:
+    """GROMACS scaling model for one partition"""
+    
+    # Built-in models; any value can be overridden from .slurmparams
+    PARTITION_DEFAULTS = {
+        'altair': {
+            'CORES_PER_NODE': 48,
+            'ATOMS_PER_CORE': 1000,
+            'MEM_PER_ATOM_KB': 2,
+            'MEM_BASE_MB': 256,
+        },
+        'default': {
+            'CORES_PER_NODE': 32,
+            'ATOMS_PER_CORE': 1000,
+            'MEM_PER_ATOM_KB': 2,
+            'MEM_BASE_MB': 256,
+        },
+    }
+    
+    def __init__(self, cores_per_node: int, atoms_per_core: int, mem_per_atom_kb: float, mem_base_mb: int):
+        self.cores_per_node = cores_per_node
+        self.atoms_per_core = atoms_per_core
+        self.mem_per_atom_kb = mem_per_atom_kb
+        self.mem_base_mb = mem_base_mb
+    
+    @classmethod
+    def from_params(cls, params: Dict[str, str]) -> 'PerformanceModel':
+        """Build the model for the configured partition, applying overrides"""
+        partition = params.get('PARTITION', 'default').lower()
+        model = dict(cls.PARTITION_DEFAULTS.get(partition, cls.PARTITION_DEFAULTS['default']))
+        for key in model:
+            if key in params:
+                model[key] = float(params[key])
+        
+        return cls(
+            cores_per_node=int(model['CORES_PER_NODE']),
+            atoms_per_core=int(model['ATOMS_PER_CORE']),
+            mem_per_atom_kb=float(model['MEM_PER_ATOM_KB']),
+            mem_base_mb=int(model['MEM_BASE_MB'])
+        )
+    
+    def suggest(self, atoms: int, cpus_per_task: int = 1) -> Dict[str, str]:
+        """Suggest NODES, NTASKS_PER_NODE, CPUS_PER_TASK and MEM_PER_CPU for a system"""
+        cores = max(1, math.ceil(atoms / self.atoms_per_core))
+        cpus_per_task = max(1, min(cpus_per_task, cores, self.cores_per_node))
+        nodes = max(1, math.ceil(cores / self.cores_per_node))
+        cores_per_node = min(self.cores_per_node, math.ceil(cores / nodes))
+        ntasks_per_node = max(1, cores_per_node // cpus_per_task)
+        
+        ranks = nodes * ntasks_per_node
+        total_cpus = ranks * cpus_per_task
+        mem_mb = ranks * self.mem_base_mb + atoms * self.mem_per_atom_kb / 1024
+        mem_per_cpu = max(self.mem_base_mb, math.ceil(mem_mb / total_cpus))
+        
+        return {
+            'NODES': str(nodes),
+            'NTASKS_PER_NODE': str(ntasks_per_node),
+            'CPUS_PER_TASK': str(cpus_per_task),
+            'MEM_PER_CPU': f"{mem_per_cpu}MB",
+        }
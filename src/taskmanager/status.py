@@ -0,0 +1,167 @@
+"""
+Workflow status from one batched sacct call per refresh
+"""
+
+import json
+import os
+import re
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from .ledger import JobLedger
+from .utils import TaskManagerError
+
+ARRAY_RANGE_PATTERN = re.compile(r'^(\d+)_\[([^\]]+)\]$')
+
+
+def parse_sacct_time(value: str) -> Optional[float]:
+    """Unix timestamp of a sacct time field, or None for Unknown/None"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S').timestamp()
+    except ValueError:
+        return None
+
+
+def expand_array_range(spec: str) -> List[int]:
+    """Task indices of a pending array spec such as '2-5,7%1'"""
+    indices = []
+    for part in spec.split('%')[0].split(','):
+        if '-' in part:
+            first, last = part.split('-', 1)
+            indices.extend(range(int(first), int(last) + 1))
+        elif part:
+            indices.append(int(part))
+    return indices
+
+
+class StatusFetcher:
+    """Fetches SLURM job states in as few sacct calls as possible
+
+    Results are cached in a JSON file for ttl seconds, so repeated status
+    checks within that window do not reach the SLURM controller at all.
+    """
+
+    DEFAULT_CACHE = '.taskmanager/status_cache.json'
+    SACCT_FIELDS = 'JobID,State,Start,End,ExitCode'
+    # Job IDs per sacct call, well below command line limits
+    MAX_IDS_PER_CALL = 1000
+
+    def __init__(self, ttl: float = 60.0, cache_file: Optional[str] = DEFAULT_CACHE,
+                 runner=subprocess.run, clock=time.time):
+        self.ttl = ttl
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.runner = runner
+        self.clock = clock
+
+    def fetch(self, job_ids: List[str], refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """State of each job and array task, keyed like '123' or '123_4'"""
+        job_ids = sorted({str(job_id) for job_id in job_ids if str(job_id).isdigit()})
+        cache = self._load_cache()
+        now = self.clock()
+
+        stale = [
+            job_id for job_id in job_ids
+            if refresh or now - cache['fetched'].get(job_id, float('-inf')) > self.ttl
+        ]
+        for start in range(0, len(stale), self.MAX_IDS_PER_CALL):
+            batch = stale[start:start + self.MAX_IDS_PER_CALL]
+            rows = self._run_sacct(batch)
+            for job_id in batch:
+                cache['fetched'][job_id] = now
+            cache['jobs'].update(rows)
+
+        if stale:
+            self._save_cache(cache)
+
+        wanted = set(job_ids)
+        return {key: row for key, row in cache['jobs'].items() if key.split('_')[0] in wanted}
+
+    def _run_sacct(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        cmd = ['sacct', '-j', ','.join(job_ids), '-X', '--parsable2', '--noheader',
+               f'--format={self.SACCT_FIELDS}']
+        try:
+            result = self.runner(cmd, capture_output=True, text=True, timeout=60)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise TaskManagerError(f"sacct failed: {e}")
+        if result.returncode != 0:
+            raise TaskManagerError(f"sacct failed: {result.stderr.strip()}")
+        return self.parse_sacct(result.stdout)
+
+    @staticmethod
+    def parse_sacct(output: str) -> Dict[str, Dict[str, Any]]:
+        """Rows of `sacct --parsable2` output keyed by job ID or job_task"""
+        rows = {}
+        for line in output.splitlines():
+            fields = line.split('|')
+            if len(fields) < 5:
+                continue
+            job_id, state, start, end, exit_code = fields[:5]
+            row = {
+                'state': state.split()[0] if state else 'UNKNOWN',
+                'start_time': parse_sacct_time(start),
+                'end_time': parse_sacct_time(end),
+                'exit_code': int(exit_code.split(':')[0]) if exit_code[:1].isdigit() else None,
+            }
+
+            # Pending array tasks are listed as one range, e.g. 123_[2-5%1]
+            match = ARRAY_RANGE_PATTERN.match(job_id)
+            if match:
+                for index in expand_array_range(match.group(2)):
+                    rows[f"{match.group(1)}_{index}"] = dict(row)
+            else:
+                rows[job_id] = row
+        return rows
+
+    def _load_cache(self) -> Dict[str, Any]:
+        if self.cache_file is not None:
+            try:
+                with open(self.cache_file) as f:
+                    return json.load(f)
+            except (FileNotFoundError, ValueError):
+                pass
+        return {'fetched': {}, 'jobs': {}}
+
+    def _save_cache(self, cache: Dict[str, Any]):
+        if self.cache_file is None:
+            return
+        # Entries of jobs not asked about for a day are dropped
+        cutoff = self.clock() - 86400
+        cache['fetched'] = {job_id: t for job_id, t in cache['fetched'].items() if t >= cutoff}
+        cache['jobs'] = {key: row for key, row in cache['jobs'].items() if key.split('_')[0] in cache['fetched']}
+
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, self.cache_file)
+
+
+class WorkflowStatus:
+    """Refreshes the ledger from SLURM and reports per-step state"""
+
+    def __init__(self, ledger: JobLedger, fetcher: Optional[StatusFetcher] = None):
+        self.ledger = ledger
+        self.fetcher = fetcher or StatusFetcher()
+
+    def refresh(self, workflow: Optional[str] = None, refresh: bool = False) -> int:
+        """Update every non-terminal step with one batched sacct lookup"""
+        active = self.ledger.active_steps(workflow)
+        if not active:
+            return 0
+
+        states = self.fetcher.fetch([step['slurm_id'] for step in active], refresh)
+        updates = []
+        for step in active:
+            key = step['slurm_id'] if step['array_index'] is None else f"{step['slurm_id']}_{step['array_index']}"
+            row = states.get(key)
+            if row is not None:
+                updates.append(dict(row, slurm_id=step['slurm_id'], array_index=step['array_index']))
+
+        return self.ledger.update_states(updates) if updates else 0
+
+    def summary(self, workflow: Optional[str] = None) -> List[Tuple[str, Dict[str, int]]]:
+        """(workflow, state counts) for every workflow matching a key or name, or all of them"""
+        workflows = self.ledger.workflows(workflow)
+        return [(name, self.ledger.state_counts(name)) for name in workflows]
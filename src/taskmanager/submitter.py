@@ -0,0 +1,223 @@
+"""
+Native SLURM submitter calling sbatch --parsable directly
+"""
+
+import asyncio
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Any, Optional, Callable
+from .utils import SubmissionError
+
+
+class Submitter:
+    """Submit job scripts through sbatch stdin, with retries on transient errors"""
+    
+    # Controller hiccups worth retrying; anything else is a real rejection
+    TRANSIENT_ERRORS = (
+        'slurm_load_jobs',
+        'Socket timed out',
+        'Unable to contact slurm controller',
+        'Resource temporarily unavailable',
+        'temporarily unable to accept job',
+    )
+    
+    def __init__(self, sbatch: str = 'sbatch', max_retries: int = 5, backoff: float = 1.0,
+                 max_workers: int = 4, timeout: float = 60.0, dry_run: bool = False,
+                 runner: Optional[Callable] = None, sleep: Optional[Callable[[float], None]] = None,
+                 async_runner: Optional[Callable] = None):
+        self.sbatch = sbatch
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.dry_run = dry_run
+        self.runner = runner or subprocess.run
+        self.sleep = sleep or time.sleep
+        self.async_runner = async_runner or self._run_sbatch_async
+        self._dry_run_counter = 0
+        self._dry_run_lock = threading.Lock()
+    
+    def build_command(self, dependencies: Optional[List[str]] = None,
+                      extra_args: Optional[List[str]] = None) -> List[str]:
+        """Build the sbatch argument vector for one submission"""
+        cmd = [self.sbatch, '--parsable']
+        if dependencies:
+            cmd.append(f"--dependency=afterok:{':'.join(dependencies)}")
+        if extra_args:
+            cmd.extend(extra_args)
+        return cmd
+    
+    def _dry_run_id(self) -> str:
+        """Next placeholder job ID; submit_steps calls this from several threads"""
+        with self._dry_run_lock:
+            self._dry_run_counter += 1
+            return f"dry_run_{self._dry_run_counter}"
+    
+    def submit(self, script: str, dependencies: Optional[List[str]] = None,
+               extra_args: Optional[List[str]] = None) -> str:
+        """Submit script content on stdin and return the SLURM job ID"""
+        cmd = self.build_command(dependencies, extra_args)
+        
+        if self.dry_run:
+            return self._dry_run_id()
+        
+        error = ""
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = self.runner(cmd, input=script, capture_output=True,
+                                     text=True, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                error = f"sbatch timed out after {self.timeout}s"
+            except OSError as e:
+                raise SubmissionError(f"Cannot run {self.sbatch}: {e}")
+            else:
+                if result.returncode == 0:
+                    return self._parse_job_id(result.stdout)
+                error = result.stderr.strip() or result.stdout.strip()
+                if not self._is_transient(error):
+                    raise SubmissionError(f"sbatch rejected job: {error}")
+            
+            if attempt < self.max_retries:
+                self.sleep(self.backoff * (2 ** attempt))
+        
+        raise SubmissionError(f"sbatch failed after {self.max_retries + 1} attempts: {error}")
+    
+    def submit_steps(self, steps: List[Dict[str, Any]], job_ids: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Submit steps as soon as their parents have job IDs
+        
+        Each step is a dict with 'name', 'script' (content) and optional
+        'depends_on' (list of step names) and 'sbatch_args'. Independent
+        steps are submitted concurrently. Returns step name -> job ID.
+        job_ids is filled as steps are submitted; after a failure no new
+        steps start, those in flight are waited for and the error is raised,
+        so callers keep the IDs of every step that went through.
+        """
+        job_ids = {} if job_ids is None else job_ids
+        errors = []
+        pending = {step['name']: step for step in steps}
+        
+        for step in steps:
+            for parent in step.get('depends_on', []):
+                if parent not in pending:
+                    raise SubmissionError(f"Step {step['name']} depends on unknown step {parent}")
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            in_flight = {}
+            
+            while (pending and not errors) or in_flight:
+                if not errors:
+                    ready = [
+                        name for name, step in pending.items()
+                        if all(parent in job_ids for parent in step.get('depends_on', []))
+                    ]
+                    for name in ready:
+                        step = pending.pop(name)
+                        dependencies = [job_ids[parent] for parent in step.get('depends_on', [])]
+                        future = pool.submit(self.submit, step['script'], dependencies, step.get('sbatch_args'))
+                        in_flight[future] = name
+                    
+                    if not in_flight:
+                        raise SubmissionError(
+                            f"Unresolvable dependencies for steps: {', '.join(sorted(pending))}"
+                        )
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = in_flight.pop(future)
+                    try:
+                        job_ids[name] = future.result()
+                    except Exception as e:
+                        errors.append(e)
+        
+        if errors:
+            raise errors[0]
+        return job_ids
+    
+    async def submit_async(self, script: str, dependencies: Optional[List[str]] = None,
+                           extra_args: Optional[List[str]] = None) -> str:
+        """Asynchronous form of submit, running sbatch as an asyncio subprocess"""
+        cmd = self.build_command(dependencies, extra_args)
+        
+        if self.dry_run:
+            return self._dry_run_id()
+        
+        error = ""
+        for attempt in range(self.max_retries + 1):
+            try:
+                returncode, stdout, stderr = await asyncio.wait_for(
+                    self.async_runner(cmd, script), self.timeout
+                )
+            except asyncio.TimeoutError:
+                error = f"sbatch timed out after {self.timeout}s"
+            except OSError as e:
+                raise SubmissionError(f"Cannot run {self.sbatch}: {e}")
+            else:
+                if returncode == 0:
+                    return self._parse_job_id(stdout)
+                error = stderr.strip() or stdout.strip()
+                if not self._is_transient(error):
+                    raise SubmissionError(f"sbatch rejected job: {error}")
+            
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+        
+        raise SubmissionError(f"sbatch failed after {self.max_retries + 1} attempts: {error}")
+    
+    async def submit_steps_async(self, steps: List[Dict[str, Any]], semaphore: Optional[asyncio.Semaphore] = None,
+                                 job_ids: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Asynchronous form of submit_steps
+        
+        Steps must come after their parents, as build_steps orders them.
+        At most semaphore's worth of sbatch calls run at once, so one
+        semaphore can bound several workflows submitted together. job_ids
+        is filled as steps are submitted, so callers keep the IDs of steps
+        that went through even when a later one fails.
+        """
+        semaphore = semaphore or asyncio.Semaphore(self.max_workers)
+        job_ids = {} if job_ids is None else job_ids
+        tasks = {}
+        
+        async def submit_step(step):
+            parent_ids = [await tasks[parent] for parent in step.get('depends_on', [])]
+            async with semaphore:
+                job_id = await self.submit_async(step['script'], parent_ids, step.get('sbatch_args'))
+            job_ids[step['name']] = job_id
+            return job_id
+        
+        for step in steps:
+            for parent in step.get('depends_on', []):
+                if parent not in tasks:
+                    raise SubmissionError(f"Step {step['name']} depends on {parent}, which does not precede it")
+            tasks[step['name']] = asyncio.ensure_future(submit_step(step))
+        
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        return job_ids
+    
+    @staticmethod
+    async def _run_sbatch_async(cmd: List[str], script: str):
+        """Run sbatch with the script on stdin; returns (returncode, stdout, stderr)"""
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await process.communicate(script.encode())
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+        return process.returncode, stdout.decode(), stderr.decode()
+    
+    def _is_transient(self, error: str) -> bool:
+        """Check whether an sbatch error is worth retrying"""
+        return any(marker in error for marker in self.TRANSIENT_ERRORS)
+    
+    def _parse_job_id(self, output: str) -> str:
+        """Extract job ID from `jobid[;cluster]` parsable output"""
+        job_id = output.strip().split(';', 1)[0]
+        if not job_id.isdigit():
+            raise SubmissionError(f"Unexpected sbatch output: {output.strip()!r}")
+        return job_id
@@ -0,0 +1,77 @@
+"""
+Compiled script templates with shell-style placeholders
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Optional, Tuple, Union
+from .utils import ValidationError
+
+# $NAME, ${NAME} or ${NAME:-default}; names are matched whole, so $OUTPUT
+# never matches inside $OUTPUT_PREFIX. Escaped \$NAME is left alone.
+PLACEHOLDER = re.compile(
+    r'(?<!\\)\$(?:\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)(?::-(?P<default>[^}]*))?\}|(?P<bare>[A-Za-z_][A-Za-z0-9_]*))'
+)
+
+
+class ScriptTemplate:
+    """Template text parsed once into literal and placeholder segments
+
+    Rendering fills every placeholder whose name is given a value in one
+    pass; placeholders without a value keep their original text so the
+    shell expands them at run time. Values for names the template never
+    uses are ignored, so one parameter dict can serve several templates;
+    callers that want such typos caught opt in to strict mode.
+    """
+
+    __slots__ = ('name', 'segments', 'names')
+
+    def __init__(self, text: str, name: str = '<template>'):
+        self.name = name
+        segments = []
+        position = 0
+        for match in PLACEHOLDER.finditer(text):
+            key = match.group('braced') or match.group('bare')
+            segments.append((text[position:match.start()], key, match.group(0)))
+            position = match.end()
+        segments.append((text[position:], None, ''))
+        self.segments: Tuple[Tuple[str, Optional[str], str], ...] = tuple(segments)
+        self.names: FrozenSet[str] = frozenset(key for _, key, _ in segments if key)
+
+    def render(self, values: Dict[str, Any], strict: bool = False) -> str:
+        """Template text with the given values substituted"""
+        if strict:
+            unknown = set(values) - self.names
+            if unknown:
+                raise ValidationError(
+                    f"Unknown variables for {self.name}: {', '.join(sorted(unknown))}\n"
+                    f"Template variables: {', '.join(sorted(self.names))}"
+                )
+
+        values = {key: str(value) for key, value in values.items()}
+        pieces = []
+        for literal, key, original in self.segments:
+            pieces.append(literal)
+            if key is not None:
+                pieces.append(values.get(key, original))
+        return ''.join(pieces)
+
+
+_cache: Dict[str, Tuple[Tuple[int, int], ScriptTemplate]] = {}
+
+
+def load_template(path: Union[str, Path]) -> ScriptTemplate:
+    """Compiled template of a file, reused until the file changes"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with open(path, 'r') as f:
+        template = ScriptTemplate(f.read(), Path(path).name)
+    _cache[path] = (version, template)
+    return template
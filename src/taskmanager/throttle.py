@@ -0,0 +1,192 @@
+"""
+Throttled submission keeping the user's queue below a QOS job limit
+"""
+
+import getpass
+import subprocess
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set
+from .batch import BatchManager
+from .ledger import JobLedger
+from .status import StatusFetcher
+from .submitter import Submitter
+from .utils import SubmissionError, TaskManagerError
+
+
+class ThrottledSubmission:
+    """Submits workflow steps as queue slots free up
+
+    At most max_queued jobs of the user (counting every array task, as QOS
+    limits do) are kept in the queue; the rest wait until jobs leave it. A
+    step is only submitted once all of its parents have job IDs. Planned
+    steps are stored in the ledger as PLANNED and replaced by their job ID
+    as they are submitted, so a restarted run picks up where it stopped.
+
+    Parents that have already left the queue are looked up with sacct: a
+    completed parent is dropped from the dependency list (SLURM forgets
+    finished jobs), and the descendants of a failed parent are marked
+    SKIPPED instead of being submitted. Parents sacct no longer knows are
+    judged by their ledger state.
+    """
+
+    # sbatch rejections meaning the queue is full rather than the job is wrong
+    QUEUE_LIMIT_ERRORS = (
+        'QOSMaxSubmitJob',
+        'AssocMaxSubmitJob',
+        'job submit limit',
+    )
+
+    def __init__(self, batch_manager: BatchManager, ledger: JobLedger, submitter: Optional[Submitter] = None,
+                 max_queued: int = 100, poll_interval: float = 60.0, user: Optional[str] = None,
+                 runner=subprocess.run, fetcher: Optional[StatusFetcher] = None, sleep=time.sleep):
+        self.batch_manager = batch_manager
+        self.ledger = ledger
+        self.submitter = submitter or Submitter()
+        self.max_queued = max_queued
+        self.poll_interval = poll_interval
+        self.user = user or getpass.getuser()
+        self.runner = runner
+        self.fetcher = fetcher or StatusFetcher(ttl=0, cache_file=None, runner=runner)
+        self.sleep = sleep
+
+    @property
+    def workflow(self) -> str:
+        return self.batch_manager.workflow
+
+    def queued_jobs(self) -> List[str]:
+        """IDs of the user's queued jobs and array tasks, from one squeue call"""
+        cmd = ['squeue', '-u', self.user, '-h', '-r', '-o', '%i']
+        try:
+            result = self.runner(cmd, capture_output=True, text=True, timeout=60)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise TaskManagerError(f"squeue failed: {e}")
+        if result.returncode != 0:
+            raise TaskManagerError(f"squeue failed: {result.stderr.strip()}")
+        return result.stdout.split()
+
+    def restore(self, steps: List[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+        """Job IDs of steps submitted by an interrupted run, or plan a new run
+
+        A run is resumed when the ledger still holds PLANNED steps of this
+        workflow; otherwise every step is planned afresh.
+        """
+        recorded = {(row['job'], row['step']): row for row in self.ledger.steps(self.workflow)}
+        rows = [recorded.get((step['job_name'], Path(step['script_path']).name)) for step in steps]
+
+        if not any(row and row['state'] == 'PLANNED' for row in rows):
+            self.ledger.plan_steps(self.workflow, steps)
+            return {}
+
+        done = {}
+        for step, row in zip(steps, rows):
+            if row is None:
+                self.ledger.plan_steps(self.workflow, [step])
+            elif row['state'] == 'SKIPPED':
+                done[step['name']] = None
+            elif row['state'] != 'PLANNED':
+                done[step['name']] = row['slurm_id']
+        print(f"Resuming {self.workflow}: {len(done)} of {len(steps)} steps already submitted", flush=True)
+        return done
+
+    def resolve_dependencies(self, step: Dict[str, Any], job_ids: Dict[str, Optional[str]],
+                             queued: Set[str], finished: Dict[str, Dict[str, Any]]) -> Optional[List[str]]:
+        """afterok job IDs for a step, or None if a parent did not complete
+
+        A parent unknown to both squeue and sacct (e.g. purged from
+        accounting before a resumed run) cannot be named in a dependency,
+        as sbatch would reject it; it counts as completed only when the
+        ledger recorded it so.
+        """
+        dependencies = []
+        completed = None
+        for parent in step['depends_on']:
+            job_id = job_ids[parent]
+            if job_id is None:
+                return None
+            if job_id in queued:
+                dependencies.append(job_id)
+                continue
+            state = finished.get(job_id, {}).get('state')
+            if state is None:
+                if completed is None:
+                    completed = {row['slurm_id'] for row in self.ledger.steps(self.workflow, 'COMPLETED')}
+                if job_id not in completed:
+                    print(f"Warning: {parent} ({job_id}) is unknown to squeue and sacct", flush=True)
+                    return None
+            elif state != 'COMPLETED' and state in JobLedger.TERMINAL_STATES:
+                return None
+        return dependencies
+
+    def submit_step(self, step: Dict[str, Any], dependencies: List[str]) -> Optional[str]:
+        """Submit and record one step; None if sbatch reports the queue limit"""
+        try:
+            # Jobs whose dependency fails are cancelled instead of holding a queue slot
+            job_id = self.submitter.submit(step['script'], dependencies, ['--kill-on-invalid-dep=yes'])
+        except SubmissionError as e:
+            if any(marker in str(e) for marker in self.QUEUE_LIMIT_ERRORS):
+                return None
+            raise
+
+        step['job_id'] = job_id
+        self.ledger.record_submitted_steps(self.workflow, [step])
+        print(f"Submitted {step['name']} as {job_id}", flush=True)
+        return job_id
+
+    def skip(self, step: Dict[str, Any], job_ids: Dict[str, Optional[str]]):
+        job_ids[step['name']] = None
+        self.ledger.set_state(self.workflow, step['job_name'], Path(step['script_path']).name, 'SKIPPED')
+        print(f"Skipped {step['name']}: a parent job did not complete", flush=True)
+
+    def run(self, jobs: List[Dict[str, Any]], execution_mode: str = "sequential") -> List[Dict[str, Any]]:
+        """Submit every step, waiting for queue slots; returns steps with their job IDs"""
+        steps = self.batch_manager.prepare_steps(jobs, execution_mode)
+        job_ids = self.restore(steps)
+        pending = [step for step in steps if step['name'] not in job_ids]
+
+        while pending:
+            try:
+                queued_tasks = self.queued_jobs()
+            except TaskManagerError as e:
+                print(f"Warning: {e}; retrying in {self.poll_interval:.0f}s", flush=True)
+                self.sleep(self.poll_interval)
+                continue
+            slots = self.max_queued - len(queued_tasks)
+            queued = {task.split('_')[0] for task in queued_tasks}
+
+            # Children of steps submitted in this round become ready in the same round
+            progress = True
+            while progress and pending:
+                progress = False
+                ready = [step for step in pending if all(parent in job_ids for parent in step['depends_on'])]
+                gone = {job_ids[parent] for step in ready for parent in step['depends_on']
+                        if job_ids[parent] and job_ids[parent] not in queued}
+                finished = self.fetcher.fetch(sorted(gone), refresh=True) if gone else {}
+
+                for step in ready:
+                    dependencies = self.resolve_dependencies(step, job_ids, queued, finished)
+                    if dependencies is None:
+                        self.skip(step, job_ids)
+                        pending.remove(step)
+                        progress = True
+                        continue
+                    if slots <= 0:
+                        break
+
+                    job_id = self.submit_step(step, dependencies)
+                    if job_id is None:
+                        slots = 0
+                        break
+                    job_ids[step['name']] = job_id
+                    queued.add(job_id)
+                    pending.remove(step)
+                    slots -= 1
+                    progress = True
+
+            if pending:
+                self.sleep(self.poll_interval)
+
+        for step in steps:
+            step['job_id'] = job_ids.get(step['name'])
+            step.pop('script', None)
+        return steps
@@ -1,4 +1,6 @@
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 class TaskManagerError(Exception):
@@ -13,6 +15,10 @@ class ValidationError(TaskManagerError):
     """Validation related errors"""
     pass
 
+class SubmissionError(TaskManagerError):
+    """SLURM submission related errors"""
+    pass
+
 def validate_paths(paths):
     """
     Validate that all paths in the list exist
@@ -23,10 +29,94 @@ def validate_paths(paths):
     Returns:
         bool: True if all paths exist, False otherwise
     """
+    return not find_missing_paths(paths)
+
+def _list_directory(directory):
+    """Names in a directory from a single scandir, or None if it does not exist"""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries}
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+def find_missing_paths(paths, max_workers=8):
+    """
+    Find paths that do not exist, listing each directory only once
+    
+    Paths are grouped by parent directory and every directory is read with
+    a single os.scandir, with directories scanned concurrently. On parallel
+    file systems this replaces one metadata RPC per file with one per
+    directory.
+    
+    Args:
+        paths (list): Paths to check
+        max_workers (int): Number of directories scanned concurrently
+        
+    Returns:
+        list: Missing paths, in input order
+    """
+    paths = [str(path) for path in paths]
+    by_directory = {}
     for path in paths:
-        if not Path(path).exists():
-            return False
-    return True
+        directory, name = os.path.split(os.path.normpath(path))
+        by_directory.setdefault(directory or '.', set()).add(name)
+    
+    directories = list(by_directory)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(directories) or 1))) as pool:
+        listings = dict(zip(directories, pool.map(_list_directory, directories)))
+    
+    missing = []
+    for path in paths:
+        directory, name = os.path.split(os.path.normpath(path))
+        listing = listings[directory or '.']
+        if name in ('', '.', '..'):
+            exists = os.path.exists(path)
+        else:
+            exists = listing is not None and name in listing
+        if not exists:
+            missing.append(path)
+    
+    return missing
+
+def parse_slurm_time(time_str):
+    """
+    Convert a SLURM time string to seconds
+    
+    Accepts days-hours:minutes:seconds, hours:minutes:seconds,
+    minutes:seconds and plain minutes.
+    """
+    time_str = str(time_str).strip()
+    days = 0
+    try:
+        if '-' in time_str:
+            day_part, time_str = time_str.split('-', 1)
+            days = int(day_part)
+        parts = [int(part) for part in time_str.split(':')]
+    except ValueError:
+        raise ValidationError(f"Invalid SLURM time: {time_str}")
+    
+    if len(parts) == 1 and days == 0:
+        return parts[0] * 60
+    if len(parts) == 1:
+        hours, minutes, seconds = parts[0], 0, 0
+    elif len(parts) == 2 and days == 0:
+        hours, minutes, seconds = 0, parts[0], parts[1]
+    elif len(parts) == 2:
+        hours, minutes, seconds = parts[0], parts[1], 0
+    else:
+        hours, minutes, seconds = parts[-3:]
+    
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+def format_slurm_time(seconds):
+    """Format seconds as a SLURM hours:minutes:seconds string, with days when needed"""
+    seconds = int(max(0, seconds))
+    days, remainder = divmod(seconds, 86400)
+    hours, remainder = divmod(remainder, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if days:
+        return f"{days}-{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
 def setup_logging(verbose=False, log_file=None):
     """Setup logging configuration"""
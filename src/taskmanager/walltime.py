@@ -0,0 +1,76 @@
+"""
+Walltime estimation from measured GROMACS performance
+"""
+
+import os
+import re
+import statistics
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+from .production_chunker import CHUNK_OUTPUT_PREFIX
+from .utils import format_slurm_time
+
+PERFORMANCE_PATTERN = re.compile(rb'^Performance:\s+([\d.]+)', re.MULTILINE)
+
+# md.log of chained chunks from ProductionChunker.generate_chunk_scripts
+CHAINED_CHUNK_LOGS = f'{CHUNK_OUTPUT_PREFIX}*.log'
+
+
+def chunk_log_patterns(job: Dict[str, Any]) -> List[str]:
+    """Glob patterns of a chunked job's md.log files
+    
+    An explicit chunk_config 'log_pattern' is used as given; otherwise logs
+    named after the chunk scripts and those of chained chunks both match.
+    """
+    chunk_config = job.get('chunk_config', {})
+    if chunk_config.get('log_pattern'):
+        return [chunk_config['log_pattern']]
+    script_prefix = job.get('chunk_metadata', {}).get('script_prefix', 'prod_chunk')
+    return [f"{script_prefix}*.log", CHAINED_CHUNK_LOGS]
+
+
+def parse_performance(log_file: str, tail_bytes: int = 65536) -> Optional[float]:
+    """Read ns/day from the `Performance:` line at the end of an md.log
+    
+    Only the tail of the log is read; returns None for unfinished runs.
+    """
+    try:
+        with open(log_file, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - tail_bytes))
+            tail = f.read()
+    except OSError:
+        return None
+    
+    matches = PERFORMANCE_PATTERN.findall(tail)
+    return float(matches[-1]) if matches else None
+
+
+class WalltimeEstimator:
+    """Turns measured ns/day into per-chunk SLURM TIME requests"""
+    
+    def __init__(self, safety_margin: float = 0.25, min_seconds: int = 600):
+        self.safety_margin = safety_margin
+        self.min_seconds = min_seconds
+    
+    def collect_performance(self, log_files: List[str]) -> List[float]:
+        """ns/day of every completed run among the given logs"""
+        values = [parse_performance(str(log_file)) for log_file in log_files]
+        return [value for value in values if value]
+    
+    def find_chunk_logs(self, path: str, pattern: Union[str, Iterable[str]]) -> List[str]:
+        """Logs of completed chunks matching one or more glob patterns under path"""
+        patterns = [pattern] if isinstance(pattern, str) else pattern
+        return sorted({str(log_file) for glob in patterns for log_file in Path(path).glob(glob)})
+    
+    def estimate_seconds(self, chunk_length_ns: float, ns_per_day: float) -> int:
+        """Walltime in seconds for one chunk, including the safety margin"""
+        seconds = chunk_length_ns / ns_per_day * 86400 * (1 + self.safety_margin)
+        return max(self.min_seconds, int(seconds + 59) // 60 * 60)
+    
+    def estimate(self, chunk_length_ns: float, log_files: List[str]) -> Optional[str]:
+        """SLURM TIME for one chunk from the median measured ns/day, or None without data"""
+        performance = self.collect_performance(log_files)
+        if not performance:
+            return None
+        return format_slurm_time(self.estimate_seconds(chunk_length_ns, statistics.median(performance)))
@@ -5,6 +5,8 @@ Tests for BatchManager class
 import pytest
 from taskmanager.config import SlurmConfig
 from taskmanager.batch import BatchManager
+from taskmanager.submitter import Submitter
+from taskmanager.chunks import ChunkRange
 
 
 class TestBatchManager:
@@ -94,4 +96,221 @@ class TestBatchManager:
         
         assert 'Chunked simulation: 2 chunks × 10 ns = 20 ns total' in script
         assert 'prod/prod_chunk1.sh' in script
-        assert 'prod/prod_chunk2.sh' in script 
\ No newline at end of file
+        assert 'prod/prod_chunk2.sh' in script
+    
+    def test_array_mode_submits_chunks_as_array(self, temp_dir, sample_slurm_config):
+        """Test chunked jobs become a single throttled job array"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        
+        config = SlurmConfig(str(config_file))
+        batch_manager = BatchManager(config)
+        
+        jobs = [
+            {
+                'name': 'minimization',
+                'job_type': 'minimization',
+                'path': 'min',
+                'nodes': 4,
+                'scripts': ['min_steep.sh']
+            },
+            {
+                'name': 'production',
+                'job_type': 'production',
+                'path': 'prod',
+                'nodes': 8,
+                'scripts': ['prod_chunk1.sh', 'prod_chunk2.sh', 'prod_chunk3.sh'],
+                'is_chunked': True,
+                'chunk_metadata': {
+                    'total_chunks': 3,
+                    'chunk_length_ns': 10,
+                    'script_prefix': 'prod_chunk'
+                }
+            }
+        ]
+        
+        output_file = temp_dir / 'batch_job.sh'
+        batch_manager.generate_batch_script(jobs, str(output_file), 'array', dry_run=True)
+        script = output_file.read_text()
+        
+        assert 'submit_job_step "min/min_steep.sh"' in script
+        assert 'submit_array_step "submit_production_array.sh" "1-3%1" "0" "$prev_job_id"' in script
+        assert 'bash "prod/prod_chunk${CHUNK_NUM}.sh"' in script
+        assert 'prod_chunk2.sh' not in script
+    
+    def test_array_mode_guards_failed_chunks(self, temp_dir, sample_slurm_config):
+        """Test array tasks cancel the array when the previous chunk left no checkpoint"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        
+        config = SlurmConfig(str(config_file))
+        batch_manager = BatchManager(config)
+        
+        jobs = [
+            {
+                'name': 'production',
+                'job_type': 'production',
+                'path': 'prod',
+                'scripts': ['prod_chunk1.sh', 'prod_chunk2.sh', 'prod_chunk3.sh'],
+                'is_chunked': True,
+                'chunk_metadata': {'total_chunks': 3, 'script_prefix': 'prod_chunk'}
+            }
+        ]
+        
+        output_file = temp_dir / 'batch_job.sh'
+        batch_manager.generate_batch_script(jobs, str(output_file), 'array', dry_run=True)
+        script = output_file.read_text()
+        
+        assert 'PREV_OUTPUT="modelbound_$(( CHUNK_NUM - 1 ))"' in script
+        assert '[[ ! -f "${PREV_OUTPUT}.cpt" || ! -f "${PREV_OUTPUT}.gro" ]]' in script
+        assert 'scancel "$SLURM_ARRAY_JOB_ID"' in script
+        assert script.index('scancel "$SLURM_ARRAY_JOB_ID"') < script.index('bash "prod/prod_chunk${CHUNK_NUM}.sh"')
+    
+    def test_array_mode_splits_at_max_array_size(self, temp_dir, sample_slurm_config):
+        """Test chunk counts above MaxArraySize are split into chained arrays"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text("MAX_ARRAY_SIZE=4\n" + sample_slurm_config)
+        
+        config = SlurmConfig(str(config_file))
+        batch_manager = BatchManager(config)
+        
+        jobs = [
+            {
+                'name': 'production',
+                'job_type': 'production',
+                'path': 'prod',
+                'nodes': 8,
+                'scripts': [f'prod_chunk{i}.sh' for i in range(1, 8)],
+                'is_chunked': True,
+                'chunk_metadata': {'total_chunks': 7, 'script_prefix': 'prod_chunk'}
+            }
+        ]
+        
+        output_file = temp_dir / 'batch_job.sh'
+        batch_manager.generate_batch_script(jobs, str(output_file), 'array', dry_run=True)
+        script = output_file.read_text()
+        
+        assert '"1-3%1" "0"' in script
+        assert '"1-3%1" "3"' in script
+        assert '"1-1%1" "6"' in script
+        assert '--max-array-size' not in script
+    
+    def test_submit_renders_per_step_wrappers(self, temp_dir, sample_slurm_config, monkeypatch):
+        """Test direct submission chains steps and renders each wrapper"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        (temp_dir / 'min').mkdir()
+        (temp_dir / 'min' / 'min_steep.sh').touch()
+        (temp_dir / 'min' / 'min_cg.sh').touch()
+        monkeypatch.chdir(temp_dir)
+        
+        config = SlurmConfig(str(config_file))
+        batch_manager = BatchManager(config)
+        
+        scripts = []
+        
+        class RecordingSubmitter(Submitter):
+            def submit(self, script, dependencies=None, extra_args=None):
+                scripts.append((script, dependencies))
+                return str(100 + len(scripts))
+        
+        jobs = [{
+            'name': 'minimization',
+            'job_type': 'minimization',
+            'path': 'min',
+            'nodes': 4,
+            'scripts': ['min_steep.sh', 'min_cg.sh']
+        }]
+        steps = batch_manager.submit(jobs, RecordingSubmitter(max_workers=1))
+        
+        assert [step['job_id'] for step in steps] == ['101', '102']
+        assert scripts[1][1] == ['101']
+        assert '#SBATCH --nodes=4' in scripts[0][0]
+        assert 'bash "min/min_cg.sh"' in scripts[1][0]
+    
+    def test_sequential_batch_headers_per_step(self, temp_dir, sample_slurm_config):
+        """Test each job type gets its own section's SBATCH headers"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        
+        config = SlurmConfig(str(config_file))
+        batch_manager = BatchManager(config)
+        
+        jobs = [
+            {'name': 'minimization', 'job_type': 'minimization', 'path': 'min',
+             'nodes': 4, 'scripts': ['min_steep.sh']},
+            {'name': 'equilibration', 'job_type': 'equilibration', 'path': 'equil',
+             'nodes': 6, 'scripts': ['equil_stage1.sh']}
+        ]
+        
+        output_file = temp_dir / 'batch_job.sh'
+        batch_manager.generate_batch_script(jobs, str(output_file), 'sequential', dry_run=True)
+        script = output_file.read_text()
+        
+        assert '"minimization:4")' in script
+        assert '"equilibration:6")' in script
+        assert '#SBATCH --time=2:00:00' in script
+        assert '#SBATCH --time=4:00:00' in script
+        assert 'sed -i' not in script
+    
+    def test_dag_steps_branch_from_shared_parent(self, temp_dir, sample_slurm_config):
+        """Test independent branches depend only on their own parents"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        
+        config = SlurmConfig(str(config_file))
+        batch_manager = BatchManager(config)
+        
+        jobs = [
+            {'name': 'min', 'job_type': 'minimization', 'path': 'min',
+             'scripts': ['min_steep.sh', 'min_cg.sh']},
+            {'name': 'equil_a', 'job_type': 'equilibration', 'path': 'lig_a',
+             'scripts': ['equil.sh'], 'depends_on': ['min']},
+            {'name': 'equil_b', 'job_type': 'equilibration', 'path': 'lig_b',
+             'scripts': ['equil.sh'], 'depends_on': ['min']}
+        ]
+        
+        steps = {step['name']: step for step in batch_manager.build_steps(jobs, 'dag')}
+        
+        assert steps['min/min_cg.sh']['depends_on'] == ['min/min_steep.sh']
+        assert steps['equil_a/equil.sh']['depends_on'] == ['min/min_cg.sh']
+        assert steps['equil_b/equil.sh']['depends_on'] == ['min/min_cg.sh']
+        
+        output_file = temp_dir / 'batch_job.sh'
+        batch_manager.generate_batch_script(jobs, str(output_file), 'dag', dry_run=True)
+        script = output_file.read_text()
+        
+        assert 'job_id_2=$(submit_job_step "lig_a/equil.sh" "${job_id_1}"' in script
+        assert 'job_id_3=$(submit_job_step "lig_b/equil.sh" "${job_id_1}"' in script
+    
+    def test_chunk_range_emitted_as_loop(self, temp_dir, sample_slurm_config):
+        """Test thousands of chunks become one loop in sequential and DAG scripts"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        
+        config = SlurmConfig(str(config_file))
+        batch_manager = BatchManager(config)
+        
+        jobs = [
+            {'name': 'min', 'job_type': 'minimization', 'path': 'min', 'scripts': ['min.sh']},
+            {'name': 'prod', 'job_type': 'production', 'path': 'prod', 'depends_on': ['min'],
+             'scripts': ChunkRange('prod_chunk', 1, 5001), 'is_chunked': True},
+            {'name': 'ana', 'job_type': 'minimization', 'path': 'ana', 'scripts': ['ana.sh'],
+             'depends_on': ['prod']}
+        ]
+        
+        few = [dict(jobs[1], scripts=ChunkRange('prod_chunk', 1, 11))]
+        for mode in ('sequential', 'dag'):
+            output_file = temp_dir / f'{mode}.sh'
+            batch_manager.generate_batch_script([jobs[0]] + few + [jobs[2]], str(output_file), mode, dry_run=True)
+            few_lines = len(output_file.read_text().splitlines())
+            batch_manager.generate_batch_script(jobs, str(output_file), mode, dry_run=True)
+            script = output_file.read_text()
+            
+            assert len(script.splitlines()) == few_lines
+            assert 'for (( chunk = 1; chunk <= 5000; chunk++ )); do' in script
+            assert 'script="prod_chunk${chunk}.sh"' in script
+            assert 'prod_chunk17.sh' not in script
+        
+        assert 'job_id_5000="$prev_job_id"' in script
+        assert 'job_id_5001=$(submit_job_step "ana/ana.sh" "${job_id_5000}"' in script
@@ -0,0 +1,46 @@
+"""
+Tests for ChunkRange sequence
+"""
+
+import pickle
+from taskmanager.chunks import ChunkRange
+
+
+class TestChunkRange:
+    
+    def test_names_and_length(self):
+        """Test names are computed from prefix and chunk number"""
+        scripts = ChunkRange('prod_chunk', 1, 10001)
+        
+        assert len(scripts) == 10000
+        assert scripts[0] == 'prod_chunk1.sh'
+        assert scripts[-1] == 'prod_chunk10000.sh'
+        assert 'prod_chunk512.sh' in scripts
+        assert 'prod_chunk10001.sh' not in scripts
+        assert 'prod_chunk05.sh' not in scripts
+    
+    def test_multiple_suffixes(self):
+        """Test several output files per chunk"""
+        outputs = ChunkRange('prod_chunk', 1, 3, ('.xtc', '.edr', '.gro'))
+        
+        assert list(outputs) == [
+            'prod_chunk1.xtc', 'prod_chunk1.edr', 'prod_chunk1.gro',
+            'prod_chunk2.xtc', 'prod_chunk2.edr', 'prod_chunk2.gro'
+        ]
+        assert outputs[4] == 'prod_chunk2.edr'
+    
+    def test_slicing_stays_lazy(self):
+        """Test contiguous slices return another ChunkRange"""
+        scripts = ChunkRange('prod_chunk', 1, 101)
+        
+        tail = scripts[10:]
+        assert isinstance(tail, ChunkRange)
+        assert tail.start == 11 and len(tail) == 90
+        assert scripts[::50] == ['prod_chunk1.sh', 'prod_chunk51.sh']
+    
+    def test_equality_and_pickle(self):
+        """Test comparison with lists and round-tripping through pickle"""
+        scripts = ChunkRange('prod_chunk', 1, 4)
+        
+        assert scripts == ['prod_chunk1.sh', 'prod_chunk2.sh', 'prod_chunk3.sh']
+        assert pickle.loads(pickle.dumps(scripts)) == scripts
@@ -127,4 +127,21 @@ JOB_NAME=test"""
         
         # Test invalid formats
         assert not config._validate_time_format('invalid')
-        assert not config._validate_time_format('25:70:00') 
\ No newline at end of file
+        assert not config._validate_time_format('25:70:00')
+    
+    def test_sbatch_headers_cached_until_file_changes(self, temp_dir, sample_slurm_config):
+        """Test rendered headers are memoized and refreshed when .slurmparams changes"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        
+        config = SlurmConfig(str(config_file))
+        
+        first = config.format_sbatch_headers('minimization', 4)
+        assert config.format_sbatch_headers('minimization', 4) is first
+        assert '#SBATCH --time=2:00:00' in first
+        
+        config_file.write_text(sample_slurm_config.replace('TIME=2:00:00', 'TIME=12:30:00'))
+        
+        refreshed = config.format_sbatch_headers('minimization', 4)
+        assert '#SBATCH --time=12:30:00' in refreshed
+        assert '--time=12:30:00' in config.format_sbatch_options('minimization')
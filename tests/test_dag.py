@@ -0,0 +1,42 @@
+"""
+Tests for WorkflowDAG class
+"""
+
+import pytest
+from taskmanager.dag import WorkflowDAG
+from taskmanager.utils import ValidationError
+
+
+class TestWorkflowDAG:
+    
+    def test_topological_order(self):
+        """Test parents are ordered before children"""
+        jobs = [
+            {'name': 'prod_a', 'depends_on': ['equil_a']},
+            {'name': 'equil_a', 'depends_on': 'minimization'},
+            {'name': 'equil_b', 'depends_on': ['minimization']},
+            {'name': 'minimization'}
+        ]
+        
+        order = WorkflowDAG(jobs).topological_order()
+        
+        assert order[0] == 'minimization'
+        assert order.index('equil_a') < order.index('prod_a')
+        assert set(order) == {'minimization', 'equil_a', 'equil_b', 'prod_a'}
+    
+    def test_cycle_detection(self):
+        """Test cycles are reported with the jobs involved"""
+        jobs = [
+            {'name': 'a', 'depends_on': ['c']},
+            {'name': 'b', 'depends_on': ['a']},
+            {'name': 'c', 'depends_on': ['b']},
+            {'name': 'd'}
+        ]
+        
+        with pytest.raises(ValidationError, match="cycle between jobs: a, b, c"):
+            WorkflowDAG(jobs).topological_order()
+    
+    def test_unknown_dependency(self):
+        """Test dependencies on undeclared jobs are rejected"""
+        with pytest.raises(ValidationError, match="unknown job: missing"):
+            WorkflowDAG([{'name': 'a', 'depends_on': ['missing']}])
@@ -109,4 +109,14 @@ class TestEquilibrationGenerator:
         scripts = generator.generate_scripts(str(temp_dir), overwrite=True)
         backup_file = temp_dir / 'min_steep.sh.bak'
         assert backup_file.exists()
-        assert backup_file.read_text() == 'existing content' 
\ No newline at end of file
+        assert backup_file.read_text() == 'existing content'
+    
+    def test_overwrite_keeps_unchanged_scripts(self, sample_mdp_files, temp_dir):
+        """Test overwriting identical scripts neither backs them up nor rewrites them"""
+        generator = EquilibrationGenerator(str(sample_mdp_files))
+        generator.generate_scripts(str(temp_dir), overwrite=True)
+        
+        generator.generate_scripts(str(temp_dir), overwrite=True)
+        
+        assert not list(temp_dir.glob('*.bak'))
+        assert generator.writer.skipped == generator.writer.written
@@ -0,0 +1,138 @@
+"""
+Tests for the in-allocation step executor
+"""
+
+import subprocess
+from taskmanager.config import SlurmConfig
+from taskmanager.batch import BatchManager
+from taskmanager.executor import StepExecutor, expand_chunks, expand_nodelist, format_report
+
+
+def write_step(path, body):
+    """Write a step script recording the nodes it was given"""
+    path.write_text(f'echo "$SLURM_JOB_NODELIST" > {path.stem}.nodes\n{body}\n')
+    return path.name
+
+
+class TestExecutor:
+    
+    def test_expand_nodelist(self):
+        """Test nodelists are expanded with scontrol, falling back to commas"""
+        def scontrol(cmd, **kwargs):
+            return subprocess.CompletedProcess(cmd, 0, stdout="n1\nn2\n")
+        
+        def missing(cmd, **kwargs):
+            raise FileNotFoundError(cmd[0])
+        
+        assert expand_nodelist('n[1-2]', runner=scontrol) == ['n1', 'n2']
+        assert expand_nodelist('n1,n2', runner=missing) == ['n1', 'n2']
+    
+    def test_expand_chunks(self):
+        """Test a chunk range manifest entry becomes one step per chunk"""
+        steps = expand_chunks([
+            {'name': 'min', 'script': 'min.sh', 'nodes': 1},
+            {'name': 'prod_chunk{chunk}', 'script': 'prod/prod_chunk{chunk}.sh', 'nodes': 2, 'chunks': [3, 5]},
+        ])
+        
+        assert [step['script'] for step in steps] == ['min.sh', 'prod/prod_chunk3.sh', 'prod/prod_chunk4.sh',
+                                                      'prod/prod_chunk5.sh']
+        assert steps[3] == {'name': 'prod_chunk5', 'script': 'prod/prod_chunk5.sh', 'nodes': 2}
+    
+    def test_steps_get_disjoint_nodes(self, temp_dir):
+        """Test 2-node steps fill a 4-node allocation and the rest are queued"""
+        steps = [
+            {'name': f'eq{i}', 'script': write_step(temp_dir / f'eq{i}.sh', 'sleep 0.2'), 'path': str(temp_dir), 'nodes': 2}
+            for i in range(3)
+        ]
+        
+        results = StepExecutor(['n1', 'n2', 'n3', 'n4'], poll_interval=0.05).run(steps)
+        
+        assert [result['status'] for result in results] == ['completed'] * 3
+        assert (temp_dir / 'eq0.nodes').read_text().strip() == 'n1,n2'
+        assert (temp_dir / 'eq1.nodes').read_text().strip() == 'n3,n4'
+        # The third step waits for nodes to be released
+        assert results[2]['name'] == 'eq2'
+    
+    def test_failure_stops_queue(self, temp_dir):
+        """Test a failed step reports its exit code and queued steps are skipped"""
+        steps = [
+            {'name': 'bad', 'script': write_step(temp_dir / 'bad.sh', 'exit 3'), 'path': str(temp_dir), 'nodes': 1},
+            {'name': 'next', 'script': write_step(temp_dir / 'next.sh', 'true'), 'path': str(temp_dir), 'nodes': 1},
+        ]
+        
+        results = {result['name']: result for result in StepExecutor(['n1'], poll_interval=0.05).run(steps)}
+        
+        assert results['bad']['status'] == 'failed'
+        assert results['bad']['exit_code'] == 3
+        assert results['next']['status'] == 'skipped'
+        assert 'failed' in format_report(list(results.values()))
+    
+    def test_keep_going_runs_other_steps(self, temp_dir):
+        """Test independent steps still run after a failure, only the failed step's scripts stop"""
+        steps = [
+            {'name': 'bad', 'scripts': [write_step(temp_dir / 'bad.sh', 'exit 3'), write_step(temp_dir / 'after.sh', 'true')],
+             'path': str(temp_dir), 'cores': 2},
+            {'name': 'huge', 'script': 'huge.sh', 'path': str(temp_dir), 'cores': 8},
+            {'name': 'next', 'script': write_step(temp_dir / 'next.sh', 'true'), 'path': str(temp_dir), 'cores': 2},
+        ]
+        
+        results = StepExecutor(['n1'], cores_per_node=2, poll_interval=0.05).run(steps, keep_going=True)
+        statuses = {result['name']: result['status'] for result in results}
+        
+        assert statuses == {'bad': 'failed', 'huge': 'unschedulable', 'next': 'completed'}
+        assert not (temp_dir / 'after.nodes').exists()
+    
+    def test_oversized_step_fails_stage(self, temp_dir):
+        """Test a step needing more nodes than allocated fails before anything starts"""
+        steps = [
+            {'name': 'small', 'script': write_step(temp_dir / 'small.sh', 'true'), 'path': str(temp_dir), 'nodes': 1},
+            {'name': 'huge', 'script': 'huge.sh', 'path': str(temp_dir), 'nodes': 8},
+        ]
+        
+        results = {result['name']: result for result in StepExecutor(['n1', 'n2']).run(steps)}
+        
+        assert results['huge']['status'] == 'unschedulable'
+        assert results['small']['status'] == 'skipped'
+        assert not (temp_dir / 'small.nodes').exists()
+    
+    def test_generated_parallel_script(self, temp_dir, sample_slurm_config):
+        """Test parallel mode runs each stage through the embedded executor"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        
+        jobs = [{'name': 'eq', 'path': 'eq', 'nodes': 2, 'scripts': ['nvt.sh', 'npt.sh']}]
+        script = BatchManager(SlurmConfig(str(config_file))).generate_script(jobs, 'parallel')
+        
+        assert "<<'PYEOF'" in script
+        assert 'class StepExecutor' in script
+        assert '"nodes": 2' in script
+        assert 'pids+=' not in script
+        
+        result = subprocess.run(['bash', '-n'], input=script, text=True, capture_output=True)
+        assert result.returncode == 0, result.stderr
+    
+    def test_core_steps_share_a_node(self, temp_dir):
+        """Test steps declaring cores run side by side on one node"""
+        steps = [
+            {'name': f'min{i}', 'scripts': [write_step(temp_dir / f'min{i}.sh', 'echo "$SLURM_NTASKS" > ntasks')],
+             'path': str(temp_dir), 'cores': 2}
+            for i in range(2)
+        ]
+        
+        executor = StepExecutor(['n1'], cores_per_node=4, poll_interval=0.05)
+        
+        assert executor.allocate(steps[0], {'n1': 4}) == {'n1': 2}
+        assert executor.allocate({'name': 'whole', 'nodes': 1}, {'n1': 2}) is None
+        
+        results = executor.run(steps)
+        assert [result['nodes'] for result in results] == ['n1', 'n1']
+        assert (temp_dir / 'ntasks').read_text().strip() == '2'
+    
+    def test_core_step_ranks(self, monkeypatch):
+        """Test a step of cores runs one task per cpus_per_task cores"""
+        monkeypatch.setenv('SLURM_CPUS_PER_TASK', '2')
+        executor = StepExecutor(['n1'], cores_per_node=48)
+        
+        env = executor.step_env(['n1'], 24, 6)
+        assert (env['SLURM_NTASKS'], env['SLURM_NTASKS_PER_NODE'], env['SLURM_CPUS_PER_TASK']) == ('4', '4', '6')
+        assert executor.step_env(['n1'], 24)['SLURM_NTASKS'] == '12'
@@ -0,0 +1,157 @@
+"""
+Tests for incremental (make-style) planning
+"""
+
+import os
+import yaml
+from taskmanager.batch import BatchManager
+from taskmanager.chunks import ChunkRange
+from taskmanager.config import SlurmConfig
+from taskmanager.incremental import IncrementalPlanner
+from taskmanager.job_parser import JobParser
+from taskmanager.production_chunker import ProductionChunker
+
+
+def touch(path, mtime):
+    """Create a file with a fixed mtime"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not path.exists():
+        path.write_text(path.name)
+    os.utime(path, (mtime, mtime))
+
+
+def make_workflow(root):
+    """Minimization, equilibration and a 4-chunk production job"""
+    return [
+        {
+            'name': 'minimization',
+            'path': str(root / 'min'),
+            'scripts': ['min_steep.sh', 'min_cg.sh'],
+            'outputs': ['steep.gro', 'cg.gro']
+        },
+        {
+            'name': 'production',
+            'path': str(root / 'prod'),
+            'scripts': ChunkRange('prod_chunk', 1, 5),
+            'outputs': ChunkRange('prod_chunk', 1, 5, ('.xtc', '.gro')),
+            'is_chunked': True,
+            'chunk_metadata': {'total_chunks': 4, 'chunk_length_ns': 10, 'script_prefix': 'prod_chunk',
+                               'template_mdp': 'step7_production.mdp'}
+        }
+    ]
+
+
+class TestIncremental:
+    
+    def write_completed(self, root, chunks_done):
+        """Lay out inputs and outputs as if the workflow ran up to a chunk"""
+        for name in ['min_steep.sh', 'min_cg.sh']:
+            touch(root / 'min' / name, 100)
+        touch(root / 'min' / 'steep.gro', 200)
+        touch(root / 'min' / 'cg.gro', 300)
+        touch(root / 'prod' / 'step7_production.mdp', 100)
+        for chunk in range(1, 5):
+            touch(root / 'prod' / f'prod_chunk{chunk}.sh', 100)
+        for chunk in range(1, chunks_done + 1):
+            for suffix in ('.xtc', '.gro'):
+                touch(root / 'prod' / f'prod_chunk{chunk}{suffix}', 400 + chunk)
+    
+    def test_resume_from_first_incomplete_chunk(self, temp_dir):
+        """Test complete jobs are dropped and chunked jobs resume at the first missing chunk"""
+        self.write_completed(temp_dir, chunks_done=2)
+        
+        planned = IncrementalPlanner(make_workflow(temp_dir), manifest_file=str(temp_dir / 'm.json')).plan()
+        
+        assert [job['name'] for job in planned] == ['production']
+        assert list(planned[0]['scripts']) == ['prod_chunk3.sh', 'prod_chunk4.sh']
+        assert planned[0]['outputs'].start == 3
+        assert planned[0]['skipped_steps'] == 2
+    
+    def test_stale_input_propagates(self, temp_dir):
+        """Test a newer input reruns its step and everything downstream"""
+        self.write_completed(temp_dir, chunks_done=4)
+        touch(temp_dir / 'min' / 'min_cg.sh', 1000)
+        
+        planned = IncrementalPlanner(make_workflow(temp_dir), manifest_file=str(temp_dir / 'm.json')).plan()
+        
+        assert [job['name'] for job in planned] == ['minimization', 'production']
+        assert planned[0]['scripts'] == ['min_cg.sh']
+        assert len(planned[1]['scripts']) == 4
+    
+    def test_hashes_ignore_touched_inputs(self, temp_dir):
+        """Test with hashes a touched but unchanged input does not force a rerun"""
+        self.write_completed(temp_dir, chunks_done=4)
+        manifest = str(temp_dir / 'm.json')
+        
+        assert IncrementalPlanner(make_workflow(temp_dir), use_hashes=True, manifest_file=manifest).plan() == []
+        
+        touch(temp_dir / 'min' / 'min_cg.sh', 1000)
+        assert IncrementalPlanner(make_workflow(temp_dir), use_hashes=True, manifest_file=manifest).plan() == []
+        
+        (temp_dir / 'min' / 'min_cg.sh').write_text('changed')
+        planned = IncrementalPlanner(make_workflow(temp_dir), use_hashes=True, manifest_file=manifest).plan()
+        assert planned[0]['scripts'] == ['min_cg.sh']
+    
+    def test_hashes_skip_upstream_trajectories(self, temp_dir):
+        """Test with hashes earlier chunks' outputs are not read, yet rerunning one makes later chunks stale"""
+        self.write_completed(temp_dir, chunks_done=4)
+        manifest = str(temp_dir / 'm.json')
+        
+        planner = IncrementalPlanner(make_workflow(temp_dir), use_hashes=True, manifest_file=manifest)
+        assert planner.plan() == []
+        assert not [path for path in planner._manifest['files'] if path.endswith(('.xtc', '.gro'))]
+        
+        # Chunk 2 rerun: its outputs are newer than chunk 3's
+        for suffix in ('.xtc', '.gro'):
+            touch(temp_dir / 'prod' / f'prod_chunk2{suffix}', 1000)
+        planned = IncrementalPlanner(make_workflow(temp_dir), use_hashes=True, manifest_file=manifest).plan()
+        assert list(planned[0]['scripts']) == ['prod_chunk3.sh', 'prod_chunk4.sh']
+    
+    def test_dag_drops_complete_dependencies(self, temp_dir):
+        """Test in DAG mode a complete parent is removed from depends_on"""
+        self.write_completed(temp_dir, chunks_done=1)
+        jobs = make_workflow(temp_dir)
+        jobs[1]['depends_on'] = ['minimization']
+        
+        planned = IncrementalPlanner(jobs, 'dag', manifest_file=str(temp_dir / 'm.json')).plan()
+        
+        assert planned[0]['depends_on'] == []
+    
+    def test_array_honours_first_chunk(self, temp_dir, sample_slurm_config):
+        """Test array mode maps array indices onto the remaining chunks"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        self.write_completed(temp_dir, chunks_done=2)
+        
+        planned = IncrementalPlanner(make_workflow(temp_dir), manifest_file=str(temp_dir / 'm.json')).plan()
+        output = BatchManager(SlurmConfig(str(config_file))).generate_batch_script(
+            planned, str(temp_dir / 'batch.sh'), 'array'
+        )
+        script = open(output).read()
+        
+        assert '"1-2%1" "2"' in script
+        assert 'chunks 3-4' in script
+    
+    def test_resume_generated_chunks(self, temp_dir):
+        """Test chunks of generate-chunks scripts count as done once their modelbound_N outputs exist"""
+        prod = temp_dir / 'prod'
+        prod.mkdir()
+        (prod / 'step7_production.mdp').write_text('dt = 0.002\nnsteps = 1000\n')
+        ProductionChunker(total_chunks=3, chunk_length_ns=10).generate_chunk_scripts(str(prod))
+        job_file = temp_dir / 'jobs.yaml'
+        job_file.write_text(yaml.dump({'jobs': [{
+            'name': 'production', 'job_type': 'production', 'path': str(prod),
+            'chunk_config': {'enabled': True, 'total_chunks': 3, 'script_prefix': 'prod_chunk'}
+        }]}))
+        
+        for path in prod.iterdir():
+            os.utime(path, (100, 100))
+        for suffix in ('.xtc', '.edr', '.gro'):
+            touch(prod / f'modelbound_1{suffix}', 200)
+        
+        jobs = JobParser(str(job_file)).get_jobs()
+        planned = IncrementalPlanner(jobs, manifest_file=str(temp_dir / 'm.json')).plan()
+        
+        assert '-deffnm "$OUTPUT_PREFIX"' in (prod / 'prod_chunk2.sh').read_text()
+        assert 'OUTPUT_PREFIX="modelbound_${CHUNK_NUM}"' in (prod / 'prod_chunk2.sh').read_text()
+        assert list(planned[0]['scripts']) == ['prod_chunk2.sh', 'prod_chunk3.sh']
@@ -7,6 +7,7 @@ import yaml
 import json
 from pathlib import Path
 from taskmanager.job_parser import JobParser
+from taskmanager.plan_cache import PlanCache
 
 
 class TestJobParser:
@@ -23,6 +24,18 @@ class TestJobParser:
         assert parser.workflow_data['workflow']['name'] == 'MD Simulation'
         assert len(parser.workflow_data['jobs']) == 3
     
+    def test_workflow_key_includes_job_file(self, temp_dir, sample_job_config):
+        """Test copies of a job file with the same workflow name get different keys"""
+        keys = []
+        for system in ('sys_a', 'sys_b'):
+            (temp_dir / system).mkdir()
+            job_file = temp_dir / system / 'jobs.yaml'
+            job_file.write_text(yaml.dump(sample_job_config))
+            keys.append(JobParser(str(job_file)).workflow_key)
+        
+        assert keys[0] == f"MD Simulation@{(temp_dir / 'sys_a' / 'jobs.yaml').resolve()}"
+        assert keys[0] != keys[1]
+    
     def test_load_json_workflow(self, temp_dir, sample_job_config):
         """Test loading JSON workflow configuration"""
         job_file = temp_dir / 'jobs.json'
@@ -121,4 +134,75 @@ class TestJobParser:
         captured = capsys.readouterr()
         assert 'MD Simulation' in captured.out
         assert 'minimization' in captured.out
-        assert 'Chunked: 3 chunks' in captured.out 
\ No newline at end of file
+        assert 'Chunked: 3 chunks' in captured.out
+    
+    def test_jobs_expanded_once(self, temp_dir, sample_job_config):
+        """Test jobs are cached per parser and chunk lists are lazy"""
+        job_file = temp_dir / 'jobs.yaml'
+        
+        with open(job_file, 'w') as f:
+            yaml.dump(sample_job_config, f)
+        
+        parser = JobParser(str(job_file), profile='quick')
+        first = parser.get_jobs()
+        second = parser.get_jobs()
+        
+        assert first[2] == second[2]
+        first[2]['chunk_metadata']['total_chunks'] = 99
+        first[0]['depends_on'] = ['other']
+        assert parser.get_jobs()[2]['chunk_metadata']['total_chunks'] == 2
+        assert 'depends_on' not in parser.get_jobs()[0]
+        assert len(first[2]['outputs']) == 6
+        assert first[2]['outputs'][-1] == 'modelbound_2.gro'
+        # Profile overrides must not leak into the raw workflow data
+        assert parser.workflow_data['jobs'][2]['chunk_config']['total_chunks'] == 3
+    
+    def test_cached_plan_reused(self, temp_dir, sample_job_config, monkeypatch):
+        """Test a second parser loads the expanded plan without re-parsing YAML"""
+        job_file = temp_dir / 'jobs.yaml'
+        cache_dir = temp_dir / 'cache'
+        
+        with open(job_file, 'w') as f:
+            yaml.dump(sample_job_config, f)
+        
+        first = JobParser(str(job_file), profile='quick', cache_dir=str(cache_dir))
+        assert len(list(cache_dir.glob('*.pickle'))) == 1
+        
+        def fail_load(self):
+            raise AssertionError("workflow should come from the cache")
+        
+        monkeypatch.setattr(JobParser, 'load_workflow', fail_load)
+        second = JobParser(str(job_file), profile='quick', cache_dir=str(cache_dir))
+        
+        assert second.get_jobs()[2]['chunk_metadata'] == first.get_jobs()[2]['chunk_metadata']
+        assert second.workflow_data['workflow']['name'] == 'MD Simulation'
+    
+    def test_cached_plan_keyed_by_profile_and_content(self, temp_dir, sample_job_config):
+        """Test changing the profile or job file produces a new plan"""
+        job_file = temp_dir / 'jobs.yaml'
+        cache_dir = temp_dir / 'cache'
+        
+        with open(job_file, 'w') as f:
+            yaml.dump(sample_job_config, f)
+        
+        JobParser(str(job_file), cache_dir=str(cache_dir))
+        quick = JobParser(str(job_file), profile='quick', cache_dir=str(cache_dir))
+        assert quick.get_jobs()[2]['chunk_metadata']['total_chunks'] == 2
+        
+        sample_job_config['jobs'][2]['chunk_config']['total_chunks'] = 7
+        with open(job_file, 'w') as f:
+            yaml.dump(sample_job_config, f)
+        
+        updated = JobParser(str(job_file), cache_dir=str(cache_dir))
+        assert updated.get_jobs()[2]['chunk_metadata']['total_chunks'] == 7
+        assert len(list(cache_dir.glob('*.pickle'))) == 3
+    
+    def test_cached_plan_keyed_by_version(self, temp_dir, sample_job_config, monkeypatch):
+        """Test plans cached by another package version are not reused"""
+        job_file = temp_dir / 'jobs.yaml'
+        with open(job_file, 'w') as f:
+            yaml.dump(sample_job_config, f)
+        
+        key = PlanCache.make_key(str(job_file))
+        monkeypatch.setattr('taskmanager.plan_cache.__version__', '99.0')
+        assert PlanCache.make_key(str(job_file)) != key
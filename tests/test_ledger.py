@@ -0,0 +1,111 @@
+"""
+Tests for the SQLite job ledger
+"""
+
+from taskmanager.__main__ import cmd_ledger_record, setup_argument_parser
+from taskmanager.batch import BatchManager
+from taskmanager.config import SlurmConfig
+from taskmanager.ledger import JobLedger
+from taskmanager.submitter import Submitter
+from tests.test_submitter import FakeSbatch
+
+
+class TestLedger:
+    
+    def test_record_and_query(self, temp_dir):
+        """Test steps are recorded, resubmissions replace them and queries filter"""
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            ledger.record_submissions('membrane', [
+                {'job': 'min', 'step': 'min.sh', 'slurm_id': 100, 'resources': {'nodes': 1}},
+                {'job': 'prod', 'step': 'prod_chunk1.sh', 'slurm_id': 101, 'array_index': 1},
+                {'job': 'prod', 'step': 'prod_chunk2.sh', 'slurm_id': 101, 'array_index': 2},
+            ])
+            ledger.record_submissions('other', [{'job': 'min', 'step': 'min.sh', 'slurm_id': 200}])
+            ledger.record_submissions('membrane', [{'job': 'min', 'step': 'min.sh', 'slurm_id': 102}])
+            
+            assert ledger.get('membrane', 'min', 'min.sh')['slurm_id'] == '102'
+            assert len(ledger.steps('membrane')) == 3
+            assert ledger.workflows() == ['membrane', 'other']
+            assert ledger.get('membrane', 'prod', 'prod_chunk2.sh')['array_index'] == 2
+    
+    def test_same_name_job_files_stay_apart(self, temp_dir):
+        """Test copies of a job file keep their own rows and a bare name matches all of them"""
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            ledger.record_submissions('membrane@/sys_a/jobs.yaml', [{'job': 'min', 'step': 'min.sh', 'slurm_id': 100}])
+            ledger.record_submissions('membrane@/sys_b/jobs.yaml', [{'job': 'min', 'step': 'min.sh', 'slurm_id': 200}])
+            ledger.record_submissions('membrane2@/sys_c/jobs.yaml', [{'job': 'min', 'step': 'min.sh', 'slurm_id': 300}])
+            
+            assert ledger.get('membrane@/sys_a/jobs.yaml', 'min', 'min.sh')['slurm_id'] == '100'
+            assert [step['slurm_id'] for step in ledger.steps('membrane@/sys_b/jobs.yaml')] == ['200']
+            assert [step['slurm_id'] for step in ledger.steps('membrane')] == ['100', '200']
+            assert ledger.workflows('membrane') == ['membrane@/sys_a/jobs.yaml', 'membrane@/sys_b/jobs.yaml']
+            assert ledger.state_counts('membrane') == {'SUBMITTED': 2}
+    
+    def test_update_states(self, temp_dir):
+        """Test state updates address whole jobs or single array tasks"""
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            ledger.record_submissions('membrane', [
+                {'job': 'min', 'step': 'min.sh', 'slurm_id': 100},
+                {'job': 'prod', 'step': 'prod_chunk1.sh', 'slurm_id': 101, 'array_index': 1},
+                {'job': 'prod', 'step': 'prod_chunk2.sh', 'slurm_id': 101, 'array_index': 2},
+            ])
+            
+            ledger.update_states([
+                {'slurm_id': 100, 'state': 'COMPLETED', 'start_time': 10.0, 'end_time': 20.0, 'exit_code': 0},
+                {'slurm_id': 101, 'array_index': 1, 'state': 'RUNNING', 'start_time': 30.0},
+            ])
+            
+            done = ledger.get('membrane', 'min', 'min.sh')
+            assert (done['state'], done['end_time'], done['exit_code']) == ('COMPLETED', 20.0, 0)
+            assert [step['step'] for step in ledger.active_steps('membrane')] == ['prod_chunk1.sh', 'prod_chunk2.sh']
+            assert ledger.state_counts('membrane') == {'COMPLETED': 1, 'RUNNING': 1, 'SUBMITTED': 1}
+            assert [step['step'] for step in ledger.steps(state='RUNNING')] == ['prod_chunk1.sh']
+    
+    def test_submit_records_steps(self, temp_dir, sample_slurm_config):
+        """Test direct submission records every step with its job ID"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        (temp_dir / 'min.sh').write_text('echo min\n')
+        
+        jobs = [{'name': 'min', 'job_type': 'minimization', 'path': str(temp_dir), 'scripts': ['min.sh']}]
+        manager = BatchManager(SlurmConfig(str(config_file)), workflow='membrane')
+        
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            manager.submit(jobs, Submitter(runner=FakeSbatch()), ledger=ledger)
+            step = ledger.get('membrane', 'min', 'min.sh')
+        
+        assert step['slurm_id'] == '1001'
+        assert step['job_type'] == 'minimization'
+        assert step['state'] == 'SUBMITTED'
+    
+    def test_batch_script_records_job_ids(self, temp_dir, sample_slurm_config):
+        """Test generated scripts record job IDs through ledger-record"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        manager = BatchManager(SlurmConfig(str(config_file)), 'membrane', 'ledger.db')
+        
+        jobs = [{'name': 'min', 'job_type': 'minimization', 'path': 'min', 'scripts': ['min.sh']}]
+        script = open(manager.generate_batch_script(jobs, str(temp_dir / 'batch.sh'))).read()
+        
+        assert 'LEDGER_DB="ledger.db"' in script
+        assert 'record_job --job "min" --step "min.sh" --slurm-id "$job_id"' in script
+        assert 'ledger-record --db "$LEDGER_DB"' in script
+        assert '--from-file "$LEDGER_PENDING"' in script
+    
+    def test_ledger_record_from_file(self, temp_dir):
+        """Test one ledger-record run records every line collected by a batch script"""
+        pending = temp_dir / 'ledger.db.pending.abc'
+        pending.write_text(
+            '--job\tmin\t--step\tmin.sh\t--slurm-id\t100\n'
+            '--job\tprod\t--chunks\tprod_chunk\t1\t2\t--slurm-id\t101\t--path\tprod\n'
+        )
+        args = setup_argument_parser().parse_args(
+            ['ledger-record', '--db', str(temp_dir / 'ledger.db'), '--workflow', 'membrane', '--from-file', str(pending)]
+        )
+        
+        assert cmd_ledger_record(args) == 0
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            assert [(step['step'], step['slurm_id']) for step in ledger.steps('membrane')] == [
+                ('min.sh', '100'), ('prod_chunk1.sh', '101'), ('prod_chunk2.sh', '101')
+            ]
+            assert ledger.get('membrane', 'prod', 'prod_chunk2.sh')['array_index'] == 2
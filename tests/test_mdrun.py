@@ -0,0 +1,69 @@
+"""
+Tests for mdrun flags derived from the SLURM allocation
+"""
+
+import subprocess
+
+from taskmanager.mdrun import mdrun_setup
+
+
+def run_setup(env, **kwargs):
+    """Run the setup block under set -u; return OMP_NUM_THREADS, flags and launcher"""
+    script = (
+        "set -euo pipefail\n"
+        + mdrun_setup(**kwargs)
+        + 'echo "$OMP_NUM_THREADS"\necho "${MDRUN_FLAGS[*]}"\necho "${MDRUN_LAUNCHER[*]:-}"\n'
+        + 'echo "${GMX_ENABLE_DIRECT_GPU_COMM:-}"\n'
+    )
+    result = subprocess.run(['bash', '-c', script], env={'PATH': '/usr/bin:/bin', **env},
+                            capture_output=True, text=True, check=True)
+    return result.stdout.splitlines()[1:]
+
+
+class TestMdrunSetup:
+
+    def test_cpu_allocation(self):
+        """Test threads and ranks follow the allocation and pinning is left to GROMACS"""
+        threads, flags, launcher, direct = run_setup(
+            {'SLURM_JOB_ID': '1', 'SLURM_CPUS_PER_TASK': '6', 'SLURM_NTASKS': '8'}
+        )
+
+        assert threads == '6'
+        assert flags == '-ntomp 6 -pin auto'
+        assert launcher == 'srun --ntasks=8 --cpus-per-task=6'
+        assert direct == ''
+
+    def test_fallback_outside_slurm(self):
+        """Test a single unpinned thread and no srun without an allocation"""
+        threads, flags, launcher, _ = run_setup({})
+
+        assert (threads, flags, launcher) == ('1', '-ntomp 1', 'env')
+
+    def test_gpu_offload(self):
+        """Test GPU flags for dynamics and minimization with several ranks"""
+        env = {'SLURM_JOB_ID': '1', 'SLURM_CPUS_PER_TASK': '8', 'SLURM_NTASKS': '4', 'SLURM_JOB_GPUS': '0,1,2,3'}
+
+        _, flags, _, direct = run_setup(env)
+        assert flags == '-ntomp 8 -pin auto -nb gpu -pme gpu -bonded gpu -update gpu -npme 1'
+        assert direct == '1'
+
+        _, flags, launcher, _ = run_setup(env, dynamics=False, thread_mpi=True)
+        assert flags == '-ntomp 8 -ntmpi 4 -pin auto -nb gpu'
+        assert launcher == ''
+
+    def test_executor_step_placement(self):
+        """Test srun is confined to the nodes the step executor assigned"""
+        env = {'SLURM_JOB_ID': '1', 'SLURM_CPUS_PER_TASK': '4', 'SLURM_NTASKS': '2', 'TASKMANAGER_NODELIST': 'n3,n4'}
+
+        _, _, launcher, _ = run_setup(env)
+        assert launcher == 'srun --ntasks=2 --cpus-per-task=4 --nodelist=n3,n4 --exact'
+
+    def test_thread_mpi_ranks_per_node(self):
+        """Test thread-MPI ranks count the tasks of one node"""
+        env = {'SLURM_JOB_ID': '1', 'SLURM_CPUS_PER_TASK': '4', 'SLURM_NTASKS': '16', 'SLURM_NNODES': '2'}
+
+        _, flags, _, _ = run_setup(env, thread_mpi=True)
+        assert flags == '-ntomp 4 -ntmpi 8 -pin auto'
+
+        _, flags, _, _ = run_setup(dict(env, SLURM_NTASKS_PER_NODE='6(x2)'), thread_mpi=True)
+        assert flags == '-ntomp 4 -ntmpi 6 -pin auto'
@@ -0,0 +1,74 @@
+"""
+Tests for packing independent jobs into shared allocations
+"""
+
+import subprocess
+import pytest
+from taskmanager.batch import BatchManager
+from taskmanager.config import SlurmConfig
+from taskmanager.packing import AllocationPacker
+from taskmanager.utils import ValidationError
+
+
+def item(name, cores, seconds):
+    return {'name': name, 'cores': cores, 'seconds': seconds}
+
+
+class TestPacking:
+    
+    def test_simulate_matches_executor_policy(self):
+        """Test the makespan follows start-in-order with backfill on free cores"""
+        packer = AllocationPacker(cores_per_node=8)
+        
+        assert packer.simulate([item('a', 4, 100), item('b', 4, 100)]) == 100
+        assert packer.simulate([item('a', 6, 100), item('b', 4, 50), item('c', 2, 50)]) == 150
+    
+    def test_first_fit_decreasing(self):
+        """Test 100 quarter-node jobs pack into a handful of allocations"""
+        packer = AllocationPacker(cores_per_node=48, max_seconds=4 * 3600)
+        items = [item(f'min{i}', 12, 3600) for i in range(100)]
+        
+        allocations = packer.pack(items)
+        
+        # 4 concurrent jobs per node, 4 waves within the time budget
+        assert len(allocations) == 7
+        assert all(allocation['seconds'] <= 4 * 3600 for allocation in allocations)
+        assert sum(len(allocation['items']) for allocation in allocations) == 100
+    
+    def test_default_budget_is_longest_job(self):
+        """Test packing never makes an allocation outlast the longest job"""
+        packer = AllocationPacker(cores_per_node=8)
+        allocations = packer.pack([item('long', 4, 1000), item('a', 4, 500), item('b', 4, 500), item('c', 8, 100)])
+        
+        assert [allocation['seconds'] for allocation in allocations] == [1000, 100]
+        assert [i['name'] for i in allocations[0]['items']] == ['long', 'a', 'b']
+    
+    def test_oversized_job_rejected(self):
+        """Test jobs larger than a node cannot be packed"""
+        with pytest.raises(ValidationError):
+            AllocationPacker(cores_per_node=8).pack([item('big', 16, 100)])
+    
+    def test_pack_batch_script(self, temp_dir, sample_slurm_config):
+        """Test pack mode writes one executor-driven allocation per bin"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config + "\n[PACK]\nNODES=1\nCORES_PER_NODE=48\n")
+        manager = BatchManager(SlurmConfig(str(config_file)))
+        
+        jobs = [
+            {'name': f'sys{i}', 'job_type': 'minimization', 'path': f'sys{i}', 'cores': 24,
+             'time': '1:00:00', 'scripts': ['min.sh']}
+            for i in range(4)
+        ]
+        output = manager.generate_batch_script(jobs, str(temp_dir / 'pack.sh'), 'pack')
+        script = open(output).read()
+        
+        assert script.count("<< 'PACKEOF'") == 2
+        assert '#SBATCH --time=01:00:00' in script
+        assert '"cores": 24' in script
+        assert '"cpus_per_task": ' in script
+        assert 'pack_1.json" --keep-going' in script
+        assert subprocess.run(['bash', '-n', output], capture_output=True).returncode == 0
+        
+        jobs[1]['depends_on'] = ['sys0']
+        with pytest.raises(ValidationError):
+            manager.pack_jobs(jobs)
@@ -0,0 +1,177 @@
+"""
+Tests for pilot jobs and the file-based work queue
+"""
+
+import subprocess
+import pytest
+from taskmanager.batch import BatchManager
+from taskmanager.config import SlurmConfig
+from taskmanager.pilot import WorkQueue, Pilot, main
+from taskmanager.utils import ValidationError
+
+
+def write_step(path, body='true'):
+    path.write_text(f'echo {path.stem} >> order.txt\n{body}\n')
+    return path.name
+
+
+class TestPilot:
+    
+    def test_claim_is_exclusive(self, temp_dir):
+        """Test a task can be claimed once and ends up in done or failed"""
+        queue = WorkQueue(temp_dir / 'queue')
+        first, second = queue.enqueue_many([{'name': 'a/min.sh'}, {'name': 'b/min.sh'}])
+        
+        assert queue.claim(first) == {'name': 'a/min.sh'}
+        assert queue.claim(first) is None
+        
+        queue.finish(first, {'name': 'a/min.sh'}, 0, 1.5)
+        queue.claim(second)
+        queue.finish(second, {'name': 'b/min.sh'}, 2)
+        
+        assert queue.counts() == {'pending': 0, 'running': 0, 'done': 1, 'failed': 1}
+        assert queue._read('failed', second)['exit_code'] == 2
+    
+    def test_ready_follows_dependencies(self, temp_dir):
+        """Test tasks become ready once their 'after' tasks are done"""
+        queue = WorkQueue(temp_dir / 'queue')
+        queue.enqueue_many([
+            {'name': 'min'},
+            {'name': 'nvt', 'after': ['min']},
+            {'name': 'other', 'after': ['broken']},
+            {'name': 'broken'},
+        ])
+        
+        assert [task['name'] for _, task in queue.ready()] == ['min', 'broken']
+        
+        for filename, task in queue.ready():
+            queue.claim(filename)
+            queue.finish(filename, task, 0 if task['name'] == 'min' else 1)
+        
+        assert [task['name'] for _, task in queue.ready()] == ['nvt']
+        assert queue.counts()['failed'] == 2
+    
+    def test_recover_running(self, temp_dir):
+        """Test tasks of a killed pilot can be returned to pending"""
+        queue = WorkQueue(temp_dir / 'queue')
+        filename = queue.enqueue({'name': 'min'})
+        queue.claim(filename)
+        
+        assert queue.recover() == 1
+        assert queue.counts()['pending'] == 1
+    
+    def test_pilot_runs_queue_in_order(self, temp_dir):
+        """Test the pilot runs dependent steps in order and stops when idle"""
+        queue = WorkQueue(temp_dir / 'queue')
+        queue.enqueue_many([
+            {'name': 'min', 'script': write_step(temp_dir / 'min.sh'), 'path': str(temp_dir), 'nodes': 1},
+            {'name': 'nvt', 'script': write_step(temp_dir / 'nvt.sh'), 'path': str(temp_dir), 'nodes': 1, 'after': ['min']},
+            {'name': 'long', 'script': write_step(temp_dir / 'long.sh'), 'path': str(temp_dir), 'nodes': 1, 'seconds': 7200},
+        ])
+        
+        pilot = Pilot(queue, ['n1'], cores_per_node=4, walltime=3600, reserve=60, idle_timeout=0, poll_interval=0.01)
+        results = pilot.run()
+        
+        assert [result['name'] for result in results] == ['min', 'nvt']
+        assert (temp_dir / 'order.txt').read_text().split() == ['min', 'nvt']
+        # Too long for the remaining walltime, left for the next pilot
+        assert queue.counts() == {'pending': 1, 'running': 0, 'done': 2, 'failed': 0}
+        assert pilot.out_of_time == ['long']
+    
+    def test_pilot_fails_when_tasks_outlast_walltime(self, temp_dir, capsys):
+        """Test a pilot that cannot start its tasks in time exits non-zero"""
+        queue = WorkQueue(temp_dir / 'queue')
+        queue.enqueue({'name': 'prod', 'script': write_step(temp_dir / 'prod.sh'), 'path': str(temp_dir),
+                       'nodes': 1, 'seconds': 86400})
+        
+        assert main([str(temp_dir / 'queue'), '--walltime', '86400', '--idle-timeout', '0']) == 1
+        assert 'left pending' in capsys.readouterr().out
+        assert queue.counts()['pending'] == 1
+    
+    def test_pilot_walltime(self, temp_dir, sample_slurm_config):
+        """Test the pilot TIME follows the longest step chain unless [pilot] sets it"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        jobs = [
+            {'name': 'min', 'job_type': 'minimization', 'path': 'min', 'scripts': ['min.sh']},
+            {'name': 'eq', 'job_type': 'equilibration', 'path': 'eq', 'scripts': ['nvt.sh'], 'depends_on': ['min']},
+        ]
+        
+        output = BatchManager(SlurmConfig(str(config_file))).generate_batch_script(
+            jobs, str(temp_dir / 'submit.sh'), 'pilot', dry_run=True
+        )
+        script = open(output).read()
+        # 2 h minimization then 4 h equilibration, plus the reserve
+        assert '#SBATCH --time=06:05:00' in script
+        assert '--walltime 21900 --reserve 300' in script
+        
+        config_file.write_text(sample_slurm_config + "\n[PILOT]\nTIME=1:00:00\n")
+        with pytest.raises(ValidationError, match='No step fits'):
+            BatchManager(SlurmConfig(str(config_file))).generate_batch_script(
+                jobs, str(temp_dir / 'submit.sh'), 'pilot', dry_run=True
+            )
+    
+    def test_pilot_batch(self, temp_dir, sample_slurm_config):
+        """Test pilot mode queues every step and writes a pilot job script"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config + f"\n[PILOT]\nNODES=8\nTIME=2-00:00:00\nPILOT_QUEUE={temp_dir / 'queue'}\n")
+        
+        jobs = [
+            {'name': 'eq', 'job_type': 'nvt', 'path': 'eq', 'nodes': 2, 'scripts': ['nvt.sh', 'npt.sh']},
+            {'name': 'prod', 'job_type': 'production', 'path': 'prod', 'scripts': ['md.sh'], 'depends_on': ['eq']},
+        ]
+        output = BatchManager(SlurmConfig(str(config_file))).generate_batch_script(jobs, str(temp_dir / 'submit.sh'), 'pilot')
+        script = open(output).read()
+        
+        assert '--walltime 172800' in script
+        assert 'class WorkQueue' in script
+        assert subprocess.run(['bash', '-n', output], capture_output=True).returncode == 0
+        
+        queue = WorkQueue(temp_dir / 'queue')
+        tasks = [queue._read('pending', filename) for filename in queue.listing('pending')]
+        assert [task['name'] for task in tasks] == ['workflow:eq/nvt.sh', 'workflow:eq/npt.sh', 'workflow:prod/md.sh']
+        assert tasks[1]['after'] == ['workflow:eq/nvt.sh']
+        assert tasks[2]['after'] == ['workflow:eq/npt.sh']
+        assert tasks[0]['nodes'] == 2
+    
+    def test_workflows_share_a_queue(self, temp_dir, sample_slurm_config):
+        """Test same-named steps of two workflows stay apart and re-enqueueing adds nothing"""
+        config_file = temp_dir / '.slurmparams'
+        queue_dir = str(temp_dir / 'queue')
+        config_file.write_text(sample_slurm_config + f"\n[PILOT]\nPILOT_QUEUE={queue_dir}\n")
+        config = SlurmConfig(str(config_file))
+        jobs = [
+            {'name': 'min', 'job_type': 'minimization', 'path': 'min', 'scripts': ['min.sh']},
+            {'name': 'nvt', 'job_type': 'nvt', 'path': 'nvt', 'scripts': ['nvt.sh'], 'depends_on': ['min']},
+        ]
+        first = BatchManager(config, 'membrane@/sys_a/jobs.yaml')
+        second = BatchManager(config, 'membrane@/sys_b/jobs.yaml')
+        
+        assert len(first.enqueue_steps(jobs, queue_dir)) == 2
+        assert len(second.enqueue_steps(jobs, queue_dir)) == 2
+        assert first.enqueue_steps(jobs, queue_dir) == []
+        
+        queue = WorkQueue(queue_dir)
+        for filename, task in queue.ready():
+            queue.claim(filename)
+            queue.finish(filename, task, 0 if 'sys_a' in task['name'] else 1)
+        
+        # Only the failed workflow's step is queued again, and only the other one's nvt is ready
+        assert len(second.enqueue_steps(jobs, queue_dir)) == 1
+        assert [task['name'] for _, task in queue.ready()] == [
+            'membrane@/sys_a/jobs.yaml:nvt/nvt.sh', 'membrane@/sys_b/jobs.yaml:min/min.sh'
+        ]
+        
+        output = first.generate_batch_script(jobs, str(temp_dir / 'submit.sh'), 'pilot', dry_run=True)
+        assert '2 steps would be queued' in open(output).read()
+        assert queue.counts() == {'pending': 3, 'running': 0, 'done': 1, 'failed': 0}
+    
+    def test_long_task_names(self, temp_dir):
+        """Test long names get distinct file names within the length limit"""
+        queue = WorkQueue(temp_dir / 'queue')
+        base = 'membrane@/' + 'deep/' * 60
+        filenames = queue.enqueue_many([{'name': base + 'a/min.sh'}, {'name': base + 'b/min.sh'}])
+        
+        assert len(set(filenames)) == 2
+        assert all(len(filename) < 255 for filename in filenames)
+        assert queue.enqueue_many([{'name': base + 'a/min.sh'}]) == []
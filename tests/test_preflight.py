@@ -0,0 +1,67 @@
+"""
+Tests for Preflight validation
+"""
+
+import pytest
+from taskmanager.chunks import ChunkRange
+from taskmanager.preflight import Preflight
+from taskmanager.utils import find_missing_paths
+
+
+class TestPreflight:
+    
+    def test_find_missing_paths(self, temp_dir):
+        """Test batched lookup reports missing files and directories in order"""
+        (temp_dir / 'a.txt').touch()
+        (temp_dir / 'sub').mkdir()
+        (temp_dir / 'sub' / 'b.txt').touch()
+        
+        paths = [
+            temp_dir / 'a.txt',
+            temp_dir / 'nope.txt',
+            temp_dir / 'sub' / 'b.txt',
+            temp_dir / 'gone' / 'c.txt',
+            temp_dir / 'sub'
+        ]
+        
+        assert find_missing_paths(paths) == [str(temp_dir / 'nope.txt'), str(temp_dir / 'gone' / 'c.txt')]
+    
+    def test_reports_missing_inputs(self, temp_dir):
+        """Test scripts, MDPs and structures are all checked up front"""
+        min_dir = temp_dir / 'min'
+        prod_dir = temp_dir / 'prod'
+        min_dir.mkdir()
+        prod_dir.mkdir()
+        (min_dir / 'min_steep.sh').touch()
+        (min_dir / 'topol.top').touch()
+        (prod_dir / 'prod_chunk1.sh').touch()
+        
+        jobs = [
+            {
+                'name': 'minimization',
+                'path': str(min_dir),
+                'scripts': ['min_steep.sh', 'min_cg.sh'],
+                'topology': 'topol.top',
+                'structure': 'step5_input.gro',
+                'outputs': ['step6.0_steep.gro']
+            },
+            {
+                'name': 'production',
+                'path': str(prod_dir),
+                'scripts': ChunkRange('prod_chunk', 1, 3),
+                'outputs': ChunkRange('prod_chunk', 1, 3, ('.xtc', '.edr', '.gro')),
+                'checkpoint': 'prod_chunk1.gro',
+                'is_chunked': True,
+                'chunk_metadata': {'template_mdp': 'step7_production.mdp'}
+            }
+        ]
+        
+        missing = Preflight(jobs).run()
+        reported = {(item['job'], item['kind'], item['path'].rsplit('/', 1)[-1]) for item in missing}
+        
+        assert reported == {
+            ('minimization', 'script', 'min_cg.sh'),
+            ('minimization', 'structure', 'step5_input.gro'),
+            ('production', 'script', 'prod_chunk2.sh'),
+            ('production', 'mdp', 'step7_production.mdp')
+        }
@@ -1,6 +1,7 @@
 """Tests for production chunker"""
 import pytest
 from pathlib import Path
+from taskmanager.__main__ import main
 from taskmanager.production_chunker import ProductionChunker
 
 class TestProductionChunker:
@@ -28,4 +29,47 @@ class TestProductionChunker:
         chunker = ProductionChunker(total_chunks=3, chunk_length_ns=10)
         names = chunker.get_chunk_names("prod")
         
-        assert names == ["prod1", "prod2", "prod3"] 
\ No newline at end of file
+        assert names == ["prod1", "prod2", "prod3"]
+    
+    def test_generate_chain_script(self, temp_dir):
+        """Test chain mode writes one self-resubmitting script and a target file"""
+        (temp_dir / "step7_production.mdp").write_text("dt = 0.002\nnsteps = 1000\n")
+        chunker = ProductionChunker(total_chunks=3, chunk_length_ns=10)
+        
+        script = chunker.generate_chain_script(
+            str(temp_dir), 100, "#!/bin/bash\n\n#SBATCH --time=1-00:00:00\n"
+        )
+        content = Path(script).read_text()
+        
+        assert Path(script).name == "prod_chain.sh"
+        assert (temp_dir / "target_ns").read_text().strip() == "100"
+        assert "#SBATCH --time=1-00:00:00" in content
+        assert "nsteps = 5000000" in content
+        assert 'CHUNK_NUM="${CHUNK_NUM:-1}"' in content
+        assert "--dependency=\"afterok:${SLURM_JOB_ID}\"" in content
+        assert content.count("sbatch --parsable") == 1
+        assert "-ntomp 2" not in content
+        assert 'gmx_mpi mdrun -v -deffnm "$OUTPUT_PREFIX" -dlb auto -nstlist 10 "${MDRUN_FLAGS[@]}"' in content
+    
+    def test_regeneration_skips_unchanged_scripts(self, temp_dir):
+        """Test regenerating identical chunk scripts leaves the files untouched"""
+        chunker = ProductionChunker(total_chunks=3, chunk_length_ns=5)
+        scripts = chunker.generate_scripts(str(temp_dir), prefix="prod_chunk")
+        mtimes = [Path(script).stat().st_mtime_ns for script in scripts]
+        
+        chunker.generate_scripts(str(temp_dir), prefix="prod_chunk")
+        
+        assert chunker.writer.summary() == "3 written, 3 unchanged"
+        assert [Path(script).stat().st_mtime_ns for script in scripts] == mtimes
+    
+    def test_generate_chunks_command(self, temp_dir, monkeypatch):
+        """Test generate-chunks without --chain writes chained chunk scripts from the MDP"""
+        (temp_dir / "step7_production.mdp").write_text("dt = 0.002\nnsteps = 1000\n")
+        monkeypatch.setattr('sys.argv', [
+            'taskmanager', 'generate-chunks', '--chunks', '2', '--length-ns', '10', '--path', str(temp_dir)
+        ])
+        
+        assert main() == 0
+        second = (temp_dir / "prod_chunk2.sh").read_text()
+        assert "nsteps = 5000000" in second
+        assert '-t "modelbound_1.cpt"' in second
@@ -0,0 +1,95 @@
+"""
+Tests for the sacct efficiency report
+"""
+
+import os
+
+from taskmanager.ledger import JobLedger
+from taskmanager.report import EfficiencyReport, format_report, parse_cpu_time, parse_size_kb
+from tests.test_status import FakeSacct
+
+SACCT_OUTPUT = (
+    "100|COMPLETED|01:00:00|1-12:00:00|||billing=48,cpu=48,mem=24G,node=1\n"
+    "100.batch|COMPLETED|01:00:00|00:10.500|100M|1|cpu=48,mem=24G,node=1\n"
+    "100.0|COMPLETED|00:59:00|1-11:00:00|50M|48|cpu=48,mem=24G,node=1\n"
+    "101_1|COMPLETED|02:00:00|48:00:00|||billing=96,cpu=96,mem=48G,node=2\n"
+    "101_1.0|COMPLETED|02:00:00|48:00:00|4G|96|cpu=96,mem=48G,node=2\n"
+)
+
+MD_LOG_TAIL = """
+               Core t (s)   Wall t (s)        (%)
+       Time:   172800.000     3600.000     4800.0
+                 (ns/day)    (hour/ns)
+Performance:       48.000        0.500
+"""
+
+
+class TestParsing:
+
+    def test_units(self):
+        assert parse_size_kb('100M') == 102400
+        assert parse_size_kb('2048') == 2
+        assert parse_cpu_time('1-00:00:01') == 86401
+        assert parse_cpu_time('01:30.5') == 90.5
+
+    def test_parse_sacct_merges_steps(self):
+        """Test allocation lines give CPUs and time while step lines give memory"""
+        jobs = EfficiencyReport.parse_sacct(SACCT_OUTPUT)
+
+        assert set(jobs) == {'100', '101_1'}
+        assert jobs['100']['cpus'] == 48
+        assert jobs['100']['elapsed'] == 3600
+        assert jobs['100']['mem_used_kb'] == 50 * 1024 * 48
+        assert jobs['101_1']['nodes'] == 2
+
+
+class TestEfficiencyReport:
+
+    def test_build_report(self, temp_dir):
+        """Test efficiency, ns/day, cost per ns and oversize flags per step"""
+        (temp_dir / 'min.log').write_text(MD_LOG_TAIL)
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            ledger.record_submissions('membrane', [
+                {'job': 'min', 'step': 'min.sh', 'slurm_id': 100, 'job_type': 'minimization', 'path': str(temp_dir)},
+                {'job': 'prod', 'step': 'prod_chunk1.sh', 'slurm_id': 101, 'array_index': 1,
+                 'job_type': 'production', 'path': str(temp_dir)},
+            ])
+            steps = ledger.steps('membrane')
+
+        sacct = FakeSacct(SACCT_OUTPUT)
+        rows = EfficiencyReport(runner=sacct).build(steps)
+
+        assert len(sacct.calls) == 1
+        minimization, production = rows
+        assert minimization['cpu_efficiency'] == 0.75
+        assert minimization['ns_per_day'] == 48.0
+        assert minimization['core_hours_per_ns'] == 24.0
+        assert any('MEM_PER_CPU in [minimization]' in flag for flag in minimization['flags'])
+        assert not any('CPU efficiency' in flag for flag in minimization['flags'])
+
+        assert production['cpu_efficiency'] == 0.25
+        assert production['ns_per_day'] is None
+        assert any('fewer NODES in [production]' in flag for flag in production['flags'])
+        assert 'prod/prod_chunk1.sh' in format_report(rows)
+
+    def test_log_found_by_run_time(self, temp_dir):
+        """Test a log with another name is matched by when the step ran"""
+        log_file = temp_dir / 'step6.0_steep.log'
+        log_file.write_text(MD_LOG_TAIL)
+        os.utime(log_file, (1500, 1500))
+        step = {'step': 'min.sh', 'path': str(temp_dir), 'start_time': 1000, 'end_time': 2000}
+
+        assert EfficiencyReport().find_md_log(step) == str(log_file)
+        assert EfficiencyReport().find_md_log(dict(step, end_time=1100)) is None
+
+    def test_summarize(self):
+        rows = [
+            {'job_type': 'production', 'cpu_efficiency': 0.9, 'memory_use': None, 'ns_per_day': 50.0,
+             'core_hours_per_ns': 20.0},
+            {'job_type': 'production', 'cpu_efficiency': 0.7, 'memory_use': None, 'ns_per_day': 40.0,
+             'core_hours_per_ns': 30.0},
+        ]
+        summary = EfficiencyReport.summarize(rows)['production']
+        assert summary['steps'] == 2
+        assert summary['cpu_efficiency'] == 0.8
+        assert summary['memory_use'] is None
@@ -6,6 +6,7 @@ import pytest
 from pathlib import Path
 from taskmanager.config import SlurmConfig
 from taskmanager.script_generator import ScriptGenerator
+from taskmanager.utils import ValidationError
 
 
 class TestScriptGenerator:
@@ -103,4 +104,27 @@ class TestScriptGenerator:
         
         assert 'minimization_steep' in templates
         assert 'equilibration' in templates
-        assert 'production' in templates 
\ No newline at end of file
+        assert 'production' in templates
+    
+    def test_default_values_and_unknown_keys(self, temp_dir, sample_slurm_config):
+        """Test config replaces ${KEY:-default} and unknown keys are rejected only when strict"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        
+        config = SlurmConfig(str(config_file))
+        generator = ScriptGenerator(config, str(temp_dir / 'templates'))
+        
+        output_path = temp_dir / 'steep.sh'
+        generator.generate_script('minimization_steep', str(output_path), {'OUTPUT_PREFIX': 'em'})
+        content = output_path.read_text()
+        
+        assert 'OUTPUT_PREFIX="em"' in content
+        assert '-deffnm "em"' in content
+        assert 'MDP_FILE="${MDP_FILE:-step6.0_steep.mdp}"' in content
+        
+        with pytest.raises(ValidationError, match='OUTPUT_PREFX'):
+            generator.generate_script('minimization_steep', str(output_path), {'OUTPUT_PREFX': 'em'}, strict=True)
+        
+        # Shared parameter dicts carry keys other templates use
+        generator.generate_script('minimization_steep', str(output_path), {'OUTPUT_PREFIX': 'em', 'NSTEPS': 500})
+        assert output_path.read_text() == content
@@ -0,0 +1,85 @@
+"""
+Tests for the workflow simulator and planner
+"""
+
+import pytest
+import yaml
+
+from taskmanager.config import SlurmConfig
+from taskmanager.job_parser import JobParser
+from taskmanager.simulator import WorkflowPlanner, WorkflowSimulator
+from taskmanager.utils import ValidationError
+
+
+def task(name, seconds, depends_on=(), nodes=1, wait=0):
+    return {'name': name, 'depends_on': list(depends_on), 'nodes': nodes, 'cores': 10,
+            'seconds': seconds, 'wait': wait}
+
+
+class TestWorkflowSimulator:
+
+    def test_diamond_with_queue_waits(self):
+        """Test waits start at eligibility and the critical path follows the slowest branch"""
+        tasks = [
+            task('a', 100, wait=10),
+            task('b', 50, ['a']),
+            task('c', 200, ['a'], wait=20),
+            task('d', 10, ['b', 'c']),
+        ]
+        result = WorkflowSimulator().simulate(tasks)
+
+        assert result['makespan'] == 340
+        assert result['critical_path'] == ['a', 'c', 'd']
+        assert result['core_hours'] == pytest.approx(360 * 10 / 3600)
+        c = result['timeline'][2]
+        assert (c['eligible'], c['start'], c['end']) == (110, 130, 330)
+
+    def test_node_limit_serializes_steps(self):
+        """Test steps wait for free nodes when the workflow is capped"""
+        tasks = [task('a', 100, nodes=2), task('b', 100, nodes=2), task('c', 50, nodes=1)]
+
+        assert WorkflowSimulator().simulate(tasks)['makespan'] == 100
+        result = WorkflowSimulator(max_nodes=3).simulate(tasks)
+        assert result['makespan'] == 200
+        assert [entry['start'] for entry in result['timeline']] == [0, 100, 0]
+
+        with pytest.raises(ValidationError):
+            WorkflowSimulator(max_nodes=1).simulate(tasks)
+
+
+class TestWorkflowPlanner:
+
+    @pytest.fixture
+    def planner_jobs(self, temp_dir, sample_slurm_config, sample_job_config):
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        sample_job_config['jobs'][2]['chunk_config']['ns_per_day'] = 40
+        job_file = temp_dir / 'jobs.yaml'
+        job_file.write_text(yaml.dump(sample_job_config))
+        return WorkflowPlanner(SlurmConfig(str(config_file))), JobParser(str(job_file)).get_jobs()
+
+    def test_plan_runtimes(self, planner_jobs):
+        """Test chunks use ns/day and other steps fall back to TIME"""
+        planner, jobs = planner_jobs
+        result = planner.plan(jobs)
+
+        # 2 x 2h minimization, 2 x 4h equilibration, 3 x 6h chunks at 10 ns and 40 ns/day
+        assert result['makespan'] == 30 * 3600
+        assert result['core_hours'] == 2 * 2 * 4 * 48 + 2 * 4 * 6 * 48 + 3 * 6 * 8 * 48
+        assert result['critical_path'][0] == 'minimization/min_steep.sh'
+        assert result['critical_path'][-1] == 'production/prod_chunk3.sh'
+
+    def test_compare_node_counts_within_budget(self, planner_jobs):
+        """Test the recommendation is the fastest option within the core-hour budget"""
+        planner, jobs = planner_jobs
+
+        results, best = planner.compare({'default': jobs}, [8, 16])
+        assert len(results) == 2
+        assert best['nodes'] == 16
+        assert best['makespan'] < results[0]['makespan']
+
+        _, best = planner.compare({'default': jobs}, [8, 16], budget=results[0]['core_hours'])
+        assert best['nodes'] == 8
+
+        _, best = planner.compare({'default': jobs}, [8, 16], budget=1)
+        assert best is None
@@ -0,0 +1,80 @@
+"""
+Tests for resource sizing
+"""
+
+import pytest
+from taskmanager.batch import BatchManager
+from taskmanager.config import SlurmConfig
+from taskmanager.sizing import read_gro_header, PerformanceModel
+from taskmanager.utils import ValidationError
+
+
+def write_gro(path, atoms, box="12.50000  12.50000  9.00000"):
+    """Write a minimal .gro file with the given atom count"""
+    lines = ["Test system", f"{atoms:5d}"]
+    lines.extend(
+        f"{1:5d}{'SOL':<5}{'OW':>5}{i + 1:5d}{0.0:8.3f}{0.0:8.3f}{0.0:8.3f}"
+        for i in range(atoms)
+    )
+    lines.append(f"   {box}")
+    path.write_text("\n".join(lines) + "\n\n")
+
+
+class TestSizing:
+    
+    def test_read_gro_header(self, temp_dir):
+        """Test atom count and box are read from the header and last line"""
+        gro = temp_dir / 'system.gro'
+        write_gro(gro, 300)
+        
+        header = read_gro_header(str(gro))
+        
+        assert header['atoms'] == 300
+        assert header['box'] == (12.5, 12.5, 9.0)
+    
+    def test_read_invalid_gro(self, temp_dir):
+        """Test non-.gro input is rejected"""
+        bad = temp_dir / 'bad.gro'
+        bad.write_text("title\nnot a number\n")
+        
+        with pytest.raises(ValidationError):
+            read_gro_header(str(bad))
+    
+    def test_model_suggestion(self):
+        """Test resources scale with system size"""
+        model = PerformanceModel(cores_per_node=48, atoms_per_core=1000, mem_per_atom_kb=2, mem_base_mb=256)
+        
+        small = model.suggest(20000, cpus_per_task=4)
+        assert small == {'NODES': '1', 'NTASKS_PER_NODE': '5', 'CPUS_PER_TASK': '4', 'MEM_PER_CPU': '256MB'}
+        
+        large = model.suggest(400000, cpus_per_task=4)
+        assert large['NODES'] == '9'
+        assert large['NTASKS_PER_NODE'] == '11'
+    
+    def test_auto_size_fills_job_params(self, temp_dir, sample_slurm_config):
+        """Test AUTO_SIZE fills resources not set in the job type's section"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text("AUTO_SIZE=true\n" + sample_slurm_config)
+        
+        config = SlurmConfig(str(config_file))
+        
+        params = config.get_job_params('minimization', atoms=20000)
+        assert params['NODES'] == '4'  # explicit in [MINIMIZATION]
+        assert params['NTASKS_PER_NODE'] == '5'
+        assert params['MEM_PER_CPU'] == '256MB'
+        
+        assert config.get_job_params('minimization')['NTASKS_PER_NODE'] == '6'
+        assert not any('auto-size' in option for option in config.format_sbatch_options('production', atoms=20000))
+    
+    def test_structure_keeps_one_node_default_without_auto_size(self, temp_dir, sample_slurm_config):
+        """Test a readable structure only leaves the node count open when AUTO_SIZE is on"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        write_gro(temp_dir / 'system.gro', 300)
+        job = {'name': 'prod', 'job_type': 'production', 'path': str(temp_dir), 'structure': 'system.gro'}
+        
+        assert BatchManager(SlurmConfig(str(config_file)))._job_resources(job)['nodes'] == 1
+        
+        config_file.write_text("AUTO_SIZE=true\n" + sample_slurm_config)
+        resources = BatchManager(SlurmConfig(str(config_file)))._job_resources(job)
+        assert (resources['nodes'], resources['atoms']) == (None, 300)
@@ -0,0 +1,100 @@
+"""
+Tests for batched workflow status
+"""
+
+import subprocess
+
+from taskmanager.ledger import JobLedger
+from taskmanager.status import StatusFetcher, WorkflowStatus, expand_array_range
+
+
+class FakeSacct:
+    """Stands in for subprocess.run, answering sacct from a fixed table"""
+
+    def __init__(self, output):
+        self.output = output
+        self.calls = []
+
+    def __call__(self, cmd, **kwargs):
+        self.calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout=self.output, stderr='')
+
+
+SACCT_OUTPUT = (
+    "100|COMPLETED|2024-05-01T10:00:00|2024-05-01T11:00:00|0:0\n"
+    "101_1|RUNNING|2024-05-01T11:00:00|Unknown|0:0\n"
+    "101_[2-3%1]|PENDING|Unknown|Unknown|0:0\n"
+    "102|CANCELLED by 1000|None|2024-05-01T11:05:00|0:15\n"
+)
+
+
+class TestStatusFetcher:
+
+    def test_parse_sacct(self):
+        """Test array tasks, pending ranges and state suffixes are parsed"""
+        rows = StatusFetcher.parse_sacct(SACCT_OUTPUT)
+
+        assert set(rows) == {'100', '101_1', '101_2', '101_3', '102'}
+        assert rows['100']['exit_code'] == 0
+        assert rows['101_1']['end_time'] is None
+        assert rows['101_3']['state'] == 'PENDING'
+        assert rows['102']['state'] == 'CANCELLED'
+        assert rows['102']['start_time'] is None
+
+    def test_expand_array_range(self):
+        assert expand_array_range('2-4,7%2') == [2, 3, 4, 7]
+
+    def test_single_call_and_ttl_cache(self, temp_dir):
+        """Test all IDs go into one sacct call and are reused within the TTL"""
+        sacct = FakeSacct(SACCT_OUTPUT)
+        now = [1000.0]
+        fetcher = StatusFetcher(ttl=60, cache_file=str(temp_dir / 'cache.json'), runner=sacct, clock=lambda: now[0])
+
+        rows = fetcher.fetch(['100', '101', '102', 'fake_job_id_1'])
+        assert len(sacct.calls) == 1
+        assert '100,101,102' in sacct.calls[0]
+        assert rows['101_2']['state'] == 'PENDING'
+
+        # A second process within the TTL reads the cache file
+        fetcher = StatusFetcher(ttl=60, cache_file=str(temp_dir / 'cache.json'), runner=sacct, clock=lambda: now[0])
+        now[0] += 30
+        assert fetcher.fetch(['100', '101'])['100']['state'] == 'COMPLETED'
+        assert len(sacct.calls) == 1
+
+        now[0] += 60
+        fetcher.fetch(['100', '101'])
+        assert len(sacct.calls) == 2
+        assert '100,101' in sacct.calls[1]
+
+        fetcher.fetch(['100'], refresh=True)
+        assert len(sacct.calls) == 3
+
+
+class TestWorkflowStatus:
+
+    def test_refresh_updates_ledger(self, temp_dir):
+        """Test every workflow is refreshed with one call and terminal steps are not asked again"""
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            ledger.record_submissions('membrane', [
+                {'job': 'min', 'step': 'min.sh', 'slurm_id': 100},
+                {'job': 'prod', 'step': 'prod_chunk1.sh', 'slurm_id': 101, 'array_index': 1},
+                {'job': 'prod', 'step': 'prod_chunk2.sh', 'slurm_id': 101, 'array_index': 2},
+            ])
+            ledger.record_submissions('protein', [{'job': 'min', 'step': 'min.sh', 'slurm_id': 102}])
+
+            sacct = FakeSacct(SACCT_OUTPUT)
+            status = WorkflowStatus(ledger, StatusFetcher(ttl=0, cache_file=None, runner=sacct))
+            status.refresh()
+
+            assert len(sacct.calls) == 1
+            assert ledger.get('membrane', 'min', 'min.sh')['state'] == 'COMPLETED'
+            assert ledger.get('membrane', 'prod', 'prod_chunk1.sh')['state'] == 'RUNNING'
+            assert ledger.get('membrane', 'prod', 'prod_chunk2.sh')['state'] == 'PENDING'
+            assert ledger.get('protein', 'min', 'min.sh')['end_time'] is not None
+            assert dict(status.summary()) == {
+                'membrane': {'COMPLETED': 1, 'PENDING': 1, 'RUNNING': 1},
+                'protein': {'CANCELLED': 1},
+            }
+
+            status.refresh()
+            assert sacct.calls[1][2] == '101'
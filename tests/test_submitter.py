@@ -0,0 +1,192 @@
+"""
+Tests for Submitter class
+"""
+
+import asyncio
+import subprocess
+import pytest
+from taskmanager.batch import BatchManager
+from taskmanager.config import SlurmConfig
+from taskmanager.ledger import JobLedger
+from taskmanager.submitter import Submitter
+from taskmanager.utils import SubmissionError
+
+
+class FakeSbatch:
+    """Records sbatch calls and answers with sequential job IDs"""
+    
+    def __init__(self, failures=None):
+        self.calls = []
+        self.failures = list(failures or [])
+        self.next_id = 1000
+    
+    def __call__(self, cmd, input=None, **kwargs):
+        self.calls.append((cmd, input))
+        if self.failures:
+            return subprocess.CompletedProcess(cmd, 1, '', self.failures.pop(0))
+        self.next_id += 1
+        return subprocess.CompletedProcess(cmd, 0, f"{self.next_id};cluster\n", '')
+
+
+class FakeAsyncSbatch:
+    """Async sbatch stand-in tracking how many calls run at once"""
+    
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.next_id = 1000
+    
+    async def __call__(self, cmd, script):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self.calls.append((cmd, script))
+        self.next_id += 1
+        return 0, f"{self.next_id}\n", ''
+
+
+class TestSubmitter:
+    
+    def test_submit_passes_script_on_stdin(self):
+        """Test script content goes to sbatch stdin and the ID is parsed"""
+        fake = FakeSbatch()
+        submitter = Submitter(runner=fake)
+        
+        job_id = submitter.submit("#!/bin/bash\necho hi\n", dependencies=['10', '11'])
+        
+        assert job_id == '1001'
+        cmd, stdin = fake.calls[0]
+        assert cmd == ['sbatch', '--parsable', '--dependency=afterok:10:11']
+        assert stdin == "#!/bin/bash\necho hi\n"
+    
+    def test_retry_on_transient_error(self):
+        """Test transient controller errors are retried with backoff"""
+        fake = FakeSbatch(failures=['sbatch: error: Socket timed out on send/recv operation'] * 2)
+        delays = []
+        submitter = Submitter(runner=fake, sleep=delays.append, backoff=0.5)
+        
+        assert submitter.submit("script") == '1001'
+        assert delays == [0.5, 1.0]
+    
+    def test_permanent_error_raises(self):
+        """Test non-transient errors fail immediately"""
+        fake = FakeSbatch(failures=['sbatch: error: Invalid partition name specified'])
+        submitter = Submitter(runner=fake, sleep=lambda _: None)
+        
+        with pytest.raises(SubmissionError, match="Invalid partition"):
+            submitter.submit("script")
+        assert len(fake.calls) == 1
+    
+    def test_submit_steps_resolves_dependencies(self):
+        """Test steps are submitted with their parents' job IDs"""
+        fake = FakeSbatch()
+        submitter = Submitter(runner=fake, max_workers=1)
+        
+        steps = [
+            {'name': 'a', 'script': 'A'},
+            {'name': 'b', 'script': 'B', 'depends_on': ['a']},
+            {'name': 'c', 'script': 'C', 'depends_on': ['b']}
+        ]
+        job_ids = submitter.submit_steps(steps)
+        
+        assert job_ids == {'a': '1001', 'b': '1002', 'c': '1003'}
+        assert fake.calls[2][0][-1] == '--dependency=afterok:1002'
+    
+    def test_submit_steps_unknown_dependency(self):
+        """Test unknown parents are rejected before anything is submitted"""
+        fake = FakeSbatch()
+        submitter = Submitter(runner=fake)
+        
+        with pytest.raises(SubmissionError, match="unknown step"):
+            submitter.submit_steps([{'name': 'a', 'script': 'A', 'depends_on': ['missing']}])
+        assert fake.calls == []
+    
+    def test_submit_steps_keeps_partial_ids(self, temp_dir, sample_slurm_config):
+        """Test steps submitted before a rejection keep their IDs and are recorded"""
+        fake = FakeSbatch()
+        
+        def runner(cmd, input=None, **kwargs):
+            if 'bad' in input:
+                return subprocess.CompletedProcess(cmd, 1, '', 'sbatch: error: Invalid partition name specified')
+            return fake(cmd, input)
+        
+        submitter = Submitter(runner=runner, max_workers=1)
+        job_ids = {}
+        with pytest.raises(SubmissionError):
+            submitter.submit_steps([
+                {'name': 'a', 'script': 'A'},
+                {'name': 'b', 'script': 'bad', 'depends_on': ['a']},
+                {'name': 'c', 'script': 'C', 'depends_on': ['b']},
+            ], job_ids)
+        assert job_ids == {'a': '1001'}
+        
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        for script in ('a.sh', 'bad.sh'):
+            (temp_dir / script).write_text(f"echo {script}\n")
+        jobs = [{'name': 'chain', 'job_type': 'minimization', 'path': str(temp_dir), 'scripts': ['a.sh', 'bad.sh']}]
+        
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            with pytest.raises(SubmissionError):
+                BatchManager(SlurmConfig(str(config_file)), workflow='wf').submit(jobs, submitter, ledger=ledger)
+            assert ledger.get('wf', 'chain', 'a.sh')['slurm_id'] == '1002'
+            assert ledger.get('wf', 'chain', 'bad.sh') is None
+    
+    def test_dry_run_ids_are_unique(self):
+        """Test concurrent dry-run submissions never share a placeholder ID"""
+        submitter = Submitter(dry_run=True, max_workers=8)
+        job_ids = submitter.submit_steps([{'name': str(i), 'script': 'S'} for i in range(200)])
+        
+        assert len(set(job_ids.values())) == 200
+    
+    def test_submit_steps_async_keeps_chain_order(self):
+        """Test async submission waits for parents and respects the semaphore"""
+        fake = FakeAsyncSbatch()
+        submitter = Submitter(async_runner=fake)
+        steps = [
+            {'name': f"{chain}{i}", 'script': f"{chain}{i}", 'depends_on': [f"{chain}{i - 1}"] if i else []}
+            for chain in 'xyz' for i in range(3)
+        ]
+        
+        async def submit():
+            return await submitter.submit_steps_async(steps, asyncio.Semaphore(2))
+        
+        job_ids = asyncio.run(submit())
+        
+        assert fake.max_in_flight == 2
+        for cmd, script in fake.calls:
+            if script[1] != '0':
+                parent = f"{script[0]}{int(script[1]) - 1}"
+                assert cmd[-1] == f"--dependency=afterok:{job_ids[parent]}"
+    
+    def test_submit_many_async(self, temp_dir, sample_slurm_config):
+        """Test a failing workflow does not stop the others and its submitted steps are recorded"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text(sample_slurm_config)
+        config = SlurmConfig(str(config_file))
+        for script in ('a.sh', 'b.sh', 'bad.sh'):
+            (temp_dir / script).write_text(f"echo {script}\n")
+        good = [{'name': 'chain', 'job_type': 'minimization', 'path': str(temp_dir), 'scripts': ['a.sh', 'b.sh']}]
+        bad = [{'name': 'chain', 'job_type': 'minimization', 'path': str(temp_dir), 'scripts': ['a.sh', 'bad.sh']}]
+        
+        fake = FakeAsyncSbatch()
+        
+        async def runner(cmd, script):
+            if '/bad.sh' in script:
+                return 1, '', 'sbatch: error: Invalid partition name specified'
+            return await fake(cmd, script)
+        
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            submitter = Submitter(async_runner=runner)
+            results = asyncio.run(BatchManager.submit_many_async(
+                [(BatchManager(config, workflow='good'), good), (BatchManager(config, workflow='bad'), bad)],
+                submitter, ledger=ledger, max_concurrent=4
+            ))
+            
+            assert [step['job_id'] for step in results[0]] == ['1001', '1003']
+            assert isinstance(results[1], SubmissionError)
+            assert ledger.get('bad', 'chain', 'a.sh')['slurm_id'] == '1002'
+            assert ledger.get('bad', 'chain', 'bad.sh') is None
+            assert ledger.get('good', 'chain', 'b.sh')['slurm_id'] == '1003'
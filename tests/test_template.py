@@ -0,0 +1,47 @@
+"""
+Tests for compiled script templates
+"""
+
+import os
+import pytest
+
+from taskmanager.template import ScriptTemplate, load_template
+from taskmanager.utils import ValidationError
+
+
+class TestScriptTemplate:
+
+    def test_placeholders_match_whole_names(self):
+        """Test $KEY never replaces the start of a longer variable name"""
+        template = ScriptTemplate('echo $OUTPUT ${OUTPUT}.gro $OUTPUT_PREFIX \\$OUTPUT $file\n')
+
+        assert template.names == {'OUTPUT', 'OUTPUT_PREFIX', 'file'}
+        assert template.render({'OUTPUT': 'run'}) == 'echo run run.gro $OUTPUT_PREFIX \\$OUTPUT $file\n'
+
+    def test_defaults_are_replaced_or_kept(self):
+        """Test ${KEY:-default} takes the value when given and is left to the shell otherwise"""
+        template = ScriptTemplate('A="${A:-a.gro}"\nB="${B:-}"\n')
+
+        assert template.render({'A': 'x.gro'}) == 'A="x.gro"\nB="${B:-}"\n'
+        assert template.render({}) == 'A="${A:-a.gro}"\nB="${B:-}"\n'
+
+    def test_unknown_variables_are_rejected(self):
+        """Test strict rendering names unused variables and the default ignores them"""
+        template = ScriptTemplate('echo ${INPUT_STRUCTURE}\n', 'steep.sh.template')
+
+        with pytest.raises(ValidationError, match='steep.sh.template: INPUT_STRUCTUER'):
+            template.render({'INPUT_STRUCTUER': 'x.gro'}, strict=True)
+        assert template.render({'INPUT_STRUCTUER': 'x.gro'}) == 'echo ${INPUT_STRUCTURE}\n'
+
+    def test_load_template_recompiles_on_change(self, temp_dir):
+        """Test compiled templates are cached until the file is modified"""
+        path = temp_dir / 'job.sh.template'
+        path.write_text('echo $A\n')
+
+        first = load_template(path)
+        assert load_template(str(path)) is first
+
+        path.write_text('echo $B\n')
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert load_template(path).names == {'B'}
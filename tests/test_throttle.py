@@ -0,0 +1,160 @@
+"""
+Tests for throttled submission
+"""
+
+import subprocess
+import pytest
+
+from taskmanager.batch import BatchManager
+from taskmanager.config import SlurmConfig
+from taskmanager.ledger import JobLedger
+from taskmanager.submitter import Submitter
+from taskmanager.throttle import ThrottledSubmission
+
+
+class FakeSlurm:
+    """Answers sbatch, squeue and sacct from an in-memory queue
+
+    Each call to sleep() lets the oldest queued job finish with the next
+    state from `outcomes` (COMPLETED once they run out).
+    """
+
+    def __init__(self, outcomes=None):
+        self.queue = []
+        self.states = {}
+        self.outcomes = list(outcomes or [])
+        self.sbatch_calls = []
+        self.max_depth = 0
+        self.next_id = 1000
+
+    def __call__(self, cmd, input=None, **kwargs):
+        if cmd[0] == 'sbatch':
+            self.sbatch_calls.append(cmd)
+            self.next_id += 1
+            self.queue.append(str(self.next_id))
+            self.max_depth = max(self.max_depth, len(self.queue))
+            return subprocess.CompletedProcess(cmd, 0, f"{self.next_id}\n", '')
+        if cmd[0] == 'squeue':
+            return subprocess.CompletedProcess(cmd, 0, '\n'.join(self.queue), '')
+        if cmd[0] == 'sacct':
+            lines = [f"{job_id}|{self.states[job_id]}|Unknown|Unknown|0:0"
+                     for job_id in cmd[2].split(',') if job_id in self.states]
+            return subprocess.CompletedProcess(cmd, 0, '\n'.join(lines), '')
+        raise AssertionError(f"Unexpected command {cmd}")
+
+    def sleep(self, seconds):
+        if self.queue:
+            self.states[self.queue.pop(0)] = self.outcomes.pop(0) if self.outcomes else 'COMPLETED'
+
+
+@pytest.fixture
+def chain(temp_dir, sample_slurm_config):
+    """A three-step job and its batch manager"""
+    config_file = temp_dir / '.slurmparams'
+    config_file.write_text(sample_slurm_config)
+    for script in ('a.sh', 'b.sh', 'c.sh'):
+        (temp_dir / script).write_text(f'echo {script}\n')
+    jobs = [{'name': 'chain', 'job_type': 'minimization', 'path': str(temp_dir), 'scripts': ['a.sh', 'b.sh', 'c.sh']}]
+    return jobs, BatchManager(SlurmConfig(str(config_file)), workflow='membrane')
+
+
+def throttled(manager, ledger, slurm, max_queued):
+    return ThrottledSubmission(manager, ledger, Submitter(runner=slurm), max_queued, poll_interval=0,
+                               user='tester', runner=slurm, sleep=slurm.sleep)
+
+
+class TestThrottledSubmission:
+
+    def test_queue_depth_is_capped(self, temp_dir, chain):
+        """Test no more than K jobs are queued and children wait for parent IDs"""
+        jobs, manager = chain
+        slurm = FakeSlurm()
+
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            steps = throttled(manager, ledger, slurm, 2).run(jobs)
+            assert ledger.state_counts('membrane') == {'SUBMITTED': 3}
+
+        assert slurm.max_depth == 2
+        assert [step['job_id'] for step in steps] == ['1001', '1002', '1003']
+        assert '--dependency=afterok:1001' in slurm.sbatch_calls[1]
+        assert '--dependency=afterok:1002' in slurm.sbatch_calls[2]
+        assert all('--kill-on-invalid-dep=yes' in call for call in slurm.sbatch_calls)
+
+    def test_finished_parents(self, temp_dir, chain):
+        """Test completed parents are dropped from dependencies and failed ones skip their children"""
+        jobs, manager = chain
+        slurm = FakeSlurm(outcomes=['COMPLETED', 'FAILED'])
+
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            steps = throttled(manager, ledger, slurm, 1).run(jobs)
+            assert ledger.get('membrane', 'chain', 'c.sh')['state'] == 'SKIPPED'
+
+        assert len(slurm.sbatch_calls) == 2
+        assert not any(arg.startswith('--dependency') for arg in slurm.sbatch_calls[1])
+        assert steps[2]['job_id'] is None
+
+    def test_resume_after_restart(self, temp_dir, chain):
+        """Test a restarted run keeps the job IDs of steps submitted before it stopped"""
+        jobs, manager = chain
+        slurm = FakeSlurm()
+
+        def interrupt(seconds):
+            raise KeyboardInterrupt
+
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            first = throttled(manager, ledger, slurm, 1)
+            first.sleep = interrupt
+            with pytest.raises(KeyboardInterrupt):
+                first.run(jobs)
+            assert ledger.state_counts('membrane') == {'PLANNED': 2, 'SUBMITTED': 1}
+
+            steps = throttled(manager, ledger, slurm, 3).run(jobs)
+            assert ledger.state_counts('membrane') == {'SUBMITTED': 3}
+
+        assert len(slurm.sbatch_calls) == 3
+        assert [step['job_id'] for step in steps] == ['1001', '1002', '1003']
+        assert '--dependency=afterok:1001' in slurm.sbatch_calls[1]
+
+    @pytest.mark.parametrize('recorded, submitted', [('COMPLETED', 3), ('SUBMITTED', 1)])
+    def test_parent_purged_from_accounting(self, temp_dir, chain, recorded, submitted):
+        """Test a parent unknown to squeue and sacct is judged by its ledger state"""
+        jobs, manager = chain
+        slurm = FakeSlurm()
+
+        def interrupt(seconds):
+            raise KeyboardInterrupt
+
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            first = throttled(manager, ledger, slurm, 1)
+            first.sleep = interrupt
+            with pytest.raises(KeyboardInterrupt):
+                first.run(jobs)
+
+            # The first job has left the queue and been purged from accounting
+            slurm.queue.clear()
+            ledger.set_state('membrane', 'chain', 'a.sh', recorded)
+
+            steps = throttled(manager, ledger, slurm, 3).run(jobs)
+
+        assert len(slurm.sbatch_calls) == submitted
+        assert not any(arg.startswith('--dependency=afterok:1001') for call in slurm.sbatch_calls for arg in call)
+        if recorded == 'SUBMITTED':
+            assert [step['job_id'] for step in steps] == ['1001', None, None]
+
+    def test_queue_limit_rejection_waits(self, temp_dir, chain):
+        """Test a QOS submit-limit rejection is treated as a full queue"""
+        jobs, manager = chain
+        slurm = FakeSlurm()
+        rejections = ["sbatch: error: QOSMaxSubmitJobPerUserLimit"]
+
+        def runner(cmd, input=None, **kwargs):
+            if cmd[0] == 'sbatch' and rejections:
+                return subprocess.CompletedProcess(cmd, 1, '', rejections.pop())
+            return slurm(cmd, input, **kwargs)
+
+        with JobLedger(str(temp_dir / 'ledger.db')) as ledger:
+            submission = ThrottledSubmission(manager, ledger, Submitter(runner=runner), 5, poll_interval=0,
+                                             user='tester', runner=runner, sleep=slurm.sleep)
+            steps = submission.run(jobs)
+
+        assert [step['job_id'] for step in steps] == ['1001', '1002', '1003']
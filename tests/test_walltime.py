@@ -0,0 +1,106 @@
+"""
+Tests for walltime estimation
+"""
+
+import pytest
+from taskmanager.batch import BatchManager
+from taskmanager.config import SlurmConfig
+from taskmanager.utils import parse_slurm_time, format_slurm_time, ValidationError
+from taskmanager.walltime import parse_performance, WalltimeEstimator
+
+
+def write_md_log(path, ns_per_day=None):
+    """Write a minimal md.log, finished if ns_per_day is given"""
+    lines = ["GROMACS:      gmx mdrun, version 2023", "Step Time"]
+    if ns_per_day is not None:
+        lines.extend([
+            "               Core t (s)   Wall t (s)        (%)",
+            "       Time:    86400.000     1800.000     4800.0",
+            "                 (ns/day)    (hour/ns)",
+            f"Performance:     {ns_per_day:8.3f}        0.480",
+        ])
+    path.write_text("\n".join(lines) + "\n")
+
+
+class TestWalltime:
+    
+    def test_slurm_time_round_trip(self):
+        """Test SLURM time strings are parsed and formatted"""
+        assert parse_slurm_time('30') == 1800
+        assert parse_slurm_time('12:30:00') == 45000
+        assert parse_slurm_time('1-00:00:00') == 86400
+        assert format_slurm_time(45000) == '12:30:00'
+        assert format_slurm_time(90061) == '1-01:01:01'
+        
+        with pytest.raises(ValidationError):
+            parse_slurm_time('soon')
+    
+    def test_parse_performance(self, temp_dir):
+        """Test ns/day is read from finished logs only"""
+        finished = temp_dir / 'prod_chunk1.log'
+        running = temp_dir / 'prod_chunk2.log'
+        write_md_log(finished, 50.0)
+        write_md_log(running)
+        
+        assert parse_performance(str(finished)) == 50.0
+        assert parse_performance(str(running)) is None
+        assert parse_performance(str(temp_dir / 'missing.log')) is None
+    
+    def test_estimate_uses_median_and_margin(self, temp_dir):
+        """Test the estimate uses the median ns/day plus the safety margin"""
+        for chunk, ns_per_day in enumerate([40.0, 48.0, 100.0], start=1):
+            write_md_log(temp_dir / f'prod_chunk{chunk}.log', ns_per_day)
+        
+        estimator = WalltimeEstimator(safety_margin=0.25)
+        logs = estimator.find_chunk_logs(str(temp_dir), 'prod_chunk*.log')
+        
+        # 10 ns at 48 ns/day is 5 h, plus 25%
+        assert estimator.estimate(10, logs) == '06:15:00'
+        assert estimator.estimate(10, []) is None
+        assert estimator.estimate_seconds(0.001, 1000) == 600
+    
+    def test_batch_headers_use_estimate(self, temp_dir, sample_slurm_config):
+        """Test chunked jobs get an estimated TIME when ESTIMATE_WALLTIME is on"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text("ESTIMATE_WALLTIME=true\n" + sample_slurm_config)
+        write_md_log(temp_dir / 'prod_chunk1.log', 48.0)
+        
+        job = {
+            'name': 'production',
+            'job_type': 'production',
+            'path': str(temp_dir),
+            'scripts': ['prod_chunk1.sh', 'prod_chunk2.sh'],
+            'is_chunked': True,
+            'chunk_metadata': {'script_prefix': 'prod_chunk', 'chunk_length_ns': 10},
+            'chunk_config': {},
+        }
+        
+        manager = BatchManager(SlurmConfig(str(config_file)))
+        output = manager.generate_batch_script([job], str(temp_dir / 'batch.sh'), 'sequential')
+        
+        assert '#SBATCH --time=06:15:00' in open(output).read()
+        
+        job['is_chunked'] = False
+        assert manager._job_resources(job)['time'] is None
+    
+    def test_chained_chunk_logs_are_read_once(self, temp_dir, sample_slurm_config, monkeypatch):
+        """Test modelbound_N logs of chained chunks count and logs are globbed once per job"""
+        config_file = temp_dir / '.slurmparams'
+        config_file.write_text("ESTIMATE_WALLTIME=true\n" + sample_slurm_config)
+        write_md_log(temp_dir / 'modelbound_1.log', 48.0)
+        
+        job = {
+            'name': 'production',
+            'job_type': 'production',
+            'path': str(temp_dir),
+            'is_chunked': True,
+            'chunk_metadata': {'script_prefix': 'prod_chunk', 'chunk_length_ns': 10},
+        }
+        searches = []
+        find_chunk_logs = WalltimeEstimator.find_chunk_logs
+        monkeypatch.setattr(WalltimeEstimator, 'find_chunk_logs',
+                            lambda self, *args: searches.append(args) or find_chunk_logs(self, *args))
+        
+        manager = BatchManager(SlurmConfig(str(config_file)))
+        assert [manager._job_resources(job)['time'] for _ in range(3)] == ['06:15:00'] * 3
+        assert len(searches) == 1
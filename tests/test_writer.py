@@ -0,0 +1,51 @@
+"""
+Tests for the bulk file writer
+"""
+
+import os
+import pytest
+
+from taskmanager.writer import BulkWriter
+
+
+class TestBulkWriter:
+
+    def test_unchanged_files_are_not_rewritten(self, temp_dir):
+        """Test identical content keeps the file and its mtime, changed content replaces it"""
+        files = [(temp_dir / f'step{i}.sh', f'echo {i}\n') for i in range(20)]
+        writer = BulkWriter()
+
+        assert writer.write_many(files) == [True] * 20
+        assert (temp_dir / 'step3.sh').read_text() == 'echo 3\n'
+        assert os.stat(temp_dir / 'step3.sh').st_mode & 0o777 == 0o755
+
+        os.utime(temp_dir / 'step3.sh', (1_000_000, 1_000_000))
+        files[5] = (temp_dir / 'step5.sh', lambda: 'echo changed\n')
+        assert writer.write_many(files).count(True) == 1
+
+        assert os.stat(temp_dir / 'step3.sh').st_mtime == 1_000_000
+        assert (temp_dir / 'step5.sh').read_text() == 'echo changed\n'
+        assert writer.summary() == '21 written, 19 unchanged'
+        assert not [path for path in os.listdir(temp_dir) if path.endswith('.tmp')]
+
+    def test_mode_is_applied_without_rewriting(self, temp_dir):
+        """Test an unchanged file only has its mode corrected"""
+        path = temp_dir / 'target_ns'
+        path.write_text('100\n')
+        os.chmod(path, 0o600)
+
+        assert not BulkWriter().write(path, '100\n', mode=0o644)
+        assert os.stat(path).st_mode & 0o777 == 0o644
+
+    def test_failed_render_leaves_no_temp_file(self, temp_dir):
+        """Test an existing file survives a render error intact"""
+        path = temp_dir / 'step.sh'
+        path.write_text('echo old\n')
+
+        def render():
+            raise ValueError('bad template')
+
+        with pytest.raises(ValueError):
+            BulkWriter().write_many([(path, render)])
+        assert path.read_text() == 'echo old\n'
+        assert os.listdir(temp_dir) == ['step.sh']